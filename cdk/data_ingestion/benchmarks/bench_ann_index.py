@@ -0,0 +1,197 @@
+"""
+Benchmark: HNSW vs exact vector search on pgvector
+For each table size, loads clustered unit vectors spread over `--collections` patients into a scratch copy
+of langchain_pg_embedding, builds the same indexes as helpers.ann_index, and runs the production query
+(one collection, cosine distance on embedding::vector(N), LIMIT k) exactly (index scans disabled) and
+through HNSW at several ef_search values, with and without iterative scans (pgvector >= 0.8). Reports
+recall@k against the exact results and p50/p95 latency.
+
+The table also holds `--small-collections` patients of `--small-rows` chunks each, a small share of the
+index that a filtered HNSW search can come up short on; each is queried once and reported on its own:
+rows returned and recall@k, with and without iterative scans.
+
+Usage:
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres pgvector/pgvector:pg16
+    python benchmarks/bench_ann_index.py --password postgres --sizes 10000 100000 1000000
+
+The scratch table is replaced for each size and dropped when the benchmark ends.
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import psycopg2
+
+from helpers.bulk_loader import encode_copy_rows
+from helpers.ann_index import HNSW_M, HNSW_EF_CONSTRUCTION, ITERATIVE_SCAN_VERSION, pgvector_version
+
+TABLE = "bench_ann_embedding"
+
+
+def unit(vector):
+    norm = sum(x * x for x in vector) ** 0.5 or 1.0
+    return [x / norm for x in vector]
+
+
+class ClusteredVectors:
+    """Vectors around a fixed set of centroids, like chunks of related documents"""
+
+    def __init__(self, dimensions: int, clusters: int = 64, spread: float = 0.35, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.dimensions = dimensions
+        self.spread = spread
+        self.centroids = [unit([self.rng.gauss(0, 1) for _ in range(dimensions)]) for _ in range(clusters)]
+
+    def sample(self):
+        centroid = self.rng.choice(self.centroids)
+        return unit([c + self.rng.gauss(0, self.spread / self.dimensions ** 0.5) for c in centroid])
+
+
+def load(connection, size, dimensions, collections, vectors, small_collections=(), small_rows=0):
+    cur = connection.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+    # Unpinned column, as LangChain creates it; the index is on the same cast as the search
+    cur.execute(f"""
+        CREATE TABLE {TABLE} (
+            id varchar PRIMARY KEY, collection_id uuid, embedding vector, document varchar, cmetadata jsonb
+        );
+    """)
+    owners = [collections[i % len(collections)] for i in range(size)]
+    owners += [collection for collection in small_collections for _ in range(small_rows)]
+    for start in range(0, len(owners), 10000):
+        rows = [(str(uuid.uuid4()), owner, vectors.sample(), "", {}) for owner in owners[start:start + 10000]]
+        cur.copy_expert(f"COPY {TABLE} (id, collection_id, embedding, document, cmetadata) FROM STDIN WITH (FORMAT binary);",
+                        encode_copy_rows(rows))
+    connection.commit()
+
+    started = time.perf_counter()
+    cur.execute(f"CREATE INDEX ON {TABLE} (collection_id);")
+    cur.execute(f"""
+        CREATE INDEX ON {TABLE} USING hnsw ((embedding::vector({dimensions})) vector_cosine_ops)
+        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});
+    """)
+    cur.execute(f"ANALYZE {TABLE};")
+    connection.commit()
+    cur.close()
+    return time.perf_counter() - started
+
+
+def run_queries(connection, queries, k, dimensions, exact, ef_search=None, iterative=False):
+    """Each query in its own transaction, with the search options SET LOCAL as the retrievers do"""
+    cur = connection.cursor()
+    results, latencies = [], []
+    for collection_id, vector in queries:
+        literal = "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+        started = time.perf_counter()
+        cur.execute(f"SET LOCAL enable_indexscan = {'off' if exact else 'on'};")
+        if ef_search:
+            cur.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)};")
+        if iterative:
+            cur.execute("SET LOCAL hnsw.iterative_scan = relaxed_order;")
+        cur.execute(f"""
+            WITH nearest AS MATERIALIZED (
+                SELECT id, embedding::vector({dimensions}) <=> %s::vector({dimensions}) AS distance
+                FROM {TABLE} WHERE collection_id = %s
+                ORDER BY distance LIMIT %s
+            )
+            SELECT id FROM nearest ORDER BY distance;
+        """, (literal, collection_id, k))
+        results.append([r[0] for r in cur.fetchall()])
+        connection.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+    cur.close()
+    return results, latencies
+
+
+def recall_at_k(approx, exact):
+    return len(set(approx) & set(exact)) / max(len(exact), 1)
+
+
+def report(name, latencies, recall=None):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    recall_text = f"recall@k {recall:.3f}" if recall is not None else "recall@k 1.000 (reference)"
+    print(f"  {name:>16}: p50 {statistics.median(ordered):7.2f} ms  p95 {p95:7.2f} ms  {recall_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--dbname", default="postgres")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="postgres")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--collections", type=int, default=20, help="patients the vectors are spread over")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--small-collections", type=int, default=50, help="patients with only a few chunks")
+    parser.add_argument("--small-rows", type=int, default=8, help="chunks per small collection")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(host=args.host, port=args.port, dbname=args.dbname,
+                                  user=args.user, password=args.password)
+    cur = connection.cursor()
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    version = pgvector_version(cur)
+    connection.commit()
+    cur.close()
+    iterative_modes = [False, True] if version >= ITERATIVE_SCAN_VERSION else [False]
+
+    vectors = ClusteredVectors(args.dimensions)
+    collections = [str(uuid.uuid4()) for _ in range(args.collections)]
+    small_collections = [str(uuid.uuid4()) for _ in range(args.small_collections)]
+    queries = [(random.choice(collections), vectors.sample()) for _ in range(args.queries)]
+    small_queries = [(collection, vectors.sample()) for collection in small_collections]
+
+    try:
+        for size in args.sizes:
+            build = load(connection, size, args.dimensions, collections, vectors, small_collections, args.small_rows)
+            print(f"{size} vectors, {args.dimensions} dimensions, {args.collections} collections "
+                  f"+ {args.small_collections} x {args.small_rows} rows (index build {build:.1f} s)")
+            exact, latencies = run_queries(connection, queries, args.k, args.dimensions, exact=True)
+            report("exact", latencies)
+            for ef_search in args.ef_search:
+                for iterative in iterative_modes:
+                    approx, latencies = run_queries(connection, queries, args.k, args.dimensions, exact=False,
+                                                    ef_search=ef_search, iterative=iterative)
+                    recall = statistics.mean(recall_at_k(a, e) for a, e in zip(approx, exact))
+                    report(f"hnsw ef={ef_search}{' iter' if iterative else ''}", latencies, recall)
+
+            # Per-collection recall for the small collections, at the lowest ef_search
+            ef_search = min(args.ef_search)
+            exact, _ = run_queries(connection, small_queries, args.k, args.dimensions, exact=True)
+            modes = {
+                iterative: run_queries(connection, small_queries, args.k, args.dimensions, exact=False,
+                                       ef_search=ef_search, iterative=iterative)[0]
+                for iterative in iterative_modes
+            }
+            print(f"  small collections, hnsw ef={ef_search} (rows returned / recall@k):")
+            print(f"    {'collection':>36}  " + "  ".join(f"{'iterative' if it else 'plain':>12}" for it in iterative_modes))
+            for i, (collection, _) in enumerate(small_queries):
+                cells = [f"{len(modes[iterative][i])}/{args.k} {recall_at_k(modes[iterative][i], exact[i]):.2f}"
+                         for iterative in iterative_modes]
+                print(f"    {collection:>36}  " + "  ".join(f"{cell:>12}" for cell in cells))
+            for iterative, results in modes.items():
+                short = sum(len(r) < len(e) for r, e in zip(results, exact))
+                recall = statistics.mean(recall_at_k(r, e) for r, e in zip(results, exact))
+                print(f"    {'iterative' if iterative else 'plain'}: mean recall@k {recall:.3f}, "
+                      f"{short}/{len(exact)} collections short of k rows")
+    finally:
+        cur = connection.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: document extraction + semantic chunking throughput
+Runs the same corpus through the previous sequential path (pages extracted one by one, one
+SemanticChunker call per page, one embedding request per text) and through the parallel engine
+(processing.parallel + helpers.embeddings), and reports pages/sec and chunks/sec for each.
+
+Usage:
+    python benchmarks/bench_ingestion.py --corpus ./pdfs
+    python benchmarks/bench_ingestion.py --documents 20 --pages 40 --embed-latency-ms 40
+
+Bedrock is replaced by a fake embeddings model that sleeps `--embed-latency-ms` per request and
+returns a vector derived from the text hash. Without --corpus, synthetic PDFs are generated.
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pymupdf
+from langchain_core.embeddings import Embeddings
+from langchain_experimental.text_splitter import SemanticChunker
+
+from helpers.embeddings import IngestionEmbeddings
+from processing.parallel import extract_pages, chunk_pages
+
+WORDS = ("patient pain dose tablet allergy history symptom week morning fever cough pressure heart "
+         "blood sugar insulin rash nausea sleep diet exercise medication refill pharmacy kidney liver").split()
+
+
+class FakeBedrockEmbeddings(Embeddings):
+    """One request per text, like Titan through BedrockEmbeddings"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+
+    def _vector(self, text):
+        return [b / 255 for b in hashlib.sha512(text.encode("utf-8")).digest()]
+
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            self.requests += 1
+            time.sleep(self.latency)
+            vectors.append(self._vector(text))
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def synthetic_corpus(documents: int, pages: int, seed: int = 3):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(documents):
+        doc = pymupdf.open()
+        for _ in range(pages):
+            sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+                         for _ in range(rng.randint(8, 20))]
+            doc.new_page().insert_textbox(pymupdf.Rect(36, 36, 560, 800), " ".join(sentences), fontsize=9)
+        corpus.append((doc.tobytes(), "pdf"))
+        doc.close()
+    return corpus
+
+
+def load_corpus(path: str):
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".pdf", ".docx", ".pptx", ".txt", ".xlsx", ".xps", ".mobi", ".cbz")):
+            with open(os.path.join(path, name), "rb") as f:
+                corpus.append((f.read(), name.rsplit(".", 1)[1]))
+    return corpus
+
+
+def run_sequential(corpus, latency):
+    embeddings = FakeBedrockEmbeddings(latency)
+    splitter = SemanticChunker(embeddings)
+    pages = chunks = 0
+    for data, file_type in corpus:
+        with pymupdf.open(stream=data, filetype=file_type) as doc:
+            for page in doc:
+                pages += 1
+                chunks += len([c for c in splitter.create_documents([page.get_text()]) if c.page_content])
+    return pages, chunks, embeddings.requests
+
+
+def run_parallel(corpus, latency):
+    embeddings = FakeBedrockEmbeddings(latency)
+    splitter = SemanticChunker(IngestionEmbeddings(embeddings, model_id="fake"))
+    pages = chunks = 0
+    for data, file_type in corpus:
+        for _, doc_chunks in chunk_pages(extract_pages(data, file_type), lambda text: splitter.create_documents([text])):
+            pages += 1
+            chunks += len([c for c in doc_chunks if c.page_content])
+    return pages, chunks, embeddings.requests
+
+
+def bench(name, fn, corpus, latency):
+    start = time.perf_counter()
+    pages, chunks, requests = fn(corpus, latency)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>10}: {elapsed:7.2f} s  {pages / elapsed:8.1f} pages/s  {chunks / elapsed:8.1f} chunks/s  "
+          f"{requests:6d} embedding requests  ({pages} pages, {chunks} chunks)")
+    return elapsed, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of documents to ingest")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=40, help="pages per synthetic document")
+    parser.add_argument("--embed-latency-ms", type=float, default=30)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.documents, args.pages)
+    print(f"{len(corpus)} documents, {sum(len(d) for d, _ in corpus) / 1e6:.1f} MB, "
+          f"embedding latency {args.embed_latency_ms} ms/request")
+
+    latency = args.embed_latency_ms / 1000
+    parallel_time, parallel_chunks = bench("parallel", run_parallel, corpus, latency)
+    if not args.skip_sequential:
+        sequential_time, sequential_chunks = bench("sequential", run_sequential, corpus, latency)
+        assert sequential_chunks == parallel_chunks
+        print(f"speedup: {sequential_time / parallel_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
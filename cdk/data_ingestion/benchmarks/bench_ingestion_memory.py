@@ -0,0 +1,138 @@
+"""
+Benchmark: peak memory of document ingestion
+Runs synthetic documents of increasing length through the ingestion pipeline (extract -> chunk -> embed
+-> COPY) twice: materialized, with every chunk of the document collected before loading as the previous
+path did, and streaming, with chunks consumed in LOAD_BATCH_SIZE batches. Peak traced Python memory
+should grow with the document when materialized and stay flat when streaming.
+
+Usage:
+    python benchmarks/bench_ingestion_memory.py --pages 250 500 1000
+    python benchmarks/bench_ingestion_memory.py --pages 1000 --batch-size 64
+
+Bedrock is replaced by a fake embeddings model returning a vector derived from the text hash, and the
+database by a cursor that consumes the COPY stream, so no AWS or PostgreSQL access is needed.
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("EMBEDDING_BUCKET_NAME", "bench")
+
+import pymupdf
+from langchain_core.embeddings import Embeddings
+
+from helpers.bulk_loader import bulk_index
+from processing.documents import add_document, document_source
+
+WORDS = ("patient pain dose tablet allergy history symptom week morning fever cough pressure heart "
+         "blood sugar insulin rash nausea sleep diet exercise medication refill pharmacy kidney liver").split()
+
+
+class FakeBedrockEmbeddings(Embeddings):
+    """Titan-sized vectors derived from the text hash, without latency"""
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            digest = hashlib.sha512(text.encode("utf-8")).digest()
+            vectors.append([digest[i % len(digest)] / 255 for i in range(self.dimensions)])
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class SinkCursor:
+    """Stands in for a psycopg2 cursor: nothing is recorded yet, and COPY data is read and dropped"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._result = []
+
+    def execute(self, query, params=None):
+        self._result = [("00000000-0000-0000-0000-000000000000",)] if "FROM langchain_pg_collection" in query else []
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def copy_expert(self, sql, buf):
+        self.connection.copied_bytes += len(buf.getbuffer())
+
+    def close(self):
+        pass
+
+
+class SinkConnection:
+    def __init__(self):
+        self.copied_bytes = 0
+
+    def cursor(self):
+        return SinkCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def synthetic_document(pages: int, seed: int = 11) -> bytes:
+    rng = random.Random(seed)
+    doc = pymupdf.open()
+    for _ in range(pages):
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+                     for _ in range(rng.randint(20, 40))]
+        doc.new_page().insert_textbox(pymupdf.Rect(36, 36, 560, 800), " ".join(sentences), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def run(data: bytes, streaming: bool, batch_size: int):
+    embeddings = FakeBedrockEmbeddings()
+    connection = SinkConnection()
+    file_hash = hashlib.sha256(data).hexdigest()
+    source = document_source("bench", "group", "patient", "bench.pdf")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = add_document(data, file_hash, "group", "patient", "bench.pdf", embeddings, output_bucket="bench")
+    if not streaming:
+        chunks = list(chunks)
+    result = bulk_index(chunks, "patient", "pgvector/patient", source, embeddings, connection,
+                        batch_size=batch_size if streaming else max(len(chunks), 1))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result["num_added"], connection.copied_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[250, 500, 1000])
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per load batch when streaming")
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        data = synthetic_document(pages)
+        print(f"{pages} pages, {len(data) / 1e6:.1f} MB")
+        for name, streaming in (("materialized", False), ("streaming", True)):
+            elapsed, peak, chunks, copied = run(data, streaming, args.batch_size)
+            print(f"{name:>14}: peak {peak / 1e6:7.1f} MB  {elapsed:6.1f} s  "
+                  f"{chunks:6d} chunks  {copied / 1e6:6.1f} MB copied")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: vectorstore write throughput
+Loads the same chunks into a local pgvector through the previous path (index() -> PGVector.add_documents
+plus SQLRecordManager updates) and through helpers.bulk_loader (binary COPY + one merge), and reports rows/sec.
+
+Usage:
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres pgvector/pgvector:pg16
+    python benchmarks/bench_vector_load.py --host localhost --password postgres --chunks 5000
+
+Embeddings are precomputed random vectors returned by a fake model, so only the database phase is
+timed. Each path writes to its own collection, which is emptied before the run.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("EMBEDDING_BUCKET_NAME", "bench")
+
+import psycopg2
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_postgres import PGVector
+from langchain.indexes import SQLRecordManager, index
+
+from helpers.bulk_loader import bulk_index
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Returns a fixed random vector per text without any latency"""
+
+    def __init__(self, dimensions: int, seed: int = 5):
+        self.dimensions = dimensions
+        self.rng = random.Random(seed)
+        self.vectors = {}
+
+    def _vector(self, text):
+        if text not in self.vectors:
+            self.vectors[text] = [self.rng.uniform(-1, 1) for _ in range(self.dimensions)]
+        return self.vectors[text]
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def make_chunks(count: int, source: str):
+    return [
+        Document(
+            page_content=f"Chunk {i} of the benchmark document. " * 20,
+            metadata={"source": source, "doc_id": f"page-{i // 10}", "chunk_id": f"chunk-{i}"}
+        )
+        for i in range(count)
+    ]
+
+
+def setup(collection, embeddings, url):
+    vectorstore = PGVector(embeddings=embeddings, collection_name=collection, connection=url,
+                           use_jsonb=True, pre_delete_collection=True)
+    record_manager = SQLRecordManager(f"pgvector/{collection}", db_url=url)
+    record_manager.create_schema()
+    record_manager.delete_keys(record_manager.list_keys())
+    return vectorstore, record_manager
+
+
+def run_index(chunks, embeddings, url, dsn):
+    vectorstore, record_manager = setup("bench_index", embeddings, url)
+    embeddings.embed_documents([c.page_content for c in chunks])
+    start = time.perf_counter()
+    index(chunks, record_manager, vectorstore, cleanup="incremental", source_id_key="source")
+    return time.perf_counter() - start
+
+
+def run_bulk(chunks, embeddings, url, dsn):
+    vectorstore, record_manager = setup("bench_bulk", embeddings, url)
+    embeddings.embed_documents([c.page_content for c in chunks])
+    connection = psycopg2.connect(dsn)
+    try:
+        start = time.perf_counter()
+        bulk_index(chunks, vectorstore.collection_name, record_manager.namespace,
+                   chunks[0].metadata["source"], embeddings, connection)
+        return time.perf_counter() - start
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--dbname", default="postgres")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="postgres")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    args = parser.parse_args()
+
+    url = f"postgresql+psycopg://{args.user}:{args.password}@{args.host}:{args.port}/{args.dbname}"
+    dsn = f"dbname={args.dbname} user={args.user} password={args.password} host={args.host} port={args.port}"
+    chunks = make_chunks(args.chunks, "s3://bench/group/patient/documents/bench.pdf")
+    embeddings = PrecomputedEmbeddings(args.dimensions)
+    print(f"{len(chunks)} chunks, {args.dimensions} dimensions")
+
+    results = {}
+    for name, fn in (("index()", run_index), ("bulk COPY", run_bulk)):
+        elapsed = fn(chunks, embeddings, url, dsn)
+        results[name] = elapsed
+        print(f"{name:>10}: {elapsed:7.2f} s  {len(chunks) / elapsed:9.0f} rows/s")
+    print(f"speedup: {results['index()'] / results['bulk COPY']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
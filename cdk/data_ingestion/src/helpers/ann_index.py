@@ -0,0 +1,251 @@
+"""
+Approximate-nearest-neighbour index management for langchain_pg_embedding
+
+    python src/helpers/ann_index.py --host <host> --user <user> --password <password> status
+    python src/helpers/ann_index.py --host <host> --user <user> --password <password> ensure
+    python src/helpers/ann_index.py --host <host> --user <user> --password <password> rebuild
+"""
+import os
+import json
+import logging
+import argparse
+from typing import Any, Dict, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+HNSW_INDEX = "langchain_pg_embedding_embedding_hnsw_idx"
+COLLECTION_INDEX = "langchain_pg_embedding_collection_id_idx"
+
+# amazon.titan-embed-text-v2:0 produces 1024-dimensional vectors
+EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS", 1024))
+HNSW_M = int(os.environ.get("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", 64))
+# Largest table the ingestion Lambda indexes inline; bigger ones are indexed concurrently, out of band
+ANN_INLINE_MAX_ROWS = int(os.environ.get("ANN_INLINE_MAX_ROWS", 10000))
+# Iterative index scans, which keep a collection-filtered HNSW search going until it has k rows
+ITERATIVE_SCAN_VERSION = (0, 8)
+
+def pgvector_version(cur) -> Optional[tuple]:
+    """The installed vector extension's (major, minor) version, or None if it is not installed."""
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector';")
+    row = cur.fetchone()
+    return tuple(int(part) for part in row[0].split(".")[:2]) if row else None
+
+def ensure_ann_indexes(
+    connection,
+    dimensions: int = EMBEDDING_DIMENSIONS,
+    max_rows: Optional[int] = ANN_INLINE_MAX_ROWS,
+    concurrently: bool = False
+) -> Optional[bool]:
+    """
+    Create the collection_id b-tree and the HNSW (cosine) index on langchain_pg_embedding if missing.
+
+    HNSW needs a fixed dimension, so the index is built on the expression embedding::vector(dimensions)
+    (searches order by the same cast) rather than by altering the column, which would lock and rewrite
+    the table; it is skipped, with a warning, while any stored embedding has another dimension.
+
+    Searches filter the shared index by collection, which without iterative scans (pgvector >= 0.8)
+    returns fewer than k rows for a collection holding a small share of the table. On older versions only
+    the collection index is built, and deployments should use VECTOR_STORAGE=partitioned. Building an index
+    in a transaction blocks writes to the table for the whole build, so the ingestion Lambda only does it
+    while the table holds at most `max_rows` rows, as on a new deployment. A larger table is left, with a
+    warning, to the out-of-band build (`ensure` in this module's CLI), which uses CREATE INDEX CONCURRENTLY.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database.
+        dimensions (int): The embedding model's vector dimension.
+        max_rows (Optional[int]): The largest table indexed inline; None for no limit.
+        concurrently (bool): Build with CREATE INDEX CONCURRENTLY (in autocommit) instead of in a transaction.
+
+    Returns:
+        Optional[bool]: True if the HNSW index exists afterwards, False if it was deliberately not built
+        (table too large, mixed dimensions or no iterative scans), or None if the check should be retried later.
+    """
+    cur = None
+    try:
+        cur = connection.cursor()
+        cur.execute("SELECT to_regclass(%s), to_regclass(%s), to_regclass(%s);",
+                    (EMBEDDING_TABLE, HNSW_INDEX, COLLECTION_INDEX))
+        table, hnsw, collection = cur.fetchone()
+        if table is None:
+            connection.commit()
+            cur.close()
+            return None
+        if hnsw and collection:
+            connection.commit()
+            cur.close()
+            return True
+
+        if max_rows is not None:
+            # Bounded count: reads at most max_rows + 1 rows however large the table is
+            cur.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {EMBEDDING_TABLE} LIMIT %s) t;", (max_rows + 1,))
+            if cur.fetchone()[0] > max_rows:
+                logger.warning(
+                    f"{EMBEDDING_TABLE} has more than {max_rows} rows and is missing its ANN indexes. "
+                    "Build them out of band with CREATE INDEX CONCURRENTLY: python src/helpers/ann_index.py ... ensure"
+                )
+                connection.commit()
+                cur.close()
+                return False
+
+        cur.execute(f"SELECT 1 FROM {EMBEDDING_TABLE} WHERE vector_dims(embedding) <> %s LIMIT 1;", (dimensions,))
+        if cur.fetchone():
+            logger.warning(f"Embeddings with a dimension other than {dimensions} exist. Skipping the ANN indexes.")
+            connection.commit()
+            cur.close()
+            return False
+
+        statements = [
+            f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS "{COLLECTION_INDEX}" '
+            f"ON {EMBEDDING_TABLE} (collection_id);",
+        ]
+        version = pgvector_version(cur)
+        iterative_scan = version is not None and version >= ITERATIVE_SCAN_VERSION
+        if iterative_scan:
+            statements.append(
+                f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS "{HNSW_INDEX}" '
+                f"ON {EMBEDDING_TABLE} USING hnsw ((embedding::vector({int(dimensions)})) vector_cosine_ops) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});"
+            )
+        else:
+            logger.warning(
+                "The installed pgvector has no iterative index scans (0.8+), so a shared HNSW index would return "
+                "fewer than k rows for small collections. Building only the collection index; use VECTOR_STORAGE=partitioned."
+            )
+        if concurrently:
+            connection.commit()
+            autocommit = connection.autocommit
+            connection.autocommit = True
+            try:
+                for statement in statements:
+                    cur.execute(statement)
+            finally:
+                connection.autocommit = autocommit
+        else:
+            for statement in statements:
+                cur.execute(statement)
+            connection.commit()
+        cur.close()
+        logger.info("Created the ANN indexes on the vectorstore.")
+        return iterative_scan
+
+    except Exception as e:
+        if cur:
+            cur.close()
+        connection.rollback()
+        logger.error(f"Error creating the ANN indexes: {e}")
+        return None
+
+def index_health(connection) -> Dict[str, Any]:
+    """
+    Report the state of the ANN indexes: validity, size, scans, and the table's live and dead rows.
+
+    An invalid index (left by a failed concurrent build) or a high dead-row ratio after many deletions
+    and re-uploads are the signals to rebuild.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database.
+
+    Returns:
+        Dict[str, Any]: The health report.
+    """
+    cur = connection.cursor()
+    try:
+        cur.execute("""
+            SELECT format_type(a.atttypid, a.atttypmod), s.n_live_tup, s.n_dead_tup, s.last_autovacuum, s.last_vacuum
+            FROM pg_attribute a
+            JOIN pg_stat_user_tables s ON s.relid = a.attrelid
+            WHERE a.attrelid = to_regclass(%s) AND a.attname = 'embedding';
+        """, (EMBEDDING_TABLE,))
+        row = cur.fetchone()
+        if row is None:
+            return {"table": EMBEDDING_TABLE, "exists": False}
+        column_type, live, dead, last_autovacuum, last_vacuum = row
+
+        cur.execute("""
+            SELECT c.relname, i.indisvalid, pg_relation_size(c.oid), s.idx_scan
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+            WHERE c.relname IN (%s, %s);
+        """, (HNSW_INDEX, COLLECTION_INDEX))
+        indexes = {
+            name: {"valid": valid, "size_mb": round(size / 1e6, 1), "scans": scans}
+            for name, valid, size, scans in cur.fetchall()
+        }
+        version = pgvector_version(cur)
+        connection.commit()
+    finally:
+        cur.close()
+
+    dead_ratio = dead / max(live + dead, 1)
+    return {
+        "table": EMBEDDING_TABLE,
+        "exists": True,
+        "column_type": column_type,
+        "pgvector_version": ".".join(str(part) for part in version) if version else None,
+        "iterative_scan": version is not None and version >= ITERATIVE_SCAN_VERSION,
+        "live_rows": live,
+        "dead_rows": dead,
+        "dead_ratio": round(dead_ratio, 3),
+        "last_vacuum": str(last_vacuum or last_autovacuum),
+        "indexes": indexes,
+        "needs_rebuild": HNSW_INDEX not in indexes or not indexes[HNSW_INDEX]["valid"] or dead_ratio > 0.2,
+    }
+
+def rebuild_ann_index(connection) -> None:
+    """
+    Rebuild the HNSW index without blocking reads or ingestion (REINDEX CONCURRENTLY), after a vacuum
+    has cleared dead rows. Creates the indexes instead if they are missing.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database.
+    """
+    cur = connection.cursor()
+    cur.execute("SELECT to_regclass(%s);", (HNSW_INDEX,))
+    exists = cur.fetchone()[0] is not None
+    connection.commit()
+    cur.close()
+    if not exists:
+        ensure_ann_indexes(connection, max_rows=None, concurrently=True)
+        return
+
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        cur = connection.cursor()
+        cur.execute(f"VACUUM (ANALYZE) {EMBEDDING_TABLE};")
+        cur.execute(f'REINDEX INDEX CONCURRENTLY "{HNSW_INDEX}";')
+        cur.close()
+    finally:
+        connection.autocommit = autocommit
+    logger.info("Rebuilt the HNSW index on the vectorstore.")
+
+def main():
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the vectorstore's ANN indexes")
+    parser.add_argument("command", choices=["status", "ensure", "rebuild"])
+    parser.add_argument("--host", default=os.environ.get("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PGPORT", 5432)))
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", "postgres"))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", "postgres"))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD"))
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(host=args.host, port=args.port, dbname=args.dbname,
+                                  user=args.user, password=args.password)
+    try:
+        if args.command == "ensure":
+            ensure_ann_indexes(connection, max_rows=None, concurrently=True)
+        elif args.command == "rebuild":
+            rebuild_ann_index(connection)
+        print(json.dumps(index_health(connection), indent=2))
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import io
+import os
+import json
+import uuid
+import struct
+import hashlib
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from helpers.ingestion_stats import IngestionRun, record_ingestion
+from helpers.partitioned_store import ensure_partition
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tables created by langchain_postgres.PGVector and langchain's SQLRecordManager
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+RECORD_MANAGER_TABLE = "upsertion_record"
+
+# Chunks embedded and written per COPY batch; bounds the chunks and vectors held in memory
+LOAD_BATCH_SIZE = int(os.environ.get("LOAD_BATCH_SIZE", 256))
+
+# Namespace for chunk keys (vectorstore ids and record manager keys)
+CHUNK_KEY_NAMESPACE = uuid.UUID("7c1e4b2a-5d3f-4e8a-9b6c-2f1d0a9e8b47")
+
+def _batches(docs: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+
+def chunk_key(doc: Document) -> str:
+    """
+    Deterministic key of a chunk from its text and metadata, used as both its row id and its record manager key.
+    """
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True, default=str)
+    return str(uuid.uuid5(CHUNK_KEY_NAMESPACE, hashlib.sha256(payload.encode("utf-8")).hexdigest()))
+
+def _field(value: bytes) -> bytes:
+    return struct.pack(">i", len(value)) + value
+
+def encode_copy_rows(rows: Sequence[tuple]) -> io.BytesIO:
+    """
+    Encode (id, collection_id or patient_id, embedding, document, cmetadata) rows in PostgreSQL's binary COPY format.
+
+    Text and varchar are UTF-8, uuid is 16 raw bytes, jsonb is a version byte followed by the JSON text,
+    and a pgvector vector is (int16 dimensions, int16 unused, float4 values), all big-endian.
+    """
+    buf = io.BytesIO()
+    buf.write(_COPY_HEADER)
+    for key, collection_id, embedding, document, metadata in rows:
+        buf.write(struct.pack(">h", 5))
+        buf.write(_field(key.encode("utf-8")))
+        buf.write(_field(uuid.UUID(str(collection_id)).bytes))
+        buf.write(_field(struct.pack(f">hh{len(embedding)}f", len(embedding), 0, *embedding)))
+        buf.write(_field(document.encode("utf-8")))
+        buf.write(_field(b"\x01" + json.dumps(metadata, default=str).encode("utf-8")))
+    buf.write(_COPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+def bulk_index(
+    docs: Iterable[Document],
+    collection_name: str,
+    namespace: str,
+    source: str,
+    embeddings: Embeddings,
+    connection,
+    batch_size: int = LOAD_BATCH_SIZE,
+    partitioned: bool = False,
+    run: Optional[IngestionRun] = None
+) -> Dict[str, int]:
+    """
+    Load the chunks of one document into the vectorstore, with the same result as
+    index(..., cleanup="incremental", source_id_key="source").
+
+    Chunks are consumed lazily in batches of `batch_size`, so only one batch of chunks and vectors is
+    in memory at a time. Each batch is checked against the record manager and embedded with no
+    transaction open, then its new rows are streamed with one binary COPY into a session staging table
+    and committed at once. Extraction, chunking and Bedrock calls therefore never hold locks. Only the
+    final step is one transaction: merging the staged rows with one INSERT ... ON CONFLICT, upserting
+    the record manager keys in one statement, and deleting the source's keys (and chunks) that this
+    run no longer produced. Nothing reaches the vectorstore before that commit.
+
+    With `partitioned`, rows go to the patient's partition of patient_embeddings (created beforehand
+    in its own short transaction) instead of langchain_pg_embedding; the record manager bookkeeping is
+    the same. With `run`, its counters are added to ingestion_stats in the final transaction, so the
+    stats never disagree with the stored chunks.
+
+    Args:
+    docs (Iterable[Document]): The chunks of the document, each with metadata["source"] == source.
+    collection_name (str): The vectorstore collection (the patient ID).
+    namespace (str): The record manager namespace.
+    source (str): The document's source identifier (see document_source).
+    embeddings (Embeddings): The embeddings instance.
+    connection: The psycopg2 connection to the vectorstore database.
+    batch_size (int): The number of chunks embedded and staged per batch.
+    partitioned (bool): Write to per-patient partitioned storage (see helpers.partitioned_store).
+    run (Optional[IngestionRun]): The ingestion's counters, completed and recorded before the commit.
+
+    Returns:
+    Dict[str, int]: num_added, num_updated, num_skipped and num_deleted, as reported by index().
+    """
+    num_added = num_skipped = 0
+
+    if partitioned:
+        # The collection name is the patient ID, which keys the partition
+        table = f'"{ensure_partition(connection, collection_name)}"'
+        owner_column, owner_id = "patient_id", collection_name
+
+    cur = connection.cursor()
+    try:
+        if not partitioned:
+            cur.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s;", (collection_name,))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"Collection {collection_name} does not exist")
+            table, owner_column, owner_id = EMBEDDING_TABLE, "collection_id", row[0]
+
+        # Session tables (not ON COMMIT DROP) so batches can be staged in separate short transactions
+        cur.execute(f"""
+            DROP TABLE IF EXISTS chunk_staging, chunk_keys;
+            CREATE TEMP TABLE chunk_staging (LIKE {table} INCLUDING DEFAULTS);
+            CREATE TEMP TABLE chunk_keys (key varchar PRIMARY KEY);
+        """)
+        connection.commit()
+
+        for batch in _batches(docs, batch_size):
+            # De-duplicate chunks within the batch; repeats from earlier batches are already in chunk_keys
+            by_key: Dict[str, Document] = {}
+            for doc in batch:
+                by_key.setdefault(chunk_key(doc), doc)
+            keys = list(by_key)
+
+            cur.execute(f"""
+                SELECT key FROM {RECORD_MANAGER_TABLE} WHERE namespace = %s AND key = ANY(%s::varchar[])
+                UNION
+                SELECT key FROM chunk_keys WHERE key = ANY(%s::varchar[]);
+            """, (namespace, keys, keys))
+            existing = {r[0] for r in cur.fetchall()}
+            connection.commit()
+            new_keys = [key for key in keys if key not in existing]
+
+            # No transaction is open while Bedrock is called
+            vectors = embeddings.embed_documents([by_key[key].page_content for key in new_keys]) if new_keys else []
+
+            if new_keys:
+                rows = [
+                    (key, owner_id, vector, by_key[key].page_content, by_key[key].metadata)
+                    for key, vector in zip(new_keys, vectors)
+                ]
+                cur.copy_expert(
+                    f"COPY chunk_staging (id, {owner_column}, embedding, document, cmetadata) FROM STDIN WITH (FORMAT binary);",
+                    encode_copy_rows(rows)
+                )
+            cur.execute(
+                "INSERT INTO chunk_keys (key) SELECT unnest(%s::varchar[]) ON CONFLICT DO NOTHING;",
+                (keys,)
+            )
+            connection.commit()
+
+            num_added += len(new_keys)
+            num_skipped += len(batch) - len(new_keys)
+
+        # Final transaction: merge the staged rows, stamp every key of this run, drop the source's stale keys
+        cur.execute(f"""
+            INSERT INTO {table} (id, {owner_column}, embedding, document, cmetadata)
+            SELECT id, {owner_column}, embedding, document, cmetadata FROM chunk_staging
+            ON CONFLICT ({"patient_id, id" if partitioned else "id"}) DO UPDATE
+            SET {owner_column} = EXCLUDED.{owner_column},
+                embedding = EXCLUDED.embedding,
+                document = EXCLUDED.document,
+                cmetadata = EXCLUDED.cmetadata;
+        """)
+        cur.execute(f"""
+            INSERT INTO {RECORD_MANAGER_TABLE} (uuid, key, namespace, group_id, updated_at)
+            SELECT gen_random_uuid()::varchar, key, %s, %s, EXTRACT(EPOCH FROM CURRENT_TIMESTAMP)
+            FROM chunk_keys
+            ON CONFLICT (key, namespace) DO UPDATE
+            SET group_id = EXCLUDED.group_id,
+                updated_at = EXCLUDED.updated_at;
+        """, (namespace, source))
+
+        # Keys of the source that this run did not produce belong to chunks that no longer exist
+        cur.execute(f"""
+            DELETE FROM {RECORD_MANAGER_TABLE} r
+            WHERE r.namespace = %s AND r.group_id = %s
+            AND NOT EXISTS (SELECT 1 FROM chunk_keys k WHERE k.key = r.key)
+            RETURNING r.key;
+        """, (namespace, source))
+        stale = [r[0] for r in cur.fetchall()]
+        if stale:
+            cur.execute(
+                f"DELETE FROM {table} WHERE {owner_column} = %s AND id = ANY(%s::varchar[]);",
+                (owner_id, stale)
+            )
+
+        if run is not None:
+            run.chunks_added += num_added
+            run.chunks_removed += len(stale)
+            # A stats failure must not lose the chunks, so it is confined to a savepoint
+            cur.execute("SAVEPOINT ingestion_stats;")
+            try:
+                record_ingestion(cur, run)
+                cur.execute("RELEASE SAVEPOINT ingestion_stats;")
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT ingestion_stats;")
+                logger.error(f"Error recording ingestion stats: {e}")
+
+        cur.execute("DROP TABLE IF EXISTS chunk_staging, chunk_keys;")
+        connection.commit()
+        cur.close()
+
+    except Exception as e:
+        connection.rollback()
+        # The staging tables outlive a rollback of the batch that failed; leave the pooled session clean
+        try:
+            cur.execute("DROP TABLE IF EXISTS chunk_staging, chunk_keys;")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+        cur.close()
+        logger.error(f"Bulk load of document chunks failed: {e}")
+        raise
+
+    result = {
+        "num_added": num_added,
+        "num_updated": 0,
+        "num_skipped": num_skipped,
+        "num_deleted": len(stale),
+    }
+    logger.info(f"Bulk loaded chunks: {result}")
+    return result
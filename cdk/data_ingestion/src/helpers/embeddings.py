@@ -0,0 +1,139 @@
+import os
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+from langchain_core.embeddings import Embeddings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Titan embeds one text per InvokeModel request, so throughput comes from concurrent requests
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", 8))
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 20000))
+EMBEDDING_MAX_ATTEMPTS = int(os.environ.get("EMBEDDING_MAX_ATTEMPTS", 5))
+
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+class IngestionEmbeddings(Embeddings):
+    """
+    Embeddings wrapper used for ingestion (both the SemanticChunker and index()).
+
+    Texts are de-duplicated and looked up in a cache keyed by a hash of (model, text), so text
+    embedded once (by the chunker, by a retried or re-uploaded document, or a header repeated on
+    every page) is not sent to Bedrock again. Titan has no batch API, so each miss is its own request;
+    the requests run concurrently on a bounded thread pool, each retried with exponential backoff and
+    jitter when Bedrock throttles. The monitoring counters are updated from those threads under a lock.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_id: str,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        cache_size: int = EMBEDDING_CACHE_SIZE,
+        max_attempts: int = EMBEDDING_MAX_ATTEMPTS
+    ):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.cache_size = cache_size
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embedding")
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Monitoring counters
+        self.texts_requested = 0
+        self.cache_hits = 0
+        self.texts_embedded = 0
+        self.requests = 0
+        self.retries = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def _cache_put(self, key: str, vector: List[float]):
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _embed_text(self, text: str) -> List[float]:
+        """One Bedrock request through the wrapped embeddings, retried with backoff on throttling"""
+        for attempt in range(1, self.max_attempts + 1):
+            self._count(requests=1)
+            try:
+                vector = self.embeddings.embed_documents([text])[0]
+                self._count(texts_embedded=1)
+                return vector
+            except Exception as e:
+                code = e.response.get("Error", {}).get("Code") if isinstance(e, ClientError) else None
+                retryable = code in RETRYABLE_ERROR_CODES or "Throttling" in str(e)
+                if not retryable or attempt == self.max_attempts:
+                    raise
+                delay = min(20.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random())
+                self._count(retries=1)
+                logger.warning(f"Embedding request throttled (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}
+
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            vector = self._cache_get(key)
+            if vector is not None:
+                vectors[key] = vector
+            else:
+                missing[key] = text
+        self._count(texts_requested=len(texts), cache_hits=len(texts) - len(missing))
+
+        if missing:
+            for key, vector in zip(missing, self._executor.map(self._embed_text, missing.values())):
+                vectors[key] = vector
+                self._cache_put(key, vector)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "texts_requested": self.texts_requested,
+                "cache_hits": self.cache_hits,
+                "texts_embedded": self.texts_embedded,
+                "requests": self.requests,
+                "retries": self.retries,
+                "cached": len(self._cache),
+            }
@@ -1,15 +1,19 @@
 import logging
 import boto3
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 import psycopg2
 
 from langchain_aws import BedrockEmbeddings
 from langchain_postgres import PGVector
 from langchain.indexes import SQLRecordManager
 
-from processing.documents import process_documents
+from helpers.ann_index import ensure_ann_indexes
+from processing.documents import process_document, remove_document
 s3 = boto3.client('s3')
 
+# Set once this container has settled the vectorstore's ANN indexes (built, present, or left to an out-of-band build)
+ann_indexes_checked = False
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -62,18 +66,26 @@ def store_group_data(
     bucket: str, 
     group: str, 
     patient_id: str, 
+    filename: str,
     vectorstore_config_dict: Dict[str, str], 
     embeddings: BedrockEmbeddings,
-    connection
-) -> None:
+    connection,
+    deleted: bool = False
+) -> Optional[Dict[str, Any]]:
     """
-    Store group data from an S3 bucket into the vectorstore.
+    Store (or remove) the document from an S3 event in the patient's vectorstore.
     
     Args:
     bucket (str): The name of the S3 bucket.
     group (str): The group name/folder in the S3 bucket.
+    patient_id (str): The patient ID folder within the group.
+    filename (str): The name of the document file from the event.
     vectorstore_config_dict (Dict[str, str]): The configuration dictionary for the vectorstore.
     embeddings (BedrockEmbeddings): The embeddings instance.
+    deleted (bool): True for an object removal event.
+    
+    Returns:
+    Optional[Dict[str, Any]]: Statistics of the ingestion or removal, or None if nothing was done.
     """
     vectorstore, connection_string = get_vectorstore(
         collection_name=vectorstore_config_dict['collection_name'],
@@ -97,11 +109,27 @@ def store_group_data(
         logger.error("VectorStore could not be initialized")
         return
 
-    # Process all files in the "documents" folder
-    process_documents(
+    # PGVector creates langchain_pg_embedding on first use, so index it once it exists
+    global ann_indexes_checked
+    if not ann_indexes_checked:
+        ann_indexes_checked = ensure_ann_indexes(connection) is not None
+
+    if deleted:
+        return remove_document(
+            group=group,
+            patient_id=patient_id,
+            filename=filename,
+            vectorstore=vectorstore,
+            record_manager=record_manager,
+            connection=connection
+        )
+
+    # Process only the document in the event
+    return process_document(
         bucket=bucket,
         group=group,
         patient_id=patient_id,
+        filename=filename,
         vectorstore=vectorstore,
         embeddings=embeddings,
         record_manager=record_manager,
@@ -0,0 +1,142 @@
+import time
+import logging
+from typing import Any, Dict, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATS_TABLE = "ingestion_stats"
+
+class IngestionRun:
+    """
+    Counters for one document ingestion (or removal), filled in as the pipeline runs and written to
+    ingestion_stats by record_ingestion, in the same transaction as the chunks when bulk loading.
+    """
+
+    def __init__(self, patient_id: str, embeddings=None, removal: bool = False):
+        self.patient_id = patient_id
+        self.removal = removal
+        self.started = time.monotonic()
+        self.pages = 0
+        self.bytes = 0
+        self.chunks_added = 0
+        self.chunks_removed = 0
+        self._embeddings = embeddings
+        self._embedded_before = self._embedded()
+
+    def _embedded(self) -> int:
+        # Bedrock requests (one text each, retries included) by IngestionEmbeddings; other embeddings are not counted
+        return getattr(self._embeddings, "requests", 0)
+
+    @property
+    def embedding_calls(self) -> int:
+        return self._embedded() - self._embedded_before
+
+    @property
+    def duration_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chunks_added": self.chunks_added,
+            "chunks_removed": self.chunks_removed,
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "embedding_calls": self.embedding_calls,
+            "duration_ms": self.duration_ms,
+        }
+
+def record_ingestion(cur, run: IngestionRun) -> None:
+    """
+    Add a run's counters to the patient's ingestion_stats row, in the caller's transaction.
+
+    Args:
+        cur: A cursor on the transaction that wrote (or deleted) the run's chunks.
+        run (IngestionRun): The finished run.
+    """
+    cur.execute(f"""
+        INSERT INTO {STATS_TABLE} (
+            patient_id, chunk_count, chunks_added, chunks_removed, documents_ingested, documents_removed,
+            pages, bytes, embedding_calls, total_duration_ms, last_duration_ms, updated_at
+        )
+        VALUES (%s, GREATEST(%s, 0), %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (patient_id) DO UPDATE
+        SET chunk_count = GREATEST({STATS_TABLE}.chunk_count + EXCLUDED.chunk_count, 0),
+            chunks_added = {STATS_TABLE}.chunks_added + EXCLUDED.chunks_added,
+            chunks_removed = {STATS_TABLE}.chunks_removed + EXCLUDED.chunks_removed,
+            documents_ingested = {STATS_TABLE}.documents_ingested + EXCLUDED.documents_ingested,
+            documents_removed = {STATS_TABLE}.documents_removed + EXCLUDED.documents_removed,
+            pages = {STATS_TABLE}.pages + EXCLUDED.pages,
+            bytes = {STATS_TABLE}.bytes + EXCLUDED.bytes,
+            embedding_calls = {STATS_TABLE}.embedding_calls + EXCLUDED.embedding_calls,
+            total_duration_ms = {STATS_TABLE}.total_duration_ms + EXCLUDED.total_duration_ms,
+            last_duration_ms = EXCLUDED.last_duration_ms,
+            updated_at = EXCLUDED.updated_at;
+    """, (
+        run.patient_id,
+        run.chunks_added - run.chunks_removed,
+        run.chunks_added,
+        run.chunks_removed,
+        0 if run.removal else 1,
+        1 if run.removal else 0,
+        run.pages,
+        run.bytes,
+        run.embedding_calls,
+        run.duration_ms,
+        run.duration_ms,
+    ))
+
+def save_ingestion(connection, run: IngestionRun) -> None:
+    """
+    Record a run in its own transaction, for paths whose chunk writes are not ours to join (index(),
+    PGVector.delete). Statistics must never fail an ingestion, so errors are only logged.
+
+    Args:
+        connection: The psycopg2 connection to the database.
+        run (IngestionRun): The finished run.
+    """
+    cur = None
+    try:
+        cur = connection.cursor()
+        record_ingestion(cur, run)
+        connection.commit()
+        cur.close()
+
+    except Exception as e:
+        if cur:
+            cur.close()
+        connection.rollback()
+        logger.error(f"Error recording ingestion stats: {e}")
+
+def get_ingestion_stats(connection, patient_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The patient's accumulated ingestion statistics (a primary-key lookup, no scans of the vectorstore).
+
+    Args:
+        connection: The psycopg2 connection to the database.
+        patient_id (str): The patient ID.
+
+    Returns:
+        Optional[Dict[str, Any]]: The stats row, or None if nothing has been ingested for the patient.
+    """
+    cur = None
+    try:
+        cur = connection.cursor()
+        cur.execute(f"""
+            SELECT chunk_count, chunks_added, chunks_removed, documents_ingested, documents_removed,
+                   pages, bytes, embedding_calls, total_duration_ms, last_duration_ms
+            FROM {STATS_TABLE} WHERE patient_id = %s;
+        """, (patient_id,))
+        row = cur.fetchone()
+        columns = [c[0] for c in cur.description]
+        connection.commit()
+        cur.close()
+        return dict(zip(columns, row)) if row else None
+
+    except Exception as e:
+        if cur:
+            cur.close()
+        connection.rollback()
+        logger.error(f"Error retrieving ingestion stats: {e}")
+        return None
@@ -0,0 +1,199 @@
+"""
+Per-patient partitioned vector storage
+
+patient_embeddings is list-partitioned by patient_id, with one partition (and one HNSW index) per patient,
+so a patient's search and writes touch only that patient's rows. Enabled with VECTOR_STORAGE=partitioned;
+copy the LangChain tables over first:
+
+    python src/helpers/partitioned_store.py --host <host> --user <user> --password <password> migrate
+    python src/helpers/partitioned_store.py --host <host> --user <user> --password <password> status
+"""
+import os
+import json
+import uuid
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "patient_embeddings"
+PARTITIONED_STORAGE = os.environ.get("VECTOR_STORAGE", "langchain").lower() == "partitioned"
+# The partitioned table's embedding column is vector(1024) (amazon.titan-embed-text-v2:0)
+EMBEDDING_DIMENSIONS = 1024
+
+def partition_name(patient_id: str) -> str:
+    """
+    The partition holding a patient's chunks. Parsing the ID as a UUID also makes the name safe to quote.
+    """
+    return f"{PARTITIONED_TABLE}_{uuid.UUID(str(patient_id)).hex}"
+
+def ensure_partition(connection, patient_id: str) -> str:
+    """
+    Create the patient's partition if missing, in its own short transaction.
+
+    CREATE TABLE ... PARTITION OF locks the parent table, so it is committed immediately rather than
+    held for the length of an ingestion. An advisory lock serializes concurrent ingestions of the same
+    patient's documents, which would otherwise race on CREATE TABLE IF NOT EXISTS.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database (must have no open transaction).
+        patient_id (str): The patient ID.
+
+    Returns:
+        str: The partition name.
+    """
+    name = partition_name(patient_id)
+    cur = connection.cursor()
+    try:
+        cur.execute("SELECT to_regclass(%s);", (name,))
+        if cur.fetchone()[0] is None:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (name,))
+            cur.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARTITIONED_TABLE} FOR VALUES IN (%s);',
+                (str(patient_id),)
+            )
+            logger.info("Created the vectorstore partition for the patient.")
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Error creating the patient's partition: {e}")
+        raise
+    finally:
+        cur.close()
+    return name
+
+def delete_chunks(connection, patient_id: str, ids: List[str]) -> None:
+    """
+    Delete chunks by id from the patient's partition.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database.
+        patient_id (str): The patient ID.
+        ids (List[str]): The chunk ids (record manager keys).
+    """
+    cur = connection.cursor()
+    try:
+        cur.execute("SELECT to_regclass(%s);", (partition_name(patient_id),))
+        if cur.fetchone()[0] is not None:
+            cur.execute(
+                f'DELETE FROM "{partition_name(patient_id)}" WHERE id = ANY(%s::varchar[]);',
+                (ids,)
+            )
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Error deleting chunks from the patient's partition: {e}")
+        raise
+    finally:
+        cur.close()
+
+def migrate_collection(connection, patient_id: str) -> Dict[str, int]:
+    """
+    Replace a patient's partition with the chunks of its LangChain collection, in one transaction.
+
+    Ids are kept, so the record manager's keys stay valid and incremental cleanup carries on unchanged.
+    Rows whose embedding is not EMBEDDING_DIMENSIONS long cannot be stored and are counted as skipped.
+
+    Args:
+        connection: The psycopg2 connection to the vectorstore database.
+        patient_id (str): The patient ID (the collection name).
+
+    Returns:
+        Dict[str, int]: The number of chunks copied and skipped.
+    """
+    name = ensure_partition(connection, patient_id)
+    cur = connection.cursor()
+    try:
+        cur.execute(f'DELETE FROM "{name}";')
+        cur.execute(f"""
+            INSERT INTO "{name}" (patient_id, id, embedding, document, cmetadata)
+            SELECT %s, e.id, e.embedding, e.document, e.cmetadata
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+            WHERE c.name = %s AND vector_dims(e.embedding) = %s;
+        """, (str(patient_id), str(patient_id), EMBEDDING_DIMENSIONS))
+        copied = cur.rowcount
+        cur.execute("""
+            SELECT COUNT(*)
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+            WHERE c.name = %s AND vector_dims(e.embedding) <> %s;
+        """, (str(patient_id), EMBEDDING_DIMENSIONS))
+        skipped = cur.fetchone()[0]
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Error migrating the patient's collection: {e}")
+        raise
+    finally:
+        cur.close()
+
+    return {"copied": copied, "skipped": skipped}
+
+def migrate_all(connection, patient_id: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Migrate every LangChain collection that belongs to an existing patient (or just one patient).
+    """
+    cur = connection.cursor()
+    cur.execute("""
+        SELECT c.name
+        FROM langchain_pg_collection c
+        JOIN patients p ON p.patient_id::text = c.name
+        WHERE %s::text IS NULL OR c.name = %s;
+    """, (patient_id, patient_id))
+    names = [r[0] for r in cur.fetchall()]
+    connection.commit()
+    cur.close()
+
+    results = {}
+    for name in names:
+        results[name] = migrate_collection(connection, name)
+        logger.info(f"Migrated collection {name}: {results[name]}")
+    return results
+
+def partition_status(connection) -> List[Dict[str, object]]:
+    """
+    Partitions with their estimated row counts and sizes, from the catalog (no scans).
+    """
+    cur = connection.cursor()
+    cur.execute("""
+        SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname;
+    """, (PARTITIONED_TABLE,))
+    rows = [{"partition": name, "rows": max(rows, 0), "size_mb": round(size / 1e6, 1)}
+            for name, rows, size in cur.fetchall()]
+    connection.commit()
+    cur.close()
+    return rows
+
+def main():
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Migrate to or inspect per-patient partitioned vector storage")
+    parser.add_argument("command", choices=["migrate", "status"])
+    parser.add_argument("--patient", help="migrate only this patient ID")
+    parser.add_argument("--host", default=os.environ.get("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PGPORT", 5432)))
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", "postgres"))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", "postgres"))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD"))
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(host=args.host, port=args.port, dbname=args.dbname,
+                                  user=args.user, password=args.password)
+    try:
+        if args.command == "migrate":
+            print(json.dumps(migrate_all(connection, args.patient), indent=2))
+        else:
+            print(json.dumps(partition_status(connection), indent=2))
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Any, Dict, Optional
 
 from helpers.helper import store_group_data
 
@@ -6,27 +6,34 @@ def update_vectorstore(
     bucket: str,
     group: str,
     patient_id: str,
+    filename: str,
     vectorstore_config_dict: Dict[str, str],
     embeddings,#: BedrockEmbeddings
-    connection
-) -> None:
+    connection,
+    deleted: bool = False
+) -> Optional[Dict[str, Any]]:
     """
-    Update the vectorstore with embeddings for all documents and images in the S3 bucket.
+    Update the vectorstore with embeddings for the document in an S3 event.
 
     Args:
     bucket (str): The name of the S3 bucket containing the group folders.
     group (str): The name of the group folder within the S3 bucket.
+    patient_id (str): The patient ID folder within the group.
+    filename (str): The name of the uploaded or deleted document file.
     vectorstore_config_dict (Dict[str, str]): The configuration dictionary for the vectorstore, including parameters like collection name, database name, user, password, host, and port.
     embeddings (BedrockEmbeddings): The embeddings instance used to process the documents and images.
+    deleted (bool): True when the document was removed from the bucket.
 
     Returns:
-    None
+    Optional[Dict[str, Any]]: Statistics of the ingestion or removal, or None if nothing was done.
     """
-    store_group_data(
+    return store_group_data(
         bucket=bucket,
         group=group,
         patient_id=patient_id,
+        filename=filename,
         vectorstore_config_dict=vectorstore_config_dict,
         embeddings=embeddings,
-        connection=connection
+        connection=connection,
+        deleted=deleted
     )
\ No newline at end of file
@@ -6,7 +6,11 @@ import logging
 from datetime import datetime, timezone
 from typing import NamedTuple
 
+from botocore.config import Config
+
 from helpers.vectorstore import update_vectorstore
+from helpers.embeddings import IngestionEmbeddings, EMBEDDING_CONCURRENCY
+from helpers.ingestion_stats import get_ingestion_stats
 from langchain_aws import BedrockEmbeddings
 
 # Set up basic logging
@@ -24,12 +28,17 @@ EMBEDDING_MODEL_PARAM = os.environ["EMBEDDING_MODEL_PARAM"]
 # AWS Clients
 secrets_manager_client = boto3.client("secretsmanager")
 ssm_client = boto3.client("ssm")
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=REGION)
+bedrock_runtime = boto3.client(
+    "bedrock-runtime",
+    region_name=REGION,
+    config=Config(retries={"max_attempts": 3, "mode": "adaptive"}, max_pool_connections=EMBEDDING_CONCURRENCY)
+)
 
 # Cached resources
 connection = None
 db_secret = None
 EMBEDDING_MODEL_ID = None
+embeddings = None
 
 # Set up class to represent parsed file path
 class ParsedFilePath(NamedTuple):
@@ -64,6 +73,23 @@ def get_parameter():
             raise
     return EMBEDDING_MODEL_ID
 
+def get_embeddings():
+    """
+    Cached embeddings for ingestion; its text-hash cache carries over between warm invocations.
+    """
+    global embeddings
+    if embeddings is None:
+        model_id = get_parameter()
+        embeddings = IngestionEmbeddings(
+            BedrockEmbeddings(
+                model_id=model_id,
+                client=bedrock_runtime,
+                region_name=REGION
+            ),
+            model_id=model_id
+        )
+    return embeddings
+
 def connect_to_db():
     global connection
     if connection is None or connection.closed:
@@ -87,56 +113,6 @@ def connect_to_db():
             raise
     return connection
 
-def get_embedding_count(patient_id):
-    """
-    Queries the database for the number of embeddings associated with a specific patient.
-
-    Args:
-        patient_id (str): The patient ID (collection name in the vectorstore).
-
-    Returns:
-        int: The count of embeddings found for the patient.
-    """
-    connection = connect_to_db()
-    if connection is None:
-        logger.error("Database connection failed. Unable to query embeddings.")
-        raise
-
-    try:
-        cur = connection.cursor()
-
-        # Query to count embeddings for the patient
-        query = """
-        SELECT COUNT(*)
-        FROM langchain_pg_embedding e
-        JOIN langchain_pg_collection c ON e.collection_id = c.uuid
-        WHERE c.name = %s;
-        """
-        cur.execute(query, (patient_id,))
-        result = cur.fetchone()
-
-        connection.commit()
-        cur.close()
-
-        if result and result[0] > 0:
-            logger.info(f"Current embedding count: {result[0]}")
-            return result[0]
-        else:
-            logger.info("No embeddings found. This may be a new collection.")
-            return 0
-
-    except psycopg2.errors.UndefinedTable as e:
-        # Handles case where tables do not exist yet (first patient)
-        logger.warning("LangChain tables do not exist yet as this might be the first patient being created. Returning 0 embeddings.")
-        return 0
-
-    except Exception as e:
-        if cur:
-            cur.close()
-        connection.rollback()
-        logger.error(f"Error retrieving embedding count: {e}")
-        raise
-
 def update_ingestion_status(patient_id: str, file_path: str, status: str):
     """
     Updates the ingestion_status of a file in the patient_data table.
@@ -266,17 +242,38 @@ def insert_file_into_db(patient_id, file_name, file_type, file_path, bucket_name
         logger.error(f"Error inserting file {file_name}.{file_type} into database: {e}")
         raise
 
-def update_vectorstore_from_s3(bucket, simulation_group_id, patient_id, file_path):
+def invalidate_opening_cache(patient_id):
+    """
+    Drops the cached opening turns for a patient so new sessions are greeted using the updated documents.
+
+    Args:
+        patient_id (str): The patient ID whose documents changed.
+    """
+    connection = connect_to_db()
+    if connection is None:
+        logger.error("Database connection failed. Unable to invalidate opening turn cache.")
+        return
+
+    try:
+        cur = connection.cursor()
+        cur.execute('DELETE FROM "opening_turn_cache" WHERE patient_id = %s;', (patient_id,))
+        connection.commit()
+        cur.close()
+        logger.info("Opening turn cache invalidated for patient.")
+
+    except Exception as e:
+        if cur:
+            cur.close()
+        connection.rollback()
+        logger.error(f"Error invalidating opening turn cache for patient: {e}")
+
+def update_vectorstore_from_s3(bucket, simulation_group_id, patient_id, file_path, deleted=False):
     connection = connect_to_db()
     if connection is None:
         logger.error("Database connection failed. Unable to query embeddings.")
         raise
     
-    embeddings = BedrockEmbeddings(
-        model_id=get_parameter(), 
-        client=bedrock_runtime,
-        region_name=REGION
-    )
+    embeddings = get_embeddings()
 
     secret = get_secret()
 
@@ -290,24 +287,23 @@ def update_vectorstore_from_s3(bucket, simulation_group_id, patient_id, file_pat
     }
 
     try:
-        update_vectorstore(
+        run_stats = update_vectorstore(
             bucket=bucket,
             group=simulation_group_id,
             patient_id=patient_id,
+            filename=os.path.basename(file_path),
             vectorstore_config_dict=vectorstore_config_dict,
             embeddings=embeddings,
-            connection=connection
+            connection=connection,
+            deleted=deleted
         )
+        logger.info(f"Embedding stats: {embeddings.get_stats()}")
+        return run_stats
 
     except Exception as e:
-        error_message = str(e)
-        if "An error occurred (404) when calling the HeadObject operation: Not Found" in error_message:
-            logger.warning(f"Temporary page file not found while updating vectorstore for the patient. "
-                           f"Ingestion status for this document is set to completed since it has already been processed.")
-        else:
-            update_ingestion_status(patient_id, file_path, "error")
-            logger.error(f"Error updating vectorstore for patient: {e}, ingestion_status set to 'error'.")
-            raise
+        update_ingestion_status(patient_id, file_path, "error")
+        logger.error(f"Error updating vectorstore for patient: {e}, ingestion_status set to 'error'.")
+        raise
 
 def handler(event, context):
     records = event.get('Records', [])
@@ -339,14 +335,7 @@ def handler(event, context):
                 "body": json.dumps("Error parsing S3 file path.")
             }
         
-        # Get initial embedding count
-        try:
-            initial_count = get_embedding_count(patient_id)
-            logger.info(f"Initial count of embeddings are {initial_count}")
-        except Exception as e:
-            initial_count = 0
-            logger.error(f"Error getting initial count of embeddings: {e}")
-
+        run_stats = None
         if event_name.startswith('ObjectCreated:'):
             try:
                 insert_file_into_db(
@@ -370,8 +359,12 @@ def handler(event, context):
         # Update embeddings for patient after the file is successfully inserted into the database. Only if document file
         if file_category == "documents":
             try:
-                update_vectorstore_from_s3(bucket_name, simulation_group_id, patient_id, file_key)
+                run_stats = update_vectorstore_from_s3(
+                    bucket_name, simulation_group_id, patient_id, file_key,
+                    deleted=not event_name.startswith('ObjectCreated:')
+                )
                 logger.info(f"Vectorstore updated successfully for patient in the group.")
+                invalidate_opening_cache(patient_id)
             except Exception as e:
                 logger.error(f"Error updating vectorstore for patient in the group: {e}")
                 return {
@@ -381,29 +374,19 @@ def handler(event, context):
         else:            
             logger.info(f"{file_name}.{file_type} in {file_category} folder is not ingested")
         
-        # Get final embedding count
-        try:
-            final_count = get_embedding_count(patient_id)
-            logger.info(f"Final count of embeddings are {final_count}")
-
-            difference = final_count - initial_count
-
-            if difference > 0:
-                logger.info(f"{difference} embeddings were created.")
-                print(f"{difference} embeddings were created.")
-            elif difference == 0:
-                logger.info(f"No change in embeddings")
-            else:
-                logger.info(f"{difference} embeddings were removed.")
-        except Exception as e:
-            logger.error(f"Error getting final count of embeddings: {e}")
+        # Per-run counters, and the patient's running totals from ingestion_stats (a primary-key lookup)
+        ingestion_stats = None
+        if run_stats:
+            logger.info(f"Ingestion stats: {run_stats}")
+            ingestion_stats = {"run": run_stats, "patient": get_ingestion_stats(connect_to_db(), patient_id)}
 
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "message": "New file inserted into database.",
-                "location": f"s3://{bucket_name}/{file_key}"
-            })
+                "location": f"s3://{bucket_name}/{file_key}",
+                "ingestion_stats": ingestion_stats
+            }, default=str)
         }
 
     return {
@@ -1,7 +1,6 @@
-import os, tempfile, logging, uuid
-from io import BytesIO
-from typing import List
-import boto3, pymupdf
+import os, tempfile, logging, uuid, hashlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import boto3
 
 from langchain_postgres import PGVector
 from langchain_core.documents import Document
@@ -9,6 +8,11 @@ from langchain_aws import BedrockEmbeddings
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain.indexes import SQLRecordManager, index
 
+from helpers.bulk_loader import bulk_index, LOAD_BATCH_SIZE
+from helpers.ingestion_stats import IngestionRun, save_ingestion
+from helpers.partitioned_store import PARTITIONED_STORAGE, delete_chunks
+from processing.parallel import extract_pages, chunk_pages
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +22,17 @@ s3 = boto3.client('s3')
 
 EMBEDDING_BUCKET_NAME = os.environ["EMBEDDING_BUCKET_NAME"]
 
+# Debug mode: also write each extracted page to EMBEDDING_BUCKET_NAME as {document}_page_{n}.txt
+KEEP_PAGE_TEXTS = os.environ.get("KEEP_PAGE_TEXTS", "false").lower() == "true"
+# Load chunks with binary COPY in one transaction (see helpers.bulk_loader); "false" falls back to index()
+# except with partitioned storage, which only the bulk loader writes
+BULK_LOAD = os.environ.get("BULK_LOAD", "true").lower() == "true"
+
+# Namespace for deterministic page and chunk ids, derived from the file's content hash
+CHUNK_ID_NAMESPACE = uuid.UUID("0f3d5c9e-2b7a-4c1e-8d6f-9a4b3e2c1d70")
+
+SUPPORTED_DOCUMENT_TYPES = (".pdf", ".docx", ".pptx", ".txt", ".xlsx", ".xps", ".mobi", ".cbz")
+
 def extract_txt(
     bucket: str, 
     file_key: str
@@ -44,40 +59,41 @@ def extract_txt(
 
     return text
 
-def get_ingestion_status(patient_id: str, file_path: str, connection) -> str:
+def get_ingestion_state(patient_id: str, file_path: str, connection) -> Tuple[Optional[str], Optional[str]]:
     """
-    Retrieves the current ingestion status of a file.
+    Retrieves the current ingestion status of a file and the content hash it was last indexed with.
     
     Args:
         patient_id (str): The patient ID associated with the file.
         file_path (str): The full file path stored in the database.
     
     Returns:
-        str: The current ingestion status ("completed", "processing", "error", or None).
+        Tuple[Optional[str], Optional[str]]: The ingestion status ("completed", "processing", "error", or None)
+        and the SHA-256 of the last completely indexed version (or None).
     """
     if connection is None:
         logger.error("Database connection failed. Unable to retrieve ingestion status.")
-        return None
+        return None, None
 
     try:
         cur = connection.cursor()
 
-        select_query = "SELECT ingestion_status FROM patient_data WHERE patient_id = %s AND filepath = %s;"
+        select_query = "SELECT ingestion_status, content_hash FROM patient_data WHERE patient_id = %s AND filepath = %s;"
 
         cur.execute(select_query, (patient_id, file_path))
         result = cur.fetchone()
         connection.commit()
         cur.close()
-        return result[0] if result else None
+        return (result[0], result[1]) if result else (None, None)
 
     except Exception as e:
         if cur:
             cur.close()
         connection.rollback()
         logger.error(f"Error retrieving ingestion status for the file: {e}")
-        return None
+        return None, None
 
-def update_ingestion_status(patient_id: str, file_path: str, status: str, connection):
+def update_ingestion_status(patient_id: str, file_path: str, status: str, connection, content_hash: Optional[str] = None):
     """
     Updates the ingestion_status of a file in the patient_data table.
 
@@ -85,6 +101,7 @@ def update_ingestion_status(patient_id: str, file_path: str, status: str, connec
         patient_id (str): The patient ID associated with the file.
         file_path (str): The full file path stored in the database.
         status (str): The status to update ('completed' or 'error').
+        content_hash (Optional[str]): SHA-256 of the file version that was indexed, stored when given.
     """
     if connection is None:
         logger.error("Database connection failed. Unable to update ingestion status.")
@@ -106,11 +123,12 @@ def update_ingestion_status(patient_id: str, file_path: str, status: str, connec
 
         update_query = """
         UPDATE "patient_data"
-        SET ingestion_status = %s
+        SET ingestion_status = %s,
+            content_hash = COALESCE(%s, content_hash)
         WHERE patient_id = %s
         AND filepath = %s;
         """
-        cur.execute(update_query, (status, patient_id, file_path))
+        cur.execute(update_query, (status, content_hash, patient_id, file_path))
         connection.commit()
         cur.close()
 
@@ -123,199 +141,322 @@ def update_ingestion_status(patient_id: str, file_path: str, status: str, connec
         logger.error(f"Error updating ingestion status for patient for the file: {e}")
         raise
 
-def store_doc_texts(
+def clear_content_hash(patient_id: str, file_path: str, connection):
+    """
+    Forget the indexed content hash of a file whose chunks were removed, so a later upload of the
+    same bytes is indexed again.
+
+    Args:
+        patient_id (str): The patient ID associated with the file.
+        file_path (str): The full file path stored in the database.
+    """
+    if connection is None:
+        logger.error("Database connection failed. Unable to clear content hash.")
+        return
+
+    try:
+        cur = connection.cursor()
+        cur.execute(
+            'UPDATE "patient_data" SET content_hash = NULL WHERE patient_id = %s AND filepath = %s;',
+            (patient_id, file_path)
+        )
+        connection.commit()
+        cur.close()
+
+    except Exception as e:
+        if cur:
+            cur.close()
+        connection.rollback()
+        logger.error(f"Error clearing content hash for the file: {e}")
+
+def download_document(
     bucket: str, 
     group: str, 
     patient: str,
-    filename: str, 
-    output_bucket: str
-) -> List[str]:
+    filename: str
+) -> bytes:
     """
-    Store the text of each page of a document in an S3 bucket.
+    Fetch a document from an S3 bucket with a single GET.
     
     Args:
     bucket (str): The name of the S3 bucket containing the document.
     group (str): The group ID folder in the S3 bucket.
     patient (str): The patient name and ID folder within the group.
     filename (str): The name of the document file.
-    output_bucket (str): The name of the S3 bucket for storing the extracted text.
     
     Returns:
-    List[str]: A list of keys for the stored text files in the output bucket.
+    bytes: The document contents.
     """
-    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-        s3.download_file(bucket, f"{group}/{patient}/documents/{filename}", tmp_file.name)
-        file_name, file_type = filename.rsplit('.', 1)
-        doc = pymupdf.open(tmp_file.name, filetype=file_type)
-        
-        with BytesIO() as output_buffer:
-            for page_num, page in enumerate(doc, start=1):
-                text = page.get_text().encode("utf8")
-                output_buffer.write(text)
-                output_buffer.write(bytes((12,)))
-                
-                page_output_key = f'{group}/{patient}/documents/{filename}_page_{page_num}.txt'
-                
-                with BytesIO(text) as page_output_buffer:
-                    s3.upload_fileobj(page_output_buffer, output_bucket, page_output_key)
+    return s3.get_object(Bucket=bucket, Key=f"{group}/{patient}/documents/{filename}")["Body"].read()
 
-        os.remove(tmp_file.name)
+def iter_doc_pages(
+    data: bytes,
+    filename: str
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield the text of each page of a document held in memory.
+    
+    Large documents are extracted by several processes in parallel (see extract_pages).
+    
+    Args:
+    data (bytes): The document contents.
+    filename (str): The name of the document file (its extension selects the parser).
+    
+    Returns:
+    Iterator[Tuple[int, str]]: (page number starting at 1, page text) pairs.
+    """
+    file_type = filename.rsplit('.', 1)[1]
+
+    yield from extract_pages(data, file_type)
 
-    return [f'{group}/{patient}/documents/{filename}_page_{page_num}.txt' for page_num in range(1, len(doc) + 1)]
+def store_page_texts(
+    pages: Iterable[Tuple[int, str]],
+    group: str, 
+    patient: str,
+    filename: str, 
+    output_bucket: str
+) -> Iterator[Tuple[int, str]]:
+    """
+    Debug mode only: upload each page's text to the output bucket as it passes through.
+    
+    Args:
+    pages (Iterable[Tuple[int, str]]): (page number, page text) pairs.
+    group (str): The group ID folder in the S3 bucket.
+    patient (str): The patient name and ID folder within the group.
+    filename (str): The name of the document file.
+    output_bucket (str): The name of the S3 bucket for storing the extracted text.
+    
+    Returns:
+    Iterator[Tuple[int, str]]: The same pages, unchanged.
+    """
+    for page_num, text in pages:
+        page_output_key = f'{group}/{patient}/documents/{filename}_page_{page_num}.txt'
+        s3.put_object(Bucket=output_bucket, Key=page_output_key, Body=text.encode("utf8"))
+        yield page_num, text
 
 def add_document(
-    bucket: str, 
+    data: bytes,
+    file_hash: str,
     group: str, 
     patient: str,
     filename: str, 
-    vectorstore: PGVector, 
     embeddings: BedrockEmbeddings,
-    output_bucket: str = EMBEDDING_BUCKET_NAME
-) -> List[Document]:
+    output_bucket: str = EMBEDDING_BUCKET_NAME,
+    run: Optional[IngestionRun] = None
+) -> Iterator[Document]:
     """
-    Add a document to the vectorstore.
+    Extract and chunk a document for the vectorstore, lazily: pages are extracted and chunked only as
+    the returned chunks are consumed.
     
     Args:
-    bucket (str): The name of the S3 bucket containing the document.
+    data (bytes): The document contents.
+    file_hash (str): SHA-256 of the document contents.
     group (str): The group ID folder in the S3 bucket.
     patient (str): The patient name and ID folder within the group.
     filename (str): The name of the document file.
-    vectorstore (PGVector): The vectorstore instance.
     embeddings (BedrockEmbeddings): The embeddings instance.
-    output_bucket (str, optional): The name of the S3 bucket for storing extracted data. Defaults to 'temp-extracted-data'.
+    output_bucket (str, optional): The S3 bucket named in each chunk's source (and where page texts go in debug mode).
+    run (Optional[IngestionRun]): Counts the pages chunked.
     
     Returns:
-    List[Document]: A list of all document chunks for this document that were added to the vectorstore.
+    Iterator[Document]: The document's chunks, in page order.
     """
-    
-    output_filenames = store_doc_texts(
-        bucket=bucket,
-        group=group,
-        patient=patient,
-        filename=filename,
-        output_bucket=output_bucket
-    )
-    this_doc_chunks = store_doc_chunks(
-        bucket=output_bucket,
-        filenames=output_filenames,
-        vectorstore=vectorstore,
-        embeddings=embeddings
+    pages = iter_doc_pages(data, filename)
+    if KEEP_PAGE_TEXTS:
+        pages = store_page_texts(pages, group, patient, filename, output_bucket)
+
+    return iter_doc_chunks(
+        pages=pages,
+        source=document_source(output_bucket, group, patient, filename),
+        file_hash=file_hash,
+        embeddings=embeddings,
+        run=run
     )
-    
-    return this_doc_chunks
 
-def store_doc_chunks(
-    bucket: str, 
-    filenames: List[str],
-    vectorstore: PGVector, 
-    embeddings: BedrockEmbeddings
-) -> List[Document]:
+def iter_doc_chunks(
+    pages: Iterable[Tuple[int, str]],
+    source: str,
+    file_hash: str,
+    embeddings: BedrockEmbeddings,
+    run: Optional[IngestionRun] = None
+) -> Iterator[Document]:
     """
-    Store chunks of documents in the vectorstore.
+    Split the pages of a document into chunks for the vectorstore, yielding each page's chunks as
+    soon as they are ready so that no more than the chunking budget (see chunk_pages) is held.
+    
+    Page and chunk ids are derived from the file's content hash, so the same bytes always produce
+    the same chunks (and the same record manager keys) and index() can skip what is already stored.
     
     Args:
-    bucket (str): The name of the S3 bucket containing the text files.
-    filenames (List[str]): A list of keys for the text files in the bucket.
-    vectorstore (PGVector): The vectorstore instance.
+    pages (Iterable[Tuple[int, str]]): (page number, page text) pairs.
+    source (str): The document's source identifier (see document_source).
+    file_hash (str): SHA-256 of the document contents.
     embeddings (BedrockEmbeddings): The embeddings instance.
+    run (Optional[IngestionRun]): Counts the pages chunked.
     
     Returns:
-    List[Document]: A list of all document chunks for this document that were added to the vectorstore.
+    Iterator[Document]: The document's chunks, in page order.
     """
     text_splitter = SemanticChunker(embeddings)
-    this_doc_chunks = []
-
-    for filename in filenames:
-        this_uuid = str(uuid.uuid4()) # Generating one UUID for all chunks of from a specific page in the document
-        output_buffer = BytesIO()
-        s3.download_fileobj(bucket, filename, output_buffer)
-        output_buffer.seek(0)
-        doc_texts = output_buffer.read().decode('utf-8')
-        doc_chunks = text_splitter.create_documents([doc_texts])
-        
-        head, _, _ = filename.partition("_page")
-        true_filename = head # Converts 'GroupCode_XXX_-_Group-Name.pdf_page_1.txt' to 'GroupCode_XXX_-_Group-Name.pdf'
+
+    # Pages are chunked concurrently (each makes its own embedding calls) and come back in page order
+    for page_num, doc_chunks in chunk_pages(pages, lambda text: text_splitter.create_documents([text])):
+        if run is not None:
+            run.pages += 1
+        page_id = f"{file_hash}:{page_num}"
+        this_uuid = str(uuid.uuid5(CHUNK_ID_NAMESPACE, page_id)) # One UUID for all chunks of a specific page in the document
         
         doc_chunks = [x for x in doc_chunks if x.page_content]
         
-        for doc_chunk in doc_chunks:
+        for offset, doc_chunk in enumerate(doc_chunks):
             if doc_chunk:
-                doc_chunk.metadata["source"] = f"s3://{bucket}/{true_filename}"
+                doc_chunk.metadata["source"] = source
                 doc_chunk.metadata["doc_id"] = this_uuid
+                doc_chunk.metadata["chunk_id"] = str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{page_id}:{offset}"))
                 
             else:
                 logger.warning(f"Empty chunk for the file")
         
-        s3.delete_object(Bucket=bucket, Key=filename)
-        
-        this_doc_chunks.extend(doc_chunks)
-       
-    return this_doc_chunks
+        yield from doc_chunks
                 
-def process_documents(
+def document_source(output_bucket: str, group: str, patient: str, filename: str) -> str:
+    """
+    The "source" metadata value (and record manager group id) of every chunk of a document.
+    
+    Args:
+    output_bucket (str): The S3 bucket the page texts were extracted to.
+    group (str): The group ID folder in the S3 bucket.
+    patient (str): The patient ID folder within the group.
+    filename (str): The name of the document file.
+    
+    Returns:
+    str: The source identifier, e.g. 's3://bucket/group/patient/documents/file.pdf'.
+    """
+    return f"s3://{output_bucket}/{group}/{patient}/documents/{filename}"
+
+def process_document(
     bucket: str, 
     group: str, 
     patient_id: str, 
+    filename: str,
     vectorstore: PGVector, 
     embeddings: BedrockEmbeddings,
     record_manager: SQLRecordManager,
     connection
-) -> None:
+) -> Optional[Dict[str, Any]]:
     """
-    Process and add text documents from an S3 bucket to the vectorstore.
+    Process and add the single document from an S3 event to the vectorstore.
+    
+    Only this document is read and indexed, with incremental cleanup keyed by source, so a
+    re-upload replaces its own previous chunks and other documents of the patient are untouched.
+    A re-upload whose SHA-256 matches the last indexed version costs one GET and no Bedrock calls.
     
     Args:
-    bucket (str): The name of the S3 bucket containing the text documents.
+    bucket (str): The name of the S3 bucket containing the document.
     group (str): The group ID folder in the S3 bucket.
+    patient_id (str): The patient ID folder within the group.
+    filename (str): The name of the document file from the event.
     vectorstore (PGVector): The vectorstore instance.
     embeddings (BedrockEmbeddings): The embeddings instance.
     record_manager (SQLRecordManager): Manages list of documents in the vectorstore for indexing.
-    """
-    paginator = s3.get_paginator('list_objects_v2')
-    page_iterator = paginator.paginate(Bucket=bucket, Prefix=f"{group}/{patient_id}/documents")
-    all_doc_chunks = []
-    
-    for page in page_iterator:
-        if "Contents" not in page:
-            continue  # Skip pages without any content (e.g., if the bucket is empty)
-        for file in page['Contents']:
-            filename = file['Key']
-            if filename.endswith((".pdf", ".docx", ".pptx", ".txt", ".xlsx", ".xps", ".mobi", ".cbz")):
-                file_path = f"{group}/{patient_id}/documents/{os.path.basename(filename)}"
-                this_doc_chunks = []
-
-                # Check if ingestion has already been completed
-                current_status = get_ingestion_status(patient_id, file_path, connection)
-                if current_status == "completed":
-                    continue
-                
-                this_doc_chunks = add_document(
-                    bucket=bucket,
-                    group=group,
-                    patient=patient_id,
-                    filename=os.path.basename(filename),
-                    vectorstore=vectorstore,
-                    embeddings=embeddings
-                )
-
-                all_doc_chunks.extend(this_doc_chunks)
-                update_ingestion_status(patient_id, file_path, "completed", connection)
     
-    if all_doc_chunks:  # Check if there are any documents to index
-        idx = index(
-            all_doc_chunks, 
-            record_manager, 
-            vectorstore, 
-            cleanup="full",
-            source_id_key="source"
+    Returns:
+    Optional[Dict[str, Any]]: The ingestion's statistics (see IngestionRun), or None if nothing was indexed.
+    """
+    if not filename.endswith(SUPPORTED_DOCUMENT_TYPES):
+        logger.info("File type is not supported for ingestion. Skipping.")
+        return
+
+    file_path = f"{group}/{patient_id}/documents/{filename}"
+
+    # Check if ingestion has already been completed
+    current_status, indexed_hash = get_ingestion_state(patient_id, file_path, connection)
+    if current_status == "completed":
+        logger.info("Ingestion for the file is already 'completed'. Skipping.")
+        return
+
+    run = IngestionRun(patient_id, embeddings)
+    data = download_document(bucket, group, patient_id, filename)
+    run.bytes = len(data)
+    file_hash = hashlib.sha256(data).hexdigest()
+
+    # Unchanged re-upload: the chunks from the last run are still in the vectorstore
+    source = document_source(EMBEDDING_BUCKET_NAME, group, patient_id, filename)
+    if indexed_hash == file_hash and record_manager.list_keys(group_ids=[source], limit=1):
+        logger.info("File content is unchanged since it was last indexed. Skipping re-embedding.")
+        update_ingestion_status(patient_id, file_path, "completed", connection, content_hash=file_hash)
+        return
+
+    this_doc_chunks = add_document(
+        data=data,
+        file_hash=file_hash,
+        group=group,
+        patient=patient_id,
+        filename=filename,
+        embeddings=embeddings,
+        run=run
+    )
+
+    if BULK_LOAD or PARTITIONED_STORAGE:
+        idx = bulk_index(
+            this_doc_chunks,
+            collection_name=vectorstore.collection_name,
+            namespace=record_manager.namespace,
+            source=source,
+            embeddings=embeddings,
+            connection=connection,
+            partitioned=PARTITIONED_STORAGE,
+            run=run
         )
-        logger.info(f"Indexing updates: \n {idx}")
     else:
         idx = index(
-            [],
+            this_doc_chunks, 
             record_manager, 
             vectorstore, 
-            cleanup="full",
-            source_id_key="source"
+            cleanup="incremental",
+            source_id_key="source",
+            batch_size=LOAD_BATCH_SIZE
         )
-        logger.info("No documents found for indexing.")
\ No newline at end of file
+        run.chunks_added, run.chunks_removed = idx["num_added"], idx["num_deleted"]
+        save_ingestion(connection, run)
+    logger.info(f"Indexing updates: \n {idx}")
+    update_ingestion_status(patient_id, file_path, "completed", connection, content_hash=file_hash)
+    return run.as_dict()
+
+def remove_document(
+    group: str, 
+    patient_id: str, 
+    filename: str,
+    vectorstore: PGVector, 
+    record_manager: SQLRecordManager,
+    connection,
+    output_bucket: str = EMBEDDING_BUCKET_NAME
+) -> Dict[str, Any]:
+    """
+    Remove the chunks of a deleted document from the vectorstore and the record manager.
+    
+    Args:
+    group (str): The group ID folder in the S3 bucket.
+    patient_id (str): The patient ID folder within the group.
+    filename (str): The name of the deleted document file.
+    vectorstore (PGVector): The vectorstore instance.
+    record_manager (SQLRecordManager): Manages list of documents in the vectorstore for indexing.
+    output_bucket (str, optional): The S3 bucket the document's page texts were extracted to.
+    
+    Returns:
+    Dict[str, Any]: The removal's statistics (see IngestionRun).
+    """
+    run = IngestionRun(patient_id, removal=True)
+    source = document_source(output_bucket, group, patient_id, filename)
+    keys = record_manager.list_keys(group_ids=[source])
+    if keys:
+        if PARTITIONED_STORAGE:
+            delete_chunks(connection, patient_id, keys)
+        else:
+            vectorstore.delete(ids=keys)
+        record_manager.delete_keys(keys)
+    run.chunks_removed = len(keys)
+    save_ingestion(connection, run)
+    clear_content_hash(patient_id, f"{group}/{patient_id}/documents/{filename}", connection)
+    logger.info(f"Removed {len(keys)} chunks of the deleted document from the vectorstore.")
+    return run.as_dict()
@@ -0,0 +1,148 @@
+import os, logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+import pymupdf
+from langchain_core.documents import Document
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CPU-bound page extraction runs in child processes (one page range each)
+EXTRACTION_PROCESSES = int(os.environ.get("EXTRACTION_PROCESSES", os.cpu_count() or 1))
+MIN_PAGES_PER_PROCESS = int(os.environ.get("MIN_PAGES_PER_PROCESS", 16))
+# Pages per extraction task; at most one task per process is held in memory at a time
+EXTRACTION_BATCH_PAGES = int(os.environ.get("EXTRACTION_BATCH_PAGES", 64))
+# I/O-bound chunking (embedding calls) runs on threads, within a budget of page text in flight
+CHUNKING_THREADS = int(os.environ.get("CHUNKING_THREADS", 4))
+MAX_INFLIGHT_CHARS = int(os.environ.get("MAX_INFLIGHT_CHARS", 2_000_000))
+# Extraction children are forked from a single-threaded fork server, never from this process, whose
+# chunking pool, boto3 and logging threads may hold locks that a plain fork would copy locked
+EXTRACTION_START_METHOD = os.environ.get("EXTRACTION_START_METHOD", "forkserver")
+
+_extraction_context = get_context(EXTRACTION_START_METHOD)
+if EXTRACTION_START_METHOD == "forkserver":
+    _extraction_context.set_forkserver_preload(["pymupdf", "processing.parallel"])
+
+_chunking_executor = ThreadPoolExecutor(max_workers=CHUNKING_THREADS, thread_name_prefix="chunking")
+
+def _extract_range(data: bytes, file_type: str, start: int, stop: int, conn) -> None:
+    """
+    Child process: extract pages [start, stop) and send their texts back in one message.
+    """
+    try:
+        with pymupdf.open(stream=data, filetype=file_type) as doc:
+            conn.send((start, [doc[i].get_text() for i in range(start, stop)]))
+    except Exception as e:
+        conn.send((start, e))
+    finally:
+        conn.close()
+
+def extract_pages(
+    data: bytes,
+    file_type: str,
+    processes: int = EXTRACTION_PROCESSES,
+    batch_pages: int = EXTRACTION_BATCH_PAGES
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) for every page of a document held in memory.
+
+    Large documents are split into page ranges of at most `batch_pages` pages, extracted in parallel by
+    child processes. A new range is started only when the oldest one has been consumed, so at most
+    `processes` ranges of text are held however long the document is. Plain Process and Pipe are used
+    because Lambda has no /dev/shm, which multiprocessing.Pool and ProcessPoolExecutor need. Children
+    come from the fork server (EXTRACTION_START_METHOD), so extraction is safe while the chunking pool or
+    other threads are running; the document bytes are sent to each child with its range. Small
+    documents, or a single process, are extracted inline.
+
+    Args:
+    data (bytes): The document contents.
+    file_type (str): The document extension, e.g. 'pdf'.
+    processes (int): The maximum number of extraction processes.
+    batch_pages (int): The maximum number of pages per extraction process.
+
+    Returns:
+    Iterator[Tuple[int, str]]: (page number starting at 1, page text) pairs, in page order.
+    """
+    with pymupdf.open(stream=data, filetype=file_type) as doc:
+        page_count = doc.page_count
+        processes = min(processes, page_count // MIN_PAGES_PER_PROCESS)
+        if processes <= 1:
+            for page_num, page in enumerate(doc, start=1):
+                yield page_num, page.get_text()
+            return
+
+    ctx = _extraction_context
+    pages_per_range = max(1, min(batch_pages, -(-page_count // processes)))
+    ranges = deque((start, min(start + pages_per_range, page_count)) for start in range(0, page_count, pages_per_range))
+    running = deque()
+
+    def start_next():
+        start, stop = ranges.popleft()
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        worker = ctx.Process(target=_extract_range, args=(data, file_type, start, stop, child_conn), daemon=True)
+        worker.start()
+        child_conn.close()
+        running.append((worker, parent_conn))
+
+    try:
+        while ranges and len(running) < processes:
+            start_next()
+        while running:
+            worker, conn = running.popleft()
+            start, texts = conn.recv()
+            conn.close()
+            worker.join()
+            if isinstance(texts, Exception):
+                raise texts
+            if ranges:
+                start_next()
+            for offset, text in enumerate(texts):
+                yield start + offset + 1, text
+            del texts
+    finally:
+        for worker, conn in running:
+            conn.close()
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    logger.info(f"Extracted {page_count} pages with {processes} processes.")
+
+def chunk_pages(
+    pages: Iterable[Tuple[int, str]],
+    split_page: Callable[[str], List[Document]],
+    max_inflight_chars: int = MAX_INFLIGHT_CHARS
+) -> Iterator[Tuple[int, List[Document]]]:
+    """
+    Chunk pages concurrently on the chunking thread pool, yielding results in page order.
+
+    At most `max_inflight_chars` of page text (and never more than two pages per thread) is being
+    chunked or waiting for its chunks at any time, so memory stays bounded however large the document.
+
+    Args:
+    pages (Iterable[Tuple[int, str]]): (page number, page text) pairs.
+    split_page (Callable[[str], List[Document]]): Chunks one page of text (embedding calls happen here).
+    max_inflight_chars (int): Budget of page text in flight.
+
+    Returns:
+    Iterator[Tuple[int, List[Document]]]: (page number, chunks of that page) pairs.
+    """
+    inflight = deque()
+    inflight_chars = 0
+    max_inflight_pages = CHUNKING_THREADS * 2
+
+    for page_num, text in pages:
+        while inflight and (len(inflight) >= max_inflight_pages or inflight_chars + len(text) > max_inflight_chars):
+            done_page, size, future = inflight.popleft()
+            inflight_chars -= size
+            yield done_page, future.result()
+        inflight.append((page_num, len(text), _chunking_executor.submit(split_page, text)))
+        inflight_chars += len(text)
+
+    while inflight:
+        done_page, _, future = inflight.popleft()
+        yield done_page, future.result()
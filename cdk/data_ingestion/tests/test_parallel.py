@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+pymupdf = pytest.importorskip("pymupdf")
+
+from processing import parallel
+from processing.parallel import extract_pages, chunk_pages
+
+PAGES = 48
+
+
+def make_pdf(pages: int) -> bytes:
+    doc = pymupdf.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1} of the patient history")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture(autouse=True)
+def small_ranges(monkeypatch):
+    # Split even a short document across processes
+    monkeypatch.setattr(parallel, "MIN_PAGES_PER_PROCESS", 4)
+
+
+def test_extraction_does_not_fork_from_this_process():
+    assert parallel._extraction_context.get_start_method() != "fork"
+
+
+def test_extraction_while_pool_is_active():
+    """
+    Threads of a running pool hold locks while the pages are extracted, as the chunking pool and
+    boto3's threads do during ingestion; children forked from this process would inherit them locked.
+    """
+    locks = [threading.Lock() for _ in range(4)]
+    release = threading.Event()
+
+    def hold_lock(lock):
+        with lock:
+            release.wait(timeout=60)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(hold_lock, lock) for lock in locks]
+        try:
+            pages = list(extract_pages(make_pdf(PAGES), "pdf", processes=3, batch_pages=8))
+        finally:
+            release.set()
+        for future in futures:
+            future.result()
+
+    assert [page_num for page_num, _ in pages] == list(range(1, PAGES + 1))
+    assert all(f"page {page_num} of" in text for page_num, text in pages)
+
+
+def test_extraction_feeding_the_chunking_pool():
+    chunks = chunk_pages(extract_pages(make_pdf(PAGES), "pdf", processes=3, batch_pages=8), lambda text: [text.strip()])
+    assert [page_num for page_num, _ in chunks] == list(range(1, PAGES + 1))
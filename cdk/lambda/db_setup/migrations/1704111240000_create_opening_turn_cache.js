@@ -0,0 +1,21 @@
+exports.up = (pgm) => {
+  pgm.sql(`
+    CREATE TABLE IF NOT EXISTS "opening_turn_cache" (
+      "variant_id" uuid PRIMARY KEY DEFAULT (uuid_generate_v4()),
+      "patient_id" uuid REFERENCES patients(patient_id) ON DELETE CASCADE ON UPDATE CASCADE,
+      "prompt_version" varchar NOT NULL,
+      "model_id" varchar NOT NULL,
+      "response_text" text NOT NULL,
+      "created_at" timestamp DEFAULT CURRENT_TIMESTAMP
+    )
+  `);
+
+  pgm.sql(`
+    CREATE INDEX IF NOT EXISTS "opening_turn_cache_lookup_idx"
+    ON "opening_turn_cache" (patient_id, prompt_version, model_id)
+  `);
+};
+
+exports.down = (pgm) => {
+  pgm.dropTable("opening_turn_cache", { ifExists: true, cascade: true });
+};
@@ -0,0 +1,11 @@
+exports.up = (pgm) => {
+  pgm.addColumns('patient_data', {
+    content_hash: {
+      type: 'varchar(64)'
+    }
+  });
+};
+
+exports.down = (pgm) => {
+  pgm.dropColumns('patient_data', ['content_hash']);
+};
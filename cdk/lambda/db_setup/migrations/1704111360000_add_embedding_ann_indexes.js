@@ -0,0 +1,60 @@
+// The langchain_pg_embedding table is created by the data ingestion Lambda on first use, so
+// this only indexes deployments where it already exists, holds at most ANN_INLINE_MAX_ROWS rows
+// and this role owns it. Otherwise it is skipped: the ingestion Lambda indexes the table while it
+// is small, and larger tables are indexed out of band with `python src/helpers/ann_index.py ... ensure`
+// (CREATE INDEX CONCURRENTLY). The HNSW index is built on embedding::vector(1024), the expression
+// searches order by, so the column is never altered (which would lock and rewrite the table), and
+// only with pgvector >= 0.8, whose iterative scans keep collection-filtered searches from coming up short.
+// Failures are reported, not raised, so they never block the remaining migrations.
+const EMBEDDING_DIMENSIONS = 1024; // amazon.titan-embed-text-v2:0
+const ANN_INLINE_MAX_ROWS = 10000; // Same limit as the ingestion Lambda's helpers.ann_index
+
+exports.up = (pgm) => {
+  pgm.sql(`
+    DO $$
+    BEGIN
+      IF to_regclass('public.langchain_pg_embedding') IS NULL THEN
+        RAISE NOTICE 'langchain_pg_embedding does not exist yet, skipping ANN indexes';
+        RETURN;
+      END IF;
+
+      IF (
+        SELECT COUNT(*) FROM (SELECT 1 FROM "langchain_pg_embedding" LIMIT ${ANN_INLINE_MAX_ROWS + 1}) t
+      ) > ${ANN_INLINE_MAX_ROWS} THEN
+        RAISE NOTICE 'langchain_pg_embedding has more than ${ANN_INLINE_MAX_ROWS} rows, build its ANN indexes with ann_index.py ensure';
+        RETURN;
+      END IF;
+
+      CREATE INDEX IF NOT EXISTS "langchain_pg_embedding_collection_id_idx"
+      ON "langchain_pg_embedding" (collection_id);
+
+      IF (
+        SELECT string_to_array(split_part(extversion, '-', 1), '.')::int[] FROM pg_extension WHERE extname = 'vector'
+      ) < ARRAY[0, 8] THEN
+        RAISE NOTICE 'pgvector has no iterative index scans before 0.8, skipping HNSW index (use VECTOR_STORAGE=partitioned)';
+        RETURN;
+      END IF;
+
+      IF EXISTS (
+        SELECT 1 FROM "langchain_pg_embedding"
+        WHERE vector_dims(embedding) <> ${EMBEDDING_DIMENSIONS} LIMIT 1
+      ) THEN
+        RAISE NOTICE 'langchain_pg_embedding has embeddings that are not ${EMBEDDING_DIMENSIONS}-dimensional, skipping HNSW index';
+        RETURN;
+      END IF;
+
+      CREATE INDEX IF NOT EXISTS "langchain_pg_embedding_embedding_hnsw_idx"
+      ON "langchain_pg_embedding" USING hnsw ((embedding::vector(${EMBEDDING_DIMENSIONS})) vector_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+    EXCEPTION WHEN insufficient_privilege THEN
+      RAISE NOTICE 'Not the owner of langchain_pg_embedding, ANN indexes are left to the ingestion Lambda';
+    END$$;
+  `);
+};
+
+exports.down = (pgm) => {
+  pgm.sql(`
+    DROP INDEX IF EXISTS "langchain_pg_embedding_embedding_hnsw_idx";
+    DROP INDEX IF EXISTS "langchain_pg_embedding_collection_id_idx";
+  `);
+};
@@ -0,0 +1,22 @@
+exports.up = (pgm) => {
+  pgm.sql(`
+    CREATE TABLE IF NOT EXISTS "patient_embeddings" (
+      "patient_id" uuid NOT NULL REFERENCES patients(patient_id) ON DELETE CASCADE ON UPDATE CASCADE,
+      "id" varchar NOT NULL,
+      "embedding" vector(1024) NOT NULL,
+      "document" text,
+      "cmetadata" jsonb,
+      PRIMARY KEY (patient_id, id)
+    ) PARTITION BY LIST (patient_id)
+  `);
+
+  pgm.sql(`
+    CREATE INDEX IF NOT EXISTS "patient_embeddings_embedding_hnsw_idx"
+    ON "patient_embeddings" USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+  `);
+};
+
+exports.down = (pgm) => {
+  pgm.dropTable("patient_embeddings", { ifExists: true, cascade: true });
+};
@@ -0,0 +1,38 @@
+exports.up = (pgm) => {
+  pgm.sql(`
+    CREATE TABLE IF NOT EXISTS "ingestion_stats" (
+      "patient_id" uuid PRIMARY KEY REFERENCES patients(patient_id) ON DELETE CASCADE ON UPDATE CASCADE,
+      "chunk_count" bigint NOT NULL DEFAULT 0,
+      "chunks_added" bigint NOT NULL DEFAULT 0,
+      "chunks_removed" bigint NOT NULL DEFAULT 0,
+      "documents_ingested" integer NOT NULL DEFAULT 0,
+      "documents_removed" integer NOT NULL DEFAULT 0,
+      "pages" bigint NOT NULL DEFAULT 0,
+      "bytes" bigint NOT NULL DEFAULT 0,
+      "embedding_calls" bigint NOT NULL DEFAULT 0,
+      "total_duration_ms" bigint NOT NULL DEFAULT 0,
+      "last_duration_ms" integer,
+      "updated_at" timestamp DEFAULT CURRENT_TIMESTAMP
+    )
+  `);
+
+  // Seed chunk counts once from the existing LangChain tables, if ingestion has already created them
+  pgm.sql(`
+    DO $$
+    BEGIN
+      IF to_regclass('public.langchain_pg_embedding') IS NOT NULL THEN
+        INSERT INTO "ingestion_stats" (patient_id, chunk_count)
+        SELECT p.patient_id, COUNT(*)
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+        JOIN patients p ON p.patient_id::text = c.name
+        GROUP BY p.patient_id
+        ON CONFLICT (patient_id) DO NOTHING;
+      END IF;
+    END$$;
+  `);
+};
+
+exports.down = (pgm) => {
+  pgm.dropTable("ingestion_stats", { ifExists: true, cascade: true });
+};
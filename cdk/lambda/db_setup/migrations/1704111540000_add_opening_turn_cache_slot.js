@@ -0,0 +1,33 @@
+// Each cached opening variant takes one numbered slot per (patient, prompt version, model). The unique
+// index turns the variant cap into a conditional write: concurrent writers racing for the same free
+// slot cannot both insert, so the pool never grows past OPENING_CACHE_VARIANTS.
+exports.up = (pgm) => {
+  pgm.addColumns('opening_turn_cache', {
+    slot: {
+      type: 'integer',
+    },
+  });
+
+  pgm.sql(`
+    UPDATE "opening_turn_cache" c
+    SET slot = r.n
+    FROM (
+      SELECT variant_id,
+             row_number() OVER (PARTITION BY patient_id, prompt_version, model_id ORDER BY created_at, variant_id) - 1 AS n
+      FROM "opening_turn_cache"
+    ) r
+    WHERE c.variant_id = r.variant_id
+  `);
+
+  pgm.alterColumn('opening_turn_cache', 'slot', { notNull: true });
+
+  pgm.sql(`
+    CREATE UNIQUE INDEX IF NOT EXISTS "opening_turn_cache_slot_idx"
+    ON "opening_turn_cache" (patient_id, prompt_version, model_id, slot)
+  `);
+};
+
+exports.down = (pgm) => {
+  pgm.sql(`DROP INDEX IF EXISTS "opening_turn_cache_slot_idx"`);
+  pgm.dropColumns('opening_turn_cache', ['slot']);
+};
@@ -113,6 +113,35 @@ def delete_last_two_db_messages(session_id):
         connection.rollback()
         return False
 
+def decrement_turn_counters(table_name, session_id, removed_messages):
+    """
+    Keep the session's turn counter item (used by text generation for session naming)
+    in step with the messages removed from the history.
+    """
+    message_types = [
+        item.get('M', {}).get('data', {}).get('M', {}).get('type', {}).get('S')
+        for item in removed_messages
+    ]
+    try:
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key={
+                'SessionId': {
+                    'S': f"{session_id}#turns"
+                }
+            },
+            UpdateExpression="ADD HumanCount :human, AiCount :ai",
+            ConditionExpression="attribute_exists(SessionId)",
+            ExpressionAttributeValues={
+                ":human": {"N": str(-message_types.count('human'))},
+                ":ai": {"N": str(-message_types.count('ai'))}
+            }
+        )
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        logger.info(f"No turn counters found for session_id: {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating turn counters: {e}")
+
 def lambda_handler(event, context):
     query_params = event.get("queryStringParameters", {})
 
@@ -173,8 +202,7 @@ def lambda_handler(event, context):
             }
 
         # Remove the last AI and human messages by popping the last two elements
-        history.pop()
-        history.pop()
+        removed = [history.pop(), history.pop()]
 
         # Update the conversation history in DynamoDB
         dynamodb_client.update_item(
@@ -192,6 +220,8 @@ def lambda_handler(event, context):
 
         logger.info(f"Successfully deleted the last human and AI messages in DynamoDB for session_id: {session_id}")
 
+        decrement_turn_counters(table_name, session_id, removed)
+
         if delete_last_two_db_messages(session_id):
             logger.info(f"Successfully deleted the last human and AI messages in RDS for session_id: {session_id}")
             return {
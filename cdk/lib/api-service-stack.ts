@@ -1218,6 +1218,16 @@ export class ApiServiceStack extends cdk.Stack {
       })
     );
 
+    // Warm the text generation Lambda ahead of classes starting sessions at the top of the hour
+    const textGenWarmUpRule = new events.Rule(this, `${id}-TextGenWarmUpRule`, {
+      schedule: events.Schedule.cron({ minute: "55" }),
+    });
+    textGenWarmUpRule.addTarget(
+      new targets.LambdaFunction(textGenLambdaDockerFunc, {
+        event: events.RuleTargetInput.fromObject({ warmup: true }),
+      })
+    );
+
     // Create S3 Bucket to handle documents for each simulation group
     const dataIngestionBucket = new s3.Bucket(
       this,
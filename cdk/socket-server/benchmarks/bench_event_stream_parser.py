@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: Nova Sonic output stream splitting
+Compares the previous str buffer + raw_decode loop with JSONEventSplitter on the same chunk sequence.
+
+Usage:
+    python benchmarks/bench_event_stream_parser.py
+    python benchmarks/bench_event_stream_parser.py --recording stream.jsonl
+
+A recording is a JSON-lines file with one {"bytes": "<base64>"} per chunk received from the stream.
+Without one, a synthetic conversation with realistic event sizes is generated.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from event_stream_parser import JSONEventSplitter
+
+
+def synthetic_stream(turns: int, chunk_size: int, seed: int = 7):
+    """One assistant turn = contentStart, a few textOutputs, ~40 audioOutputs of 1-8 KB base64, contentEnd"""
+    rng = random.Random(seed)
+    events = []
+    for turn in range(turns):
+        events.append({"event": {"contentStart": {"role": "ASSISTANT", "type": "TEXT"}}})
+        for _ in range(3):
+            events.append({"event": {"textOutput": {"role": "ASSISTANT", "content": "Well, um, I think it started \"last week\"."}}})
+        events.append({"event": {"contentEnd": {"type": "TEXT"}}})
+        events.append({"event": {"contentStart": {"role": "ASSISTANT", "type": "AUDIO"}}})
+        for _ in range(40):
+            pcm = rng.randbytes(rng.randint(768, 6144))
+            events.append({"event": {"audioOutput": {"content": base64.b64encode(pcm).decode("ascii")}}})
+        events.append({"event": {"contentEnd": {"type": "AUDIO"}}})
+
+    data = b"".join(json.dumps(e).encode("utf-8") for e in events)
+    if chunk_size <= 0:
+        # One event per receive(), as the SDK usually delivers them
+        return [json.dumps(e).encode("utf-8") for e in events], len(events)
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)], len(events)
+
+
+def load_recording(path: str):
+    with open(path) as f:
+        chunks = [base64.b64decode(json.loads(line)["bytes"]) for line in f if line.strip()]
+    return chunks, None
+
+
+def legacy_split(chunks):
+    """The loop previously in NovaSonic._process_responses"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    count = 0
+    for raw in chunks:
+        buffer += raw.decode("utf-8")
+        idx = 0
+        while True:
+            try:
+                obj, offset = decoder.raw_decode(buffer[idx:])
+            except json.JSONDecodeError:
+                break
+            idx += offset
+            count += 1
+        buffer = buffer[idx:]
+    return count
+
+
+def splitter_split(chunks):
+    splitter = JSONEventSplitter()
+    count = 0
+    for raw in chunks:
+        count += len(splitter.feed(raw))
+    return count
+
+
+def bench(name, fn, chunks, repeat):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    total = sum(len(c) for c in chunks)
+    print(f"{name:>10}: {best * 1000:8.1f} ms  {count:6d} events  {total / best / 1e6:7.1f} MB/s")
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="JSON-lines file of recorded stream chunks")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=0, help="re-chunk the synthetic stream (0 = one event per chunk)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.recording:
+        chunks, expected = load_recording(args.recording)
+    else:
+        chunks, expected = synthetic_stream(args.turns, args.chunk_size)
+
+    print(f"{len(chunks)} chunks, {sum(len(c) for c in chunks) / 1e6:.1f} MB")
+    legacy_time, legacy_count = bench("legacy", legacy_split, chunks, args.repeat)
+    splitter_time, splitter_count = bench("splitter", splitter_split, chunks, args.repeat)
+
+    assert legacy_count == splitter_count and (expected is None or splitter_count == expected)
+    print(f"speedup: {legacy_time / splitter_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,538 @@
+"""
+Load generator: N concurrent voice sessions against a fake Nova Sonic
+Runs the real voice_worker.py session code in a child process, with the Bedrock bidirectional stream
+replaced by a local fake that replays recorded output events at real-time pace, and drives it over
+the same framed stdin/stdout protocol server.js uses.
+
+Measured:
+    audio-in -> audio-out lag   end of user speech (first silent input chunk) to first AUDIO_OUT frame
+    event-loop stall            worst / total oversleep of a 10 ms ticker inside the worker
+    CPU per session             worker process CPU seconds / sessions
+    memory growth               worker RSS after the run minus RSS before the first session
+    DB writes per turn          statements and rows the voice writer would have issued
+
+Usage:
+    python benchmarks/bench_voice_sessions.py --sessions 20 --turns 5
+    python benchmarks/bench_voice_sessions.py --sessions 50 --speed 4 --judge-latency-ms 1500
+    python benchmarks/bench_voice_sessions.py --recording sonic_output.jsonl
+
+A recording is a JSON-lines file with one Nova Sonic output event ({"event": {...}}) per line;
+it is split into turns at each USER contentStart. Without one, a synthetic conversation is generated.
+PostgreSQL, DynamoDB, Secrets Manager and the judge models are faked in the worker (with configurable
+latency), so no AWS access is needed.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import resource
+import statistics
+from types import SimpleNamespace
+
+SOCKET_SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SOCKET_SERVER_DIR)
+
+from voice_framing import FRAME_CONTROL, FRAME_AUDIO_IN, FRAME_AUDIO_OUT, encode_frame, encode_control, read_frame
+
+INPUT_CHUNK_BYTES = 2048          # 1024 samples of 16 kHz 16-bit mono, 64 ms
+INPUT_BYTES_PER_SECOND = 16000 * 2
+OUTPUT_BYTES_PER_SECOND = 24000 * 2
+# The fake's voice activity detection: an input chunk of digital silence ends the user's turn
+SILENCE_MARKER = b'"content":"' + b"A" * 24
+
+
+# ─── Recorded / synthetic output ─────────────────────────────────────────────
+
+def synthetic_turns(turns: int, reply_seconds: float, seed: int = 7):
+    """One turn = USER transcript, speculative ASSISTANT text, reply audio in 100 ms chunks, final text"""
+    rng = random.Random(seed)
+    chunk = OUTPUT_BYTES_PER_SECOND // 10
+    result = []
+    for turn in range(turns):
+        events = [
+            {"event": {"contentStart": {"role": "USER", "type": "TEXT"}}},
+            {"event": {"textOutput": {"role": "USER", "content": f"How long have you had these symptoms, turn {turn}?"}}},
+            {"event": {"contentEnd": {"type": "TEXT"}}},
+            {"event": {"contentStart": {"role": "ASSISTANT", "type": "TEXT",
+                                        "additionalModelFields": "{\"generationStage\":\"SPECULATIVE\"}"}}},
+            {"event": {"textOutput": {"role": "ASSISTANT", "content": "Well, um, I think it started last week."}}},
+            {"event": {"contentEnd": {"type": "TEXT"}}},
+            {"event": {"contentStart": {"role": "ASSISTANT", "type": "AUDIO"}}},
+        ]
+        for _ in range(int(reply_seconds * 10)):
+            events.append({"event": {"audioOutput": {"content": base64.b64encode(rng.randbytes(chunk)).decode("ascii")}}})
+        events += [
+            {"event": {"contentEnd": {"type": "AUDIO"}}},
+            {"event": {"contentStart": {"role": "ASSISTANT", "type": "TEXT",
+                                        "additionalModelFields": "{\"generationStage\":\"FINAL\"}"}}},
+            {"event": {"textOutput": {"role": "ASSISTANT", "content": "Well, um, I think it started last week."}}},
+            {"event": {"contentEnd": {"type": "TEXT"}}},
+        ]
+        result.append(events)
+    return result
+
+
+def load_recording(path: str):
+    turns = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            content_start = event.get("event", {}).get("contentStart")
+            if not turns or (content_start and content_start.get("role") == "USER"):
+                turns.append([])
+            turns[-1].append(event)
+    return turns
+
+
+def load_turns(args):
+    if args.recording:
+        return load_recording(args.recording)
+    return synthetic_turns(args.turns, args.reply_seconds)
+
+
+def schedule_turn(events):
+    """
+    Precompute (offset_seconds, raw_bytes) for each event: audioOutput advances the clock by the
+    duration of its audio, everything else is sent at the current offset.
+    """
+    schedule = []
+    offset = 0.0
+    for event in events:
+        schedule.append((offset, json.dumps(event).encode("utf-8")))
+        audio = event.get("event", {}).get("audioOutput")
+        if audio:
+            offset += len(base64.b64decode(audio["content"])) / OUTPUT_BYTES_PER_SECOND
+    return schedule
+
+
+def turn_audio_chars(events):
+    return sum(len(e["event"]["audioOutput"]["content"]) for e in events if "audioOutput" in e.get("event", {}))
+
+
+# ─── Worker side: fake Bedrock stream and faked backends ─────────────────────
+
+class FakeSonicStream:
+    """
+    Stands in for the stream returned by invoke_model_with_bidirectional_stream.
+
+    Input events are inspected only for turn ends: the first silent audioInput after speech
+    triggers replay of the next recorded turn, `model_latency` later, paced in real time / `speed`.
+    """
+
+    def __init__(self, schedules, model_latency: float, speed: float):
+        self.input_stream = self
+        self._schedules = schedules
+        self._model_latency = model_latency
+        self._speed = speed
+        self._output = asyncio.Queue()
+        self._speaking = False
+        self._turn = 0
+        self._replay = None
+
+    async def send(self, chunk):
+        payload = chunk.value.bytes_
+        if b'"audioInput"' not in payload:
+            return
+        if SILENCE_MARKER not in payload:
+            self._speaking = True
+        elif self._speaking:
+            self._speaking = False
+            schedule = self._schedules[self._turn % len(self._schedules)]
+            self._turn += 1
+            self._replay = asyncio.get_running_loop().create_task(self._play(schedule))
+
+    async def _play(self, schedule):
+        loop = asyncio.get_running_loop()
+        start = loop.time() + self._model_latency
+        for offset, raw in schedule:
+            delay = start + offset / self._speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._output.put_nowait(SimpleNamespace(value=SimpleNamespace(bytes_=raw)))
+
+    async def close(self):
+        if self._replay:
+            self._replay.cancel()
+
+    async def await_output(self):
+        return None, self
+
+    async def receive(self):
+        return await self._output.get()
+
+
+class FakeBedrockRuntimeClient:
+    def __init__(self, schedules, model_latency: float, speed: float):
+        self._args = (schedules, model_latency, speed)
+
+    async def invoke_model_with_bidirectional_stream(self, operation_input):
+        return FakeSonicStream(*self._args)
+
+
+FAKE_EMPATHY_RESULT = {
+    "empathy_score": 4, "perspective_taking": 4, "emotional_resonance": 4, "acknowledgment": 3,
+    "language_communication": 4, "cognitive_empathy": 4, "affective_empathy": 3, "realism_flag": "realistic",
+    "judge_reasoning": {"overall_assessment": "You acknowledged the patient's concern clearly."},
+    "feedback": {"strengths": ["Clear question"], "areas_for_improvement": ["Reflect feelings"],
+                 "improvement_suggestions": ["Name the emotion you hear"]},
+}
+
+
+class WriteCounter:
+    """Replaces VoicePersistenceWriter._write_batch: counts what would be written, after a fake round trip"""
+
+    def __init__(self, writer, db_latency: float):
+        self.writer = writer
+        self.db_latency = db_latency
+        self.statements = 0
+
+    def __call__(self, batch):
+        for session_id in {w.session_id for w in batch}:
+            writes = [w for w in batch if w.session_id == session_id]
+            rows = {w.message_id for w in writes if w.kind in ("utterance", "turn")}
+            turns = [w for w in writes if w.kind == "turn"]
+            evaluations = [w for w in writes if w.kind == "empathy"]
+            # SAVEPOINT and RELEASE, one upsert, one UPDATE; after the commit one history update_item
+            # and one record_turn for the session's finished turns
+            self.statements += 2 + bool(rows) + bool(evaluations) + (2 if turns else 0)
+            self.writer.history_appends += len(turns)
+            self.writer.rows_written += len(rows)
+            self.writer.evaluations_attached += len(evaluations)
+        time.sleep(self.db_latency)
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StallSampler:
+    """10 ms ticker on the worker's loop; any oversleep is time the loop could not run callbacks"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_stall = 0.0
+        self.total_stall = 0.0
+        self.stalls_over_50ms = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            stall = loop.time() - before - self.interval
+            if stall > 0.002:
+                self.total_stall += stall
+                self.max_stall = max(self.max_stall, stall)
+                if stall > 0.05:
+                    self.stalls_over_50ms += 1
+
+
+def run_worker(args):
+    """Child process: the real VoiceWorker with the Bedrock stream and backends faked"""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+
+    import voice_worker
+    import nova_sonic
+    import langchain_chat_history
+    from voice_persistence import voice_writer
+    from voice_judge import voice_judge
+
+    schedules = [schedule_turn(events) for events in load_turns(args)]
+    model_latency = args.model_latency_ms / 1000
+    judge_latency = args.judge_latency_ms / 1000
+
+    def init_client(self):
+        self.client = FakeBedrockRuntimeClient(schedules, model_latency, args.speed)
+
+    def judge_invoke(region, model_id, body):
+        time.sleep(judge_latency)
+        text = "False" if "lite" in model_id else json.dumps(FAKE_EMPATHY_RESULT)
+        return {"output": {"message": {"content": [{"text": text}]}}}
+
+    nova_sonic.NovaSonic._init_client = init_client
+    nova_sonic.NovaSonic.get_system_prompt = lambda self, *a, **kw: self.get_default_system_prompt(self.patient_name)
+    nova_sonic.NovaSonic._get_empathy_prompt = lambda self: self._get_default_empathy_prompt()
+    langchain_chat_history.format_chat_history = lambda session_id, *a, **kw: ""
+    voice_judge._invoke = judge_invoke
+    writes = WriteCounter(voice_writer, args.db_latency_ms / 1000)
+    voice_writer._write_batch = writes
+
+    sampler = StallSampler()
+
+    class BenchVoiceWorker(voice_worker.VoiceWorker):
+        async def handle_command(self, command):
+            if command.get("type") != "bench_stats":
+                return await super().handle_command(command)
+            cpu = resource.getrusage(resource.RUSAGE_SELF)
+            self.emit(None, {
+                "type": "bench_stats",
+                "cpu_seconds": cpu.ru_utime + cpu.ru_stime,
+                "rss_bytes": current_rss_bytes(),
+                "max_rss_bytes": cpu.ru_maxrss * 1024,
+                "max_stall_ms": round(sampler.max_stall * 1000, 1),
+                "total_stall_ms": round(sampler.total_stall * 1000, 1),
+                "stalls_over_50ms": sampler.stalls_over_50ms,
+                "db_statements": writes.statements,
+                "writer": voice_writer.get_stats(),
+                "judge": voice_judge.get_stats(),
+            })
+
+    async def main():
+        worker = BenchVoiceWorker()
+        ticker = asyncio.create_task(sampler.run())
+        try:
+            await worker.run()
+        finally:
+            ticker.cancel()
+            await worker.shutdown()
+
+    asyncio.run(main())
+
+
+# ─── Driver side ─────────────────────────────────────────────────────────────
+
+class BenchSession:
+    def __init__(self, key: str):
+        self.key = key
+        self.ready = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.response_done = asyncio.Event()
+        self.expected_chars = 0
+        self.received_chars = 0
+        self.turn_ended_at = None
+        self.first_audio_at = None
+        self.lags = []
+        self.incomplete_turns = 0
+        self.errors = []
+
+    def on_control(self, message):
+        if message.get("type") == "text" and message.get("text") == "Nova Sonic ready":
+            self.ready.set()
+        elif message.get("type") == "session_closed":
+            self.closed.set()
+        elif message.get("type") == "error":
+            self.errors.append(message.get("error"))
+            self.ready.set()
+
+    def on_audio(self, payload: bytes):
+        now = time.perf_counter()
+        if self.first_audio_at is None and self.turn_ended_at is not None:
+            self.first_audio_at = now
+            self.lags.append(now - self.turn_ended_at)
+        self.received_chars += len(payload)
+        if self.received_chars >= self.expected_chars:
+            self.response_done.set()
+
+
+class LoadDriver:
+    def __init__(self, args, turns):
+        self.args = args
+        self.turns = turns
+        self.sessions = {}
+        self.proc = None
+        self.stats_waiter = None
+        rng = random.Random(11)
+        self.speech_b64 = base64.b64encode(rng.randbytes(INPUT_CHUNK_BYTES)).decode("ascii").encode("ascii")
+        self.silence_b64 = base64.b64encode(bytes(INPUT_CHUNK_BYTES)).decode("ascii").encode("ascii")
+        self.chunk_interval = INPUT_CHUNK_BYTES / INPUT_BYTES_PER_SECOND / args.speed
+
+    async def start_worker(self):
+        argv = [sys.executable, os.path.abspath(__file__), "--worker"] + self.args.worker_argv
+        log = open(self.args.worker_log, "ab") if self.args.worker_log else asyncio.subprocess.DEVNULL
+        self.proc = await asyncio.create_subprocess_exec(
+            *argv, cwd=SOCKET_SERVER_DIR,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=log,
+            limit=2 ** 20,
+        )
+        self.ready = asyncio.get_running_loop().create_future()
+        self.reader = asyncio.create_task(self.read_frames())
+        await asyncio.wait_for(self.ready, 60)
+
+    async def read_frames(self):
+        while True:
+            frame = await read_frame(self.proc.stdout)
+            if frame is None:
+                break
+            frame_type, key, payload = frame
+            if frame_type == FRAME_AUDIO_OUT:
+                session = self.sessions.get(key)
+                if session:
+                    session.on_audio(payload)
+                continue
+            if frame_type != FRAME_CONTROL:
+                continue
+            message = json.loads(payload)
+            if message.get("type") == "worker_ready":
+                self.ready.set_result(message)
+            elif message.get("type") == "bench_stats":
+                self.stats_waiter.set_result(message)
+            elif key in self.sessions:
+                self.sessions[key].on_control(message)
+
+    def send(self, data: bytes):
+        self.proc.stdin.write(data)
+
+    async def worker_stats(self):
+        self.stats_waiter = asyncio.get_running_loop().create_future()
+        self.send(encode_control("", {"type": "bench_stats"}))
+        return await asyncio.wait_for(self.stats_waiter, 30)
+
+    async def stream_audio(self, chunk: bytes, session: BenchSession, seconds: float = None, until: asyncio.Event = None):
+        """Send input chunks at real-time pace for `seconds`, or until `until` is set"""
+        loop = asyncio.get_running_loop()
+        frame = encode_frame(FRAME_AUDIO_IN, session.key, chunk)
+        next_at = loop.time()
+        deadline = next_at + seconds / self.args.speed if seconds is not None else None
+        while True:
+            if until is not None and until.is_set():
+                return
+            if deadline is not None and next_at >= deadline:
+                return
+            self.send(frame)
+            await self.proc.stdin.drain()
+            next_at += self.chunk_interval
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+    async def run_session(self, index: int):
+        key = f"bench-{index}"
+        session = self.sessions[key] = BenchSession(key)
+        self.send(encode_control(key, {
+            "type": "start_session",
+            "config": {
+                "session_id": key,
+                "patient_name": "Bench Patient",
+                "patient_prompt": "Seasonal allergies",
+                "llm_completion": self.args.llm_completion,
+            },
+            "credentials": None,
+        }))
+        await asyncio.wait_for(session.ready.wait(), 60)
+        if session.errors:
+            return session
+
+        self.send(encode_control(key, {"type": "start_audio"}))
+        for turn in range(self.args.turns):
+            events = self.turns[turn % len(self.turns)]
+            await self.stream_audio(self.speech_b64, session, seconds=self.args.speech_seconds)
+
+            session.expected_chars = turn_audio_chars(events)
+            session.received_chars = 0
+            session.first_audio_at = None
+            session.response_done.clear()
+            session.turn_ended_at = time.perf_counter()
+
+            # Keep the microphone open (silence) while the patient answers, as the browser does
+            timeout = schedule_turn(events)[-1][0] / self.args.speed + self.args.model_latency_ms / 1000 + 5
+            mic = asyncio.create_task(self.stream_audio(self.silence_b64, session, until=session.response_done))
+            try:
+                await asyncio.wait_for(session.response_done.wait(), timeout)
+            except asyncio.TimeoutError:
+                session.incomplete_turns += 1
+            session.response_done.set()
+            await mic
+            session.turn_ended_at = None
+
+        self.send(encode_control(key, {"type": "end_audio"}))
+        self.send(encode_control(key, {"type": "end_session"}))
+        await asyncio.wait_for(session.closed.wait(), 30)
+        return session
+
+    async def run(self):
+        await self.start_worker()
+        before = await self.worker_stats()
+        started = time.perf_counter()
+
+        async def staggered(index):
+            await asyncio.sleep(index * self.args.ramp_seconds)
+            return await self.run_session(index)
+
+        sessions = await asyncio.gather(*(staggered(i) for i in range(self.args.sessions)))
+        elapsed = time.perf_counter() - started
+        after = await self.worker_stats()
+
+        self.proc.stdin.close()
+        await self.proc.wait()
+        self.reader.cancel()
+        return sessions, before, after, elapsed
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(args, sessions, before, after, elapsed):
+    lags = [lag * 1000 for s in sessions for lag in s.lags]
+    turns = sum(len(s.lags) for s in sessions)
+    failed = [s for s in sessions if s.errors]
+    cpu = after["cpu_seconds"] - before["cpu_seconds"]
+    writer = after["writer"]
+
+    print(f"{args.sessions} sessions x {args.turns} turns in {elapsed:.1f} s (speed {args.speed}x)")
+    if failed:
+        print(f"  failed sessions:   {len(failed)} ({failed[0].errors[0]})")
+    print(f"  audio lag (ms):    p50 {percentile(lags, 50):.1f}  p95 {percentile(lags, 95):.1f}  "
+          f"p99 {percentile(lags, 99):.1f}  max {max(lags, default=float('nan')):.1f}"
+          f"  (mean {statistics.fmean(lags) if lags else float('nan'):.1f}, model latency {args.model_latency_ms} ms)")
+    print(f"  incomplete turns:  {sum(s.incomplete_turns for s in sessions)}")
+    print(f"  loop stall:        max {after['max_stall_ms']} ms  total {after['total_stall_ms']} ms  "
+          f">50ms {after['stalls_over_50ms']}")
+    print(f"  worker CPU:        {cpu:.2f} s total, {cpu / max(1, args.sessions) * 1000:.1f} ms per session")
+    print(f"  worker RSS:        {(after['rss_bytes'] - before['rss_bytes']) / 2 ** 20:+.1f} MB "
+          f"(peak {after['max_rss_bytes'] / 2 ** 20:.1f} MB)")
+    print(f"  DB per turn:       {after['db_statements'] / max(1, turns):.2f} statements, "
+          f"{writer['rows_written'] / max(1, turns):.2f} rows, {writer['evaluations_attached'] / max(1, turns):.2f} evaluations"
+          f"  (max writer lag {writer['max_lag_ms']} ms)")
+    print(f"  judge:             {after['judge']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5, help="user turns per session")
+    parser.add_argument("--recording", help="JSON-lines file of recorded Nova Sonic output events")
+    parser.add_argument("--reply-seconds", type=float, default=3.0, help="synthetic reply audio per turn")
+    parser.add_argument("--speech-seconds", type=float, default=2.0, help="user speech per turn")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression for audio pacing")
+    parser.add_argument("--ramp-seconds", type=float, default=0.1, help="delay between session starts")
+    parser.add_argument("--model-latency-ms", type=int, default=0, help="fake time to first response event")
+    parser.add_argument("--judge-latency-ms", type=int, default=800)
+    parser.add_argument("--db-latency-ms", type=int, default=5)
+    parser.add_argument("--llm-completion", action="store_true", help="also run the diagnosis judge per turn")
+    parser.add_argument("--worker-log", help="append the worker's stderr to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    # The worker replays the same turns with the same latencies
+    args.worker_argv = [
+        "--turns", str(args.turns), "--reply-seconds", str(args.reply_seconds), "--speed", str(args.speed),
+        "--model-latency-ms", str(args.model_latency_ms), "--judge-latency-ms", str(args.judge_latency_ms),
+        "--db-latency-ms", str(args.db_latency_ms),
+    ] + (["--recording", os.path.abspath(args.recording)] if args.recording else [])
+
+    turns = load_turns(args)
+    driver = LoadDriver(args, turns)
+    sessions, before, after, elapsed = asyncio.run(driver.run())
+    report(args, sessions, before, after, elapsed)
+
+
+if __name__ == "__main__":
+    main()
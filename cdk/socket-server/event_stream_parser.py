@@ -0,0 +1,113 @@
+"""
+Incremental splitter for the concatenated JSON events Nova Sonic streams back
+Finds object boundaries on the raw bytes and parses each complete event exactly once
+"""
+
+import json
+import re
+from typing import Any, Dict, List
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib parser is used otherwise
+    orjson = None
+
+# Outside a string only braces and quotes matter; inside one only quotes and backslashes do,
+# so string content (e.g. base64 audio) is skipped with bytearray.find instead of byte by byte
+STRUCTURAL = re.compile(rb'[{}"]')
+
+OPEN_BRACE = ord("{")
+CLOSE_BRACE = ord("}")
+QUOTE = ord('"')
+
+
+def _loads(data) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data if isinstance(data, bytes) else bytes(data))
+
+
+class JSONEventSplitter:
+    """
+    Splits a byte stream of back-to-back JSON objects into parsed events.
+
+    Bytes are appended to one bytearray and scanned once: the brace depth and string/escape state
+    are kept between feed() calls, so a large event arriving over many chunks is never rescanned
+    or re-sliced, and consumed bytes are dropped from the front of the buffer in place.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0          # next byte to scan
+        self._start = -1       # offset of the current top-level "{", -1 between objects
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """Add received bytes and return every event completed by them"""
+        buffer = self._buffer
+
+        # Fast path: the stream usually delivers exactly one whole event per chunk
+        if not buffer and data[:1] == b"{" and data[-1:] == b"}":
+            try:
+                return [_loads(data)]
+            except ValueError:
+                pass  # several events or a split one; fall through to scanning
+
+        buffer += data
+        events = []
+        pos = self._pos
+        end = len(buffer)
+
+        while pos < end:
+            if self._in_string:
+                # memchr-speed jump to the closing quote, then look for escapes only inside that span
+                quote = buffer.find(b'"', pos)
+                backslash = buffer.find(b"\\", pos, end if quote < 0 else quote)
+                if backslash >= 0:
+                    if backslash + 1 < end:
+                        pos = backslash + 2  # skip the escaped character
+                        continue
+                    pos = backslash  # escape split across chunks; rescan the backslash next time
+                    break
+                if quote < 0:
+                    pos = end
+                    break
+                pos = quote + 1
+                self._in_string = False
+                continue
+
+            match = STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = end
+                break
+            pos = match.end()
+            char = buffer[pos - 1]
+
+            if char == QUOTE:
+                self._in_string = True
+            elif char == OPEN_BRACE:
+                if self._depth == 0:
+                    self._start = pos - 1
+                self._depth += 1
+            elif char == CLOSE_BRACE and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    with memoryview(buffer) as view:
+                        events.append(_loads(view[self._start:pos]))
+                    self._start = -1
+
+        # Drop everything before the unfinished object (or everything, between objects)
+        consumed = self._start if self._start >= 0 else pos
+        if consumed:
+            del buffer[:consumed]
+            pos -= consumed
+            if self._start >= 0:
+                self._start -= consumed
+
+        self._pos = pos
+        return events
+
+    def pending_bytes(self) -> int:
+        """Bytes buffered for an event that has not completed yet"""
+        return len(self._buffer)
@@ -0,0 +1,66 @@
+// Length-prefixed binary framing for the server.js <-> voice worker pipe (mirrors voice_framing.py)
+//
+//   uint32 BE  length of everything after this field
+//   uint8      frame type
+//   uint8      session key length
+//   bytes      session key (utf-8)
+//   bytes      payload
+
+const FRAME_CONTROL = 0; // JSON command or event
+const FRAME_AUDIO_IN = 1; // microphone audio, server.js -> worker
+const FRAME_AUDIO_OUT = 2; // synthesized speech, worker -> server.js
+const FRAME_METRICS = 3; // periodic JSON metrics line, worker -> server.js
+
+function encodeFrame(type, sessionKey, payload) {
+  const key = Buffer.from(sessionKey || "", "utf8");
+  const header = Buffer.allocUnsafe(6);
+  header.writeUInt32BE(2 + key.length + payload.length, 0);
+  header.writeUInt8(type, 4);
+  header.writeUInt8(key.length, 5);
+  return Buffer.concat([header, key, payload]);
+}
+
+function encodeControl(sessionKey, message) {
+  return encodeFrame(FRAME_CONTROL, sessionKey, Buffer.from(JSON.stringify(message), "utf8"));
+}
+
+// Accumulates pipe chunks and calls onFrame(type, sessionKey, payload) per complete frame
+class FrameDecoder {
+  constructor(onFrame) {
+    this.onFrame = onFrame;
+    this.buffer = Buffer.alloc(0);
+  }
+
+  push(chunk) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    let offset = 0;
+    while (this.buffer.length - offset >= 4) {
+      const length = this.buffer.readUInt32BE(offset);
+      if (this.buffer.length - offset - 4 < length) {
+        break;
+      }
+      const type = this.buffer.readUInt8(offset + 4);
+      const keyLength = this.buffer.readUInt8(offset + 5);
+      const keyStart = offset + 6;
+      const payloadStart = keyStart + keyLength;
+      const end = offset + 4 + length;
+      this.onFrame(
+        type,
+        this.buffer.toString("utf8", keyStart, payloadStart),
+        this.buffer.subarray(payloadStart, end)
+      );
+      offset = end;
+    }
+    this.buffer = this.buffer.subarray(offset);
+  }
+}
+
+module.exports = {
+  FRAME_CONTROL,
+  FRAME_AUDIO_IN,
+  FRAME_AUDIO_OUT,
+  FRAME_METRICS,
+  encodeFrame,
+  encodeControl,
+  FrameDecoder,
+};
@@ -17,6 +17,10 @@ connection = None
 db_secret = None
 
 secrets_manager_client = boto3.client("secretsmanager")
+dynamodb_client = boto3.client("dynamodb")
+
+# Suffix of the sibling DynamoDB item holding a session's message counters (see text_generation chat.py)
+TURN_COUNTER_SUFFIX = "#turns"
 
 RDS_PROXY_ENDPOINT = os.environ.get("RDS_PROXY_ENDPOINT")  # Replace with your actual RDS proxy endpoint
 DB_SECRET_NAME = os.environ.get("SM_DB_CREDENTIALS")  # Replace with your actual secret name
@@ -52,6 +56,67 @@ def add_message(session_id: str, role: str, content: str, table_name: str = "Dyn
         logger.error(f"❌ Failed to insert message into PostgreSQL: {e}")
 
 
+def record_turn(table_name: str, session_id: str, human_messages: int = 0, ai_messages: int = 0) -> dict:
+    """
+    Atomically add to the per-session message counters kept alongside the history (see text_generation
+    chat.py record_turn). Called after the messages are in the history: a session without a counter item
+    has it seeded from the history instead, so its totals start out right.
+    """
+    counter_key = {"SessionId": {"S": f"{session_id}{TURN_COUNTER_SUFFIX}"}}
+    increment = {
+        "TableName": table_name,
+        "Key": counter_key,
+        "UpdateExpression": "ADD HumanCount :human, AiCount :ai",
+        "ExpressionAttributeValues": {
+            ":human": {"N": str(human_messages)},
+            ":ai": {"N": str(ai_messages)}
+        },
+        "ReturnValues": "UPDATED_NEW"
+    }
+    try:
+        response = dynamodb_client.update_item(**increment, ConditionExpression="attribute_exists(SessionId)")
+        return parse_turn_counts(response.get("Attributes", {}))
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        pass
+
+    turn_counts = count_history_messages(table_name, session_id)
+    try:
+        dynamodb_client.put_item(
+            TableName=table_name,
+            Item={
+                **counter_key,
+                "HumanCount": {"N": str(turn_counts["human"])},
+                "AiCount": {"N": str(turn_counts["ai"])}
+            },
+            ConditionExpression="attribute_not_exists(SessionId)"
+        )
+        return turn_counts
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        # A concurrent turn seeded the counters first
+        response = dynamodb_client.update_item(**increment)
+        return parse_turn_counts(response.get("Attributes", {}))
+
+
+def count_history_messages(table_name: str, session_id: str) -> dict:
+    """Count a session's human and AI messages in its DynamoDB history item (LangChain's message dicts)."""
+    response = dynamodb_client.get_item(
+        TableName=table_name,
+        Key={"SessionId": {"S": session_id}},
+        ProjectionExpression="History"
+    )
+    messages = response.get("Item", {}).get("History", {}).get("L", [])
+    types = [m.get("M", {}).get("type", {}).get("S") for m in messages]
+    return {"human": types.count("human"), "ai": types.count("ai")}
+
+
+def parse_turn_counts(attributes: dict) -> dict:
+    """Convert DynamoDB counter attributes into a {'human': int, 'ai': int} dict."""
+    return {
+        "human": int(attributes.get("HumanCount", {}).get("N", 0)),
+        "ai": int(attributes.get("AiCount", {}).get("N", 0))
+    }
+
+
 def get_secret(secret_name, expect_json=True):
     global db_secret
     if db_secret is None:
@@ -5,6 +5,7 @@ import base64
 import json
 import uuid
 import random
+import time
 import boto3
 import botocore
 from aws_sdk_bedrock_runtime.client import BedrockRuntimeClient, InvokeModelWithBidirectionalStreamOperationInput
@@ -16,15 +17,38 @@ from psycopg2 import pool
 from datetime import datetime
 import logging
 import requests
-from langchain_community.embeddings import BedrockEmbeddings
-from langchain_community.vectorstores import PGVector
 from voice_db_manager import voice_db_manager, get_pg_connection, return_pg_connection
+from voice_persistence import voice_writer
+from event_stream_parser import JSONEventSplitter
+from voice_audio_egress import AudioEgress
+from voice_audio_ingress import AudioIngress
+from voice_retrieval import voice_retrieval, MEDICAL_CONTEXT_QUERY
+from voice_utterance import UtteranceAggregator
+from voice_judge import voice_judge
+from voice_metrics import voice_metrics
+from voice_logging import configure_voice_logging
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+class StaticCredentialsResolver:
+    """Identity resolver handing the bidirectional stream the caller's own STS credentials,
+    so sessions of different users can share one process"""
+
+    def __init__(self, credentials):
+        from smithy_aws_core.identity import AWSCredentialsIdentity
+        self._identity = AWSCredentialsIdentity(
+            access_key_id=credentials["access_key_id"],
+            secret_access_key=credentials["secret_access_key"],
+            session_token=credentials.get("session_token"),
+        )
+
+    async def get_identity(self, **kwargs):
+        return self._identity
+
+
 # Audio config
 INPUT_SAMPLE_RATE = 16000
 OUTPUT_SAMPLE_RATE = 24000
@@ -38,8 +62,13 @@ class NovaSonic:
         # Credentials already set by server.js via STS
         pass
 
-    def __init__(self, model_id='amazon.nova-sonic-v1:0', region=None, socket_client=None, voice_id=None, session_id=None):
-        self.user_id = os.getenv("USER_ID")
+    def __init__(self, model_id='amazon.nova-sonic-v1:0', region=None, socket_client=None, voice_id=None, session_id=None,
+                 config=None, credentials=None, emit=None, emit_audio=None, transport_drain=None):
+        # Per-session settings come from `config` in the multi-session worker, from env vars otherwise
+        config = config or {}
+        self.credentials = credentials
+        self.emit = emit
+        self.user_id = config.get("user_id", os.getenv("USER_ID"))
         self.model_id = model_id
         self.region = 'us-east-1'
         self.deployment_region = region or os.getenv('AWS_REGION', 'us-east-1')
@@ -50,40 +79,53 @@ class NovaSonic:
         self.prompt_name = str(uuid.uuid4())
         self.content_name = str(uuid.uuid4())
         self.audio_content_name = str(uuid.uuid4())
-        self.audio_queue = asyncio.Queue()
         self.role = None
         self.display_assistant_text = False
+        self.generation_stage = None
         self.voice_id = voice_id
         self.session_id = session_id or os.getenv("SESSION_ID", "default")
-        self.patient_name = os.getenv("PATIENT_NAME", "")
-        self.patient_prompt = os.getenv("PATIENT_PROMPT", "")
-        self.llm_completion = os.getenv("LLM_COMPLETION", "false").lower() == "true"
-        self.extra_system_prompt = os.getenv("EXTRA_SYSTEM_PROMPT", "")
-        self.patient_id = os.getenv("PATIENT_ID", "")
-        # Cache system prompt and bedrock client
+        self.patient_name = config.get("patient_name", os.getenv("PATIENT_NAME", ""))
+        self.patient_prompt = config.get("patient_prompt", os.getenv("PATIENT_PROMPT", ""))
+        self.llm_completion = bool(config["llm_completion"]) if "llm_completion" in config else os.getenv("LLM_COMPLETION", "false").lower() == "true"
+        self.extra_system_prompt = config.get("system_prompt", os.getenv("EXTRA_SYSTEM_PROMPT", ""))
+        self.patient_id = config.get("patient_id", os.getenv("PATIENT_ID", ""))
+        # Cache system prompt
         self._cached_system_prompt = None
-        self._bedrock_client = None
         self._chat_context = None
-        self._current_user_input = ""
+        # Transcript turn sequence; with stream_id it keys each utterance in the voice writer
+        self.stream_id = str(uuid.uuid4())
+        self._turn_seq = 0
+        self._turn_role = None
+        # Synthesized speech goes out through a bounded buffer, still base64 encoded
+        self.audio_egress = AudioEgress(emit_audio or self._emit_audio_json, drain=transport_drain)
+        # Microphone audio comes in through a bounded queue, so a slow stream only delays this session
+        self.audio_ingress = AudioIngress(self.send_audio_base64)
+        # User transcript fragments are evaluated once per utterance
+        self.utterances = UtteranceAggregator(self._evaluate_utterance)
 
     def _init_client(self):
         """Initialize the Bedrock Client for Nova"""
         try:
-            print(f"🔧 Initializing Bedrock client for region: {self.region}", flush=True)
+            logger.info(f"🔧 Initializing Bedrock client for region: {self.region}")
             
             # Use AWS recommended approach with updated import for EnvironmentCredentialsResolver
             from smithy_aws_core.identity.environment import EnvironmentCredentialsResolver
             
+            if self.credentials:
+                credentials_resolver = StaticCredentialsResolver(self.credentials)
+            else:
+                credentials_resolver = EnvironmentCredentialsResolver()
+            
             config = Config(
                 endpoint_uri=f"https://bedrock-runtime.{self.region}.amazonaws.com",
                 region=self.region,
-                aws_credentials_identity_resolver=EnvironmentCredentialsResolver(),
+                aws_credentials_identity_resolver=credentials_resolver,
             )
             
             self.client = BedrockRuntimeClient(config=config)
-            print(f"✅ Initialized Bedrock client for model {self.model_id} in region {self.region}", flush=True)
+            logger.info(f"✅ Initialized Bedrock client for model {self.model_id} in region {self.region}")
         except Exception as e:
-            print(f"❌ Failed to initialize Bedrock client: {e}", flush=True)
+            logger.error(f"❌ Failed to initialize Bedrock client: {e}")
             raise e
 
     async def send_event(self, event: dict):
@@ -185,8 +227,7 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         self.stream = await self.client.invoke_model_with_bidirectional_stream(
             InvokeModelWithBidirectionalStreamOperationInput(model_id=self.model_id)
         )
-        print("✅ Bidirectional stream initialized with Nova Sonic", flush=True)
-        print(f"🗂️ Using session_id: {self.session_id}", flush=True)
+        logger.info(f"✅ Bidirectional stream initialized with Nova Sonic (session_id: {self.session_id})")
         
         self.is_active = True
 
@@ -249,12 +290,14 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         }
         })
 
-        # Cache chat context to avoid repeated DB calls
+        # Cache chat context to avoid repeated DB calls; both lookups block, so keep them off the event loop
+        loop = asyncio.get_running_loop()
         if not self._chat_context:
-            self._chat_context = langchain_chat_history.format_chat_history(self.session_id)
+            self._chat_context = await loop.run_in_executor(None, langchain_chat_history.format_chat_history, self.session_id)
+        base_system_prompt = await loop.run_in_executor(None, self.get_system_prompt)
 
         system_prompt = f"""
-                        {self.get_system_prompt()}
+                        {base_system_prompt}
                         {self._chat_context}
                         """
         
@@ -282,12 +325,11 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         # Start processing responses
         self.response = asyncio.create_task(self._process_responses())
 
-        print(f"✅ Nova Sonic session started (Prompt ID: {self.prompt_name})", flush=True)
-        print(json.dumps({ "type": "text", "text": "Nova Sonic ready" }), flush=True)
+        logger.info(f"✅ Nova Sonic session started (Prompt ID: {self.prompt_name})")
+        self._emit({ "type": "text", "text": "Nova Sonic ready" })
 
     async def start_audio_input(self):
         self.audio_content_name = str(uuid.uuid4())
-        self._current_user_input = ""  # Track user input for empathy evaluation
         await self.send_event({
         "event": {
             "contentStart": {
@@ -309,7 +351,11 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         })
     
     async def send_audio_chunk(self, audio_bytes):
-        blob = base64.b64encode(audio_bytes).decode("utf-8")
+        await self.send_audio_base64(base64.b64encode(audio_bytes).decode("utf-8"))
+
+    async def send_audio_base64(self, blob):
+        """Forward microphone audio that is already base64 encoded, as Nova Sonic expects it"""
+        voice_metrics.audio_in(len(blob))
         await self.send_event({
         "event": {
             "audioInput": {
@@ -330,41 +376,26 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         }
         })
         
-        # Trigger empathy evaluation for the completed user audio input if enabled
-        if hasattr(self, '_current_user_input') and self._current_user_input and self._current_user_input.strip():
-            print(f"🔍 DEBUG: Audio ended, user input: {self._current_user_input[:50]}...", flush=True)
-            logger.info(f"🎤 AUDIO END - User input: {self._current_user_input[:30]}...")
-            
-            # Save user message to DB (CRITICAL for empathy coach review)
-            print(f"💾 AUDIO END: Saving accumulated user input to DB", flush=True)
-            asyncio.create_task(self._save_user_message_async(self._current_user_input))
-            
-            # CRITICAL: Direct empathy evaluation for voice input
-            print(f"🧠 AUDIO END: Starting DIRECT empathy evaluation for voice input", flush=True)
+        # End of microphone input ends the user's turn: evaluate the whole utterance once
+        self.utterances.end_turn()
+
+    async def _evaluate_utterance(self, text, message_id):
+        """One empathy judge call (and one diagnosis check) per completed user utterance"""
+        try:
+            logger.debug("🧠 VOICE EMPATHY: Evaluating utterance: %s...", text[:50])
             patient_context = f"Patient: {self.patient_name}, Condition: {self.patient_prompt}"
+            evaluations = [self._evaluate_empathy(text, patient_context, message_id)]
             
-            # CRITICAL FIX: Capture the user input BEFORE creating async task to prevent race condition
-            captured_user_input = self._current_user_input
-            print(f"🔍 CRITICAL FIX: Captured user input: '{captured_user_input}'", flush=True)
+            # Check for diagnosis if LLM completion is enabled
+            if self.llm_completion:
+                evaluations.append(self._evaluate_diagnosis_async(text))
             
-            # Create empathy evaluation task with proper error handling
-            async def safe_empathy_eval():
-                try:
-                    print(f"🧠 VOICE EMPATHY: Starting evaluation task", flush=True)
-                    result = await self._evaluate_empathy(captured_user_input, patient_context)
-                    if result:
-                        print(f"🧠 VOICE EMPATHY: Evaluation completed successfully", flush=True)
-                    else:
-                        print(f"🧠 VOICE EMPATHY: Evaluation returned None", flush=True)
-                except Exception as e:
-                    print(f"🧠 VOICE EMPATHY: Evaluation failed with error: {e}", flush=True)
-                    logger.error(f"Voice empathy evaluation error: {e}")
-            
-            asyncio.create_task(safe_empathy_eval())
-            
-            self._current_user_input = ""  # Reset for next input
-        else:
-            print(f"🔍 DEBUG: No user input to save at audio end", flush=True)
+            await asyncio.gather(*evaluations)
+        except asyncio.CancelledError:
+            logger.info(f"🧠 VOICE EMPATHY: Evaluation cancelled for: {text[:30]}...")
+            raise
+        except Exception as e:
+            logger.error(f"Voice empathy evaluation error: {e}")
 
     async def end_session(self):
         # promptEnd
@@ -378,40 +409,43 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
         "event": { "sessionEnd": {} }
         })
         await self.stream.input_stream.close()
+        await self.audio_ingress.close()
+        self.utterances.cancel()
+        voice_judge.cancel_session(self.stream_id)
+        voice_writer.forget_session(self.session_id)
+        voice_retrieval.forget_session(self.stream_id)
+        await self.audio_egress.close()
+        logger.info(f"🔊 AUDIO_EGRESS_STATS at session end: {self.audio_egress.get_stats()}")
+        logger.info(f"🧠 UTTERANCE_STATS at session end: {self.utterances.get_stats()}")
+        logger.info(f"🔗 VOICE_WRITER_STATS at session end: {voice_writer.get_stats()}")
     
     async def handle_manual_empathy_evaluation(self, text, session_id=None):
         """Handle manual empathy evaluation requests from server.js"""
         try:
-            print(f"🧠 MANUAL EMPATHY: Received request for text: {text[:50]}...", flush=True)
             logger.info(f"🧠 Manual empathy evaluation requested for: {text[:30]}...")
             
             # Use provided session_id or fall back to instance session_id
             eval_session_id = session_id or self.session_id
             
             # Save the user message first
-            print(f"💾 MANUAL EMPATHY: Saving user message to DB", flush=True)
-            await self._save_user_message_async(text)
+            message_id = self._record_utterance("user", text)
             
             # Run empathy evaluation
-            print(f"🧠 MANUAL EMPATHY: Starting empathy evaluation", flush=True)
             patient_context = f"Patient: {self.patient_name}, Condition: {self.patient_prompt}"
-            empathy_result = await self._evaluate_empathy(text, patient_context)
+            empathy_result = await self._evaluate_empathy(text, patient_context, message_id)
             
             if empathy_result:
-                print(f"🧠 MANUAL EMPATHY: Evaluation successful", flush=True)
                 logger.info(f"🧠 Manual empathy evaluation completed successfully")
             else:
-                print(f"🧠 MANUAL EMPATHY: Evaluation failed", flush=True)
                 logger.warning(f"🧠 Manual empathy evaluation failed")
                 
         except Exception as e:
-            print(f"🧠 MANUAL EMPATHY ERROR: {e}", flush=True)
             logger.error(f"🧠 Manual empathy evaluation error: {e}")
 
     async def _process_responses(self):
         """Process responses from the stream, buffering partial JSON."""
-        decoder = json.JSONDecoder()
-        buffer = ""  # accumulate incoming text here
+        # Splits the raw bytes into events without re-slicing or re-decoding the pending tail
+        splitter = JSONEventSplitter()
 
         try:
             while self.is_active:
@@ -421,39 +455,35 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
                 if not (result.value and result.value.bytes_):
                     continue
 
-                # 1) Decode the raw bytes
-                chunk = result.value.bytes_.decode("utf-8")
-                buffer += chunk
-
-                # 2) Try to peel off as many complete JSON objects as possible
-                idx = 0
-                while True:
-                    try:
-                        obj, offset = decoder.raw_decode(buffer[idx:])
-                    except json.JSONDecodeError:
-                        break
-                    idx += offset
-                    # 3) Hand off each parsed object
+                # Hand off each complete JSON object
+                for obj in splitter.feed(result.value.bytes_):
                     await self._handle_event(obj)
 
-                # 4) Keep only the unparsed tail
-                buffer = buffer[idx:]
-
         except Exception as e:
-            print(f"🔥 Error in _process_responses(): {e}", flush=True)
+            logger.error(f"🔥 Error in _process_responses(): {e}")
 
     async def _handle_event(self, json_data):
-        """Dispatch one parsed JSON event to your existing logic."""
-        evt = json_data.get("event", {})
-        
+        """Dispatch one parsed JSON event to your existing logic, timing each branch for the voice metrics."""
+        started = time.perf_counter()
+        branch = await self._dispatch_event(json_data.get("event", {}))
+        voice_metrics.observe_handler(branch, time.perf_counter() - started)
+
+    async def _dispatch_event(self, evt):
+        """Handle one output event; returns the name of the branch taken"""
         # contentStart
         if "contentStart" in evt:
             content_start = evt["contentStart"]
             self.role = content_start.get("role")
+            # The model answering means the user's turn is over
+            if self.role == "ASSISTANT":
+                self.utterances.end_turn()
             # optional SPECULATIVE check
+            self.generation_stage = None
             if "additionalModelFields" in content_start:
                 fields = json.loads(content_start["additionalModelFields"])
-                self.display_assistant_text = (fields.get("generationStage") == "SPECULATIVE")
+                self.generation_stage = fields.get("generationStage")
+                self.display_assistant_text = (self.generation_stage == "SPECULATIVE")
+            return "contentStart"
 
         # textOutput
         elif "textOutput" in evt:
@@ -461,8 +491,10 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
             
             # Filter only the specific interrupted JSON message
             if text.strip() == '{"interrupted": true}':
-                print(f"Filtered interrupted message", flush=True)
-                return
+                logger.debug("Filtered interrupted message")
+                # The user barged in; speech still queued for the old response is stale
+                self.audio_egress.clear()
+                return "interrupted"
             
             # Check for diagnosis completion
             diagnosis_achieved = "SESSION COMPLETED" in text
@@ -473,78 +505,49 @@ Never provide medical advice, diagnoses, or pharmaceutical recommendations. Alwa
                 text += " I really appreciate your feedback. You may continue practicing with other patients. Goodbye."
             
             if self.role == "ASSISTANT":
-                print(f"Assistant: {text}", flush=True)
-                print(json.dumps({"type": "text", "text": text}), flush=True)
+                logger.debug("Assistant: %s", text)
+                self._emit({"type": "text", "text": text})
                 
                 # If diagnosis achieved, signal completion
                 if diagnosis_achieved and self.llm_completion:
-                    print(json.dumps({"type": "diagnosis_complete", "text": "Session completed successfully"}), flush=True)
+                    self._emit({"type": "diagnosis_complete", "text": "Session completed successfully"})
+
+                # Save ASSISTANT messages to the messages table and chat history
+                if text.strip():
+                    self._record_utterance("ai", text, self.generation_stage)
 
             elif self.role == "USER":
-                print(f"User: {text}", flush=True)
-                print(json.dumps({"type": "text", "text": text}), flush=True)
-                
-                # CRITICAL FIX: Accumulate user input for empathy evaluation
-                if not hasattr(self, '_current_user_input'):
-                    self._current_user_input = ""
-                
-                # CRITICAL: Ensure we're accumulating the actual text
-                if text and text.strip():
-                    self._current_user_input += text
-                    print(f"🔍 DEBUG: Accumulated user input now: {len(self._current_user_input)} chars", flush=True)
+                logger.debug("User: %s", text)
+                self._emit({"type": "text", "text": text})
                 
                 # CRITICAL FIX: Save USER message to database immediately
                 if text.strip():
-                    print(f"💾 SAVING USER MESSAGE TO DB: {text[:50]}...", flush=True)
-                    asyncio.create_task(self._save_user_message_async(text))
+                    message_id = self._record_utterance("user", text)
                     
-                    logger.info(f"🧠 USER MESSAGE - Checking empathy: {text[:30]}...")
-                    
-                    # Use the direct empathy evaluation method for voice inputs
-                    patient_context = f"Patient: {self.patient_name}, Condition: {self.patient_prompt}"
-                    asyncio.create_task(self._evaluate_empathy(text, patient_context))
-                    
-                    # Check for diagnosis if LLM completion is enabled
-                    if self.llm_completion:
-                        asyncio.create_task(self._evaluate_diagnosis_async(text))
-
-            logger.info(f"💬 [add_message] {self.role.upper()} | {self.session_id} | {text[:30]}")
+                    # Empathy and diagnosis run once the whole utterance is in (see UtteranceAggregator)
+                    self.utterances.add_fragment(text, message_id)
 
-            # Mirror to PostgreSQL
-            try:
-                normalized_role = "ai" if self.role and self.role.upper() == "ASSISTANT" else "user"
-                langchain_chat_history.add_message(self.session_id, normalized_role, text)
-                
-                # Save ALL messages to messages table (both USER and ASSISTANT)
-                if self.role and self.role.upper() == "ASSISTANT":
-                    print(f"💾 SAVING ASSISTANT MESSAGE TO DB: {text[:50]}...", flush=True)
-                    self._save_message_to_db(self.session_id, False, text, None)
-                elif self.role and self.role.upper() == "USER":
-                    print(f"💾 SAVING USER MESSAGE TO DB (BACKUP): {text[:50]}...", flush=True)
-                    # Backup save in case async save fails
-                    self._save_message_to_db(self.session_id, True, text, None)
-                    
-                logger.info(f"💬 [PG INSERT] {normalized_role.upper()} | {self.session_id} | {text[:30]}")
-            except Exception as e:
-                print(f"❌ Failed to insert message into PostgreSQL: {e}", flush=True)
+            logger.debug("💬 [PG QUEUED] %s | %s | %s | depth=%d", self.role, self.session_id, text[:30], voice_writer.queue_depth())
+            return "textOutput"
 
         # audioOutput
         elif "audioOutput" in evt:
-            b64 = evt["audioOutput"]["content"]
-            audio_bytes = base64.b64decode(b64)
-            await self.audio_queue.put(audio_bytes)
-            print(json.dumps({
-                "type": "audio",
-                "data": b64,
-                "size": len(audio_bytes)
-            }), flush=True)
-
-    def _get_bedrock_client(self):
-        """Cached bedrock client"""
-        if not self._bedrock_client:
-            self._bedrock_client = boto3.client("bedrock-runtime", region_name="us-east-1")
-        return self._bedrock_client
-    
+            self.audio_egress.push(evt["audioOutput"]["content"])
+            return "audioOutput"
+
+        return next(iter(evt), "unknown")
+
+    def _emit_audio_json(self, audio_b64):
+        """Audio as a JSON line, for the standalone process without binary framing"""
+        self._emit({"type": "audio", "data": audio_b64})
+
+    def _emit(self, payload):
+        """Send one protocol message to server.js (tagged with the session by the worker)"""
+        if self.emit:
+            self.emit(payload)
+        else:
+            print(json.dumps(payload), flush=True)
+
     def _get_empathy_prompt(self):
         """Retrieve the latest empathy prompt from the empathy_prompt_history table using centralized connection manager."""
         try:
@@ -700,23 +703,20 @@ Provide structured evaluation with detailed justifications for each score.
 }}
 """
     
-    async def _save_user_message_async(self, user_text):
-        """Save user message to database asynchronously"""
+    def _record_utterance(self, role, text, stage=None):
+        """Persist one transcript fragment via the background voice writer, which merges each turn into one message"""
+        # A turn is every fragment of one speaker until the other one speaks
+        if role != self._turn_role:
+            self._turn_seq += 1
+            self._turn_role = role
         try:
-            loop = asyncio.get_event_loop()
-            print(f"💾 ASYNC SAVE: Starting save for user text: {user_text[:50]}...", flush=True)
-            await loop.run_in_executor(None, self._save_message_to_db, self.session_id, True, user_text, None)
-            # Also add to chat history
-            await loop.run_in_executor(None, langchain_chat_history.add_message, self.session_id, "user", user_text)
-            print(f"✅ ASYNC SAVE COMPLETE: User message saved to DB", flush=True)
-            logger.info(f"💾 User audio message saved: {user_text[:30]}...")
+            return voice_writer.record_utterance(self.session_id, self.stream_id, self._turn_seq, role, text, stage)
         except Exception as e:
-            print(f"❌ ASYNC SAVE FAILED: {e}", flush=True)
-            logger.error(f"Failed to save user audio message: {e}")
+            logger.error(f"Failed to save {role} voice message: {e}")
+            return None
     
-    async def _evaluate_empathy(self, student_response, patient_context):
+    async def _evaluate_empathy(self, student_response, patient_context, message_id=None):
         """LLM-as-a-Judge empathy evaluation using admin-controlled prompt system"""
-        print(f"🧠 VOICE: _evaluate_empathy CALLED with response: {student_response[:50]}...", flush=True)
         logger.info(f"🧠 VOICE: Starting empathy evaluation for: {student_response[:30]}...")
         
         # Basic validation and sanitization
@@ -741,11 +741,8 @@ Provide structured evaluation with detailed justifications for each score.
             logger.warning(f"⚠️ VOICE: Using default patient context")
             
         try:
-            print(f"🧠 VOICE: Creating bedrock client for region: {self.deployment_region or 'us-east-1'}", flush=True)
-            bedrock_client = boto3.client("bedrock-runtime", region_name=self.deployment_region or 'us-east-1')
-            
-            # Get admin-controlled empathy prompt (same as chat.py)
-            empathy_prompt_template = self._get_empathy_prompt()
+            # Get admin-controlled empathy prompt (same as chat.py); the lookup blocks, so run it off the loop
+            empathy_prompt_template = await asyncio.get_running_loop().run_in_executor(None, self._get_empathy_prompt)
             logger.info(f"🎯 VOICE: EMPATHY PROMPT LENGTH: {len(empathy_prompt_template)} characters")
             
             try:
@@ -780,7 +777,7 @@ Provide structured evaluation with detailed justifications for each score.
                     logger.error(f"❌ VOICE: DEFAULT PROMPT ALSO FAILED: {default_error}")
                     return None
             
-            print(f"🧠 VOICE: Sending evaluation prompt to Nova Pro", flush=True)
+            logger.debug("🧠 VOICE: Sending evaluation prompt to Nova Pro")
             
             body = {
                 "messages": [{
@@ -793,27 +790,15 @@ Provide structured evaluation with detailed justifications for each score.
                 }
             }
             
-            try:
-                response = bedrock_client.invoke_model(
-                    modelId="amazon.nova-pro-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(body)
-                )
-                logger.info("✅ VOICE: BEDROCK MODEL CALL SUCCESSFUL")
-            except Exception as model_error:
-                logger.warning(f"VOICE: Nova Pro failed in deployment region, trying us-east-1: {model_error}")
-                fallback_client = boto3.client("bedrock-runtime", region_name="us-east-1")
-                response = fallback_client.invoke_model(
-                    modelId="amazon.nova-pro-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(body)
-                )
-                logger.info("✅ VOICE: BEDROCK FALLBACK CALL SUCCESSFUL")
-            
-            result = json.loads(response["body"].read())
-            response_text = result["output"]["message"]["content"][0]["text"]
+            # Off the event loop, with a deadline and us-east-1 as fallback region
+            result = await voice_judge.invoke(
+                self.stream_id,
+                "amazon.nova-pro-v1:0",
+                body,
+                region=self.deployment_region or 'us-east-1'
+            )
+            logger.info("✅ VOICE: BEDROCK MODEL CALL SUCCESSFUL")
+            response_text = voice_judge.output_text(result)
             logger.info(f"📝 VOICE: BEDROCK RESPONSE LENGTH: {len(response_text)} characters")
             
             json_start = response_text.find('{')
@@ -849,14 +834,15 @@ Provide structured evaluation with detailed justifications for each score.
                 empathy_result["evaluation_method"] = "LLM-as-a-Judge"
                 empathy_result["judge_model"] = "amazon.nova-pro-v1:0"
                 
-                # Save to database
-                self._save_message_to_db(self.session_id, True, student_response, empathy_result)
+                # Attach to the stored utterance
+                if message_id:
+                    voice_writer.attach_empathy(self.session_id, message_id, empathy_result)
                 
                 # Send empathy feedback
                 empathy_feedback = self._build_empathy_feedback(empathy_result)
                 if empathy_feedback:
-                    print(json.dumps({"type": "empathy", "content": empathy_feedback}), flush=True)
-                    print(json.dumps({"type": "empathy_data", "content": json.dumps(empathy_result)}), flush=True)
+                    self._emit({"type": "empathy", "content": empathy_feedback})
+                    self._emit({"type": "empathy_data", "content": json.dumps(empathy_result)})
                     logger.info(f"🧠 VOICE: Empathy feedback sent to frontend")
                 
                 logger.info(f"✅ VOICE: EMPATHY EVALUATION COMPLETED SUCCESSFULLY")
@@ -870,12 +856,6 @@ Provide structured evaluation with detailed justifications for each score.
             return None
         except Exception as e:
             logger.error(f"❌ VOICE: EMPATHY EVALUATION ERROR: {e}")
-            # Fallback: Save message without empathy data
-            try:
-                self._save_message_to_db(self.session_id, True, student_response, None)
-                logger.info(f"🧠 VOICE: Message saved without empathy data as fallback")
-            except Exception as save_error:
-                logger.error(f"🧠 VOICE: Failed to save message as fallback: {save_error}")
             return None
     
     def _get_medical_context(self):
@@ -884,38 +864,10 @@ Provide structured evaluation with detailed justifications for each score.
             if not self.patient_id:
                 return None
                 
-            # Get RDS proxy connection details
-            conn = get_pg_connection()
-            cursor = conn.cursor()
-            
-            # Get connection details for vectorstore
-            db_secret_name = os.getenv("SM_DB_CREDENTIALS")
-            rds_endpoint = os.getenv("RDS_PROXY_ENDPOINT")
-            
-            if not db_secret_name or not rds_endpoint:
-                logger.warning("📋 VOICE: Database credentials not available for medical context")
-                cursor.close()
-                return_pg_connection(conn)
-                return None
-            
-            cursor.close()
-            return_pg_connection(conn)
-            
-            # Get database credentials
-            secrets_client = boto3.client('secretsmanager')
-            secret_response = secrets_client.get_secret_value(SecretId=db_secret_name)
-            secret = json.loads(secret_response['SecretString'])
-            
-            # Create embeddings and vectorstore connection
-            bedrock_client = self._get_bedrock_client()
-            embeddings = BedrockEmbeddings(model_id="amazon.titan-embed-text-v1", client=bedrock_client)
-            
-            connection_string = f"postgresql://{secret['username']}:{secret['password']}@{rds_endpoint}:{secret['port']}/{secret['dbname']}"
-            vectorstore = PGVector(embedding_function=embeddings, collection_name=self.patient_id, connection_string=connection_string)
-            
             # Get relevant medical documents (general query for patient context)
             try:
-                docs = vectorstore.similarity_search(f"patient medical history symptoms condition", k=3)
+                # Shared retrieval service: cached secret, embeddings and engine; documents cached per session
+                docs = voice_retrieval.search(self.stream_id, self.patient_id, MEDICAL_CONTEXT_QUERY, k=3)
                 
                 if docs and len(docs) > 0:
                     # Filter out empty documents
@@ -950,39 +902,11 @@ Provide structured evaluation with detailed justifications for each score.
                 logger.warning("🩺 VOICE: No patient_id available for diagnosis evaluation")
                 return
             
-            # Get database connection details
-            db_secret_name = os.getenv("SM_DB_CREDENTIALS")
-            rds_endpoint = os.getenv("RDS_PROXY_ENDPOINT")
-            
-            if not db_secret_name or not rds_endpoint:
-                logger.warning("🩺 VOICE: Database credentials not available for diagnosis")
-                return
-            
-            # Get database credentials
-            secrets_client = boto3.client('secretsmanager')
-            secret_response = secrets_client.get_secret_value(SecretId=db_secret_name)
-            secret = json.loads(secret_response['SecretString'])
-            
-            # Create bedrock client and embeddings
-            bedrock_client = boto3.client("bedrock-runtime", region_name=self.deployment_region or 'us-east-1')
-            embeddings = BedrockEmbeddings(model_id="amazon.titan-embed-text-v1", client=bedrock_client)
-            
-            # Connect to vectorstore using RDS proxy
-            connection_string = f"postgresql://{secret['username']}:{secret['password']}@{rds_endpoint}:{secret['port']}/{secret['dbname']}"
-            vectorstore = PGVector(embedding_function=embeddings, collection_name=self.patient_id, connection_string=connection_string)
-            
-            # Search for relevant medical documents
+            # Search for relevant medical documents (off the event loop, cached per session)
             try:
-                docs = vectorstore.similarity_search(text, k=3)
-                
-                if docs and len(docs) > 0:
-                    # Filter out empty documents
-                    valid_docs = [doc for doc in docs if doc.page_content and doc.page_content.strip()]
-                    doc_content = "\n".join([doc.page_content for doc in valid_docs]) if valid_docs else ""
-                    logger.info(f"🩺 VOICE: Found {len(valid_docs)} valid documents for diagnosis")
-                else:
-                    doc_content = ""
-                    logger.info("🩺 VOICE: No documents found for diagnosis evaluation")
+                valid_docs = await voice_retrieval.asearch(self.stream_id, self.patient_id, text, k=3)
+                doc_content = "\n".join([doc.page_content for doc in valid_docs]) if valid_docs else ""
+                logger.info(f"🩺 VOICE: Found {len(valid_docs)} valid documents for diagnosis")
             except Exception as search_error:
                 logger.error(f"🩺 VOICE: Document search failed: {search_error}")
                 doc_content = ""
@@ -999,33 +923,19 @@ Provide structured evaluation with detailed justifications for each score.
                 "inferenceConfig": {"temperature": 0.1}
             }
             
-            try:
-                response = bedrock_client.invoke_model(
-                    modelId="amazon.nova-lite-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(body)
-                )
-                logger.info("✅ VOICE: DIAGNOSIS MODEL CALL SUCCESSFUL")
-            except Exception as model_error:
-                logger.warning(f"🩺 VOICE: Nova Lite failed in deployment region, trying us-east-1: {model_error}")
-                fallback_client = boto3.client("bedrock-runtime", region_name="us-east-1")
-                response = fallback_client.invoke_model(
-                    modelId="amazon.nova-lite-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(body)
-                )
-                logger.info("✅ VOICE: DIAGNOSIS FALLBACK CALL SUCCESSFUL")
-            
-            result = json.loads(response["body"].read())
-            verdict_text = result["output"]["message"]["content"][0]["text"].strip()
+            result = await voice_judge.invoke(
+                self.stream_id,
+                "amazon.nova-lite-v1:0",
+                body,
+                region=self.deployment_region or 'us-east-1'
+            )
+            logger.info("✅ VOICE: DIAGNOSIS MODEL CALL SUCCESSFUL")
+            verdict_text = voice_judge.output_text(result).strip()
             
             logger.info(f"🩺 VOICE: Diagnosis verdict: {verdict_text}")
-            print(f"🩺 Diagnosis verdict: {verdict_text}", flush=True)
             
             if verdict_text.lower() == "true":
-                print(json.dumps({"type": "diagnosis_verdict", "verdict": True}), flush=True)
+                self._emit({"type": "diagnosis_verdict", "verdict": True})
                 logger.info("🩺 VOICE: Correct diagnosis detected - session completion triggered")
                 
         except Exception as e:
@@ -1085,52 +995,6 @@ Provide structured evaluation with detailed justifications for each score.
         except Exception as e:
             logger.error(f"Error building empathy feedback: {e}")
             return None
-    
-    def _save_message_to_db(self, session_id, is_student, content, empathy_data):
-        """Save message to database using centralized voice connection manager"""
-        try:
-            print(f"💾 DB SAVE: Starting save - Student: {is_student}, Content: {content[:50]}...", flush=True)
-            logger.info(f"💾 Starting DB save for {'student' if is_student else 'assistant'} message")
-            logger.info("🔗 VOICE_DB_SAVE: Using centralized voice connection manager")
-            
-            conn = get_pg_connection()
-            cursor = conn.cursor()
-            
-            # Insert into messages table
-            insert_query = """
-                INSERT INTO messages (session_id, student_sent, message_content, empathy_evaluation, time_sent) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            empathy_json = json.dumps(empathy_data) if empathy_data else None
-            
-            cursor.execute(insert_query, (
-                session_id,
-                is_student,
-                content,
-                empathy_json,
-                datetime.now()
-            ))
-            
-            conn.commit()
-            cursor.close()
-            return_pg_connection(conn)
-            
-            print(f"✅ DB SAVE COMPLETE: Message saved to database using voice connection manager", flush=True)
-            logger.info(f"💾 Message saved to DB using voice connection manager")
-            
-            # Also save to PostgreSQL chat history
-            try:
-                role = "user" if is_student else "assistant"
-                langchain_chat_history.add_message(session_id, role, content)
-                logger.info(f"💾 Saved message to PostgreSQL (session_id={session_id}, role={role})")
-            except Exception as pg_error:
-                logger.error(f"💾 Failed to save to PostgreSQL chat history: {pg_error}")
-            
-        except Exception as e:
-            print(f"❌ DB SAVE FAILED: {e}", flush=True)
-            logger.error(f"💾 Database save failed: {e}")
-            raise e
 
 
 # Main execution loop
@@ -1156,7 +1020,7 @@ if __name__ == "__main__":
                     
                 try:
                     command = json.loads(line)
-                    print(f"💬 STDIN COMMAND: {command.get('type', 'unknown')}", flush=True)
+                    logger.debug("💬 STDIN COMMAND: %s", command.get("type", "unknown"))
                     
                     if command["type"] == "start_session":
                         if nova:
@@ -1179,7 +1043,7 @@ if __name__ == "__main__":
                         
                     elif command["type"] == "evaluate_empathy" and nova:
                         # Handle manual empathy evaluation from server.js
-                        print(f"🧠 STDIN: Processing empathy evaluation request", flush=True)
+                        logger.debug("🧠 STDIN: Processing empathy evaluation request")
                         asyncio.create_task(nova.handle_manual_empathy_evaluation(
                             command["text"], 
                             command.get("session_id")
@@ -1187,20 +1051,18 @@ if __name__ == "__main__":
                         
                     elif command["type"] == "text" and nova:
                         # Handle text input (if needed)
-                        print(f"💬 TEXT INPUT: {command.get('data', '')[:50]}...", flush=True)
+                        logger.debug("💬 TEXT INPUT: %s...", command.get("data", "")[:50])
                         
                     elif command["type"] == "end_session" and nova:
                         await nova.end_session()
                         nova = None
                         
                 except json.JSONDecodeError as je:
-                    print(f"❌ JSON DECODE ERROR: {je} - Line: {line}", flush=True)
+                    logger.error(f"❌ JSON DECODE ERROR: {je} - Line: {line[:200]}")
                 except Exception as cmd_error:
-                    print(f"❌ COMMAND ERROR: {cmd_error}", flush=True)
                     logger.error(f"Command processing error: {cmd_error}")
                     
             except Exception as e:
-                print(f"❌ STDIN ERROR: {e}", flush=True)
                 logger.error(f"Stdin handling error: {e}")
                 break
     
@@ -1208,16 +1070,20 @@ if __name__ == "__main__":
         """Main async function"""
         global nova
         
+        # stdout carries protocol JSON only; logs go to stderr through the queued logger
+        configure_voice_logging()
+
         try:
-            print(f"🚀 Nova Sonic Python process started", flush=True)
             logger.info("Nova Sonic process initialized")
+            # Loop lag, handler timings and audio counters, logged on the voice_metrics channel
+            voice_metrics.start()
             
             # Auto-start session if environment variables are present
             session_id = os.getenv("SESSION_ID", "default")
             voice_id = os.getenv("VOICE_ID")
             
             if session_id != "default":
-                print(f"🚀 Auto-starting Nova Sonic session: {session_id}", flush=True)
+                logger.info(f"🚀 Auto-starting Nova Sonic session: {session_id}")
                 nova = NovaSonic(session_id=session_id, voice_id=voice_id)
                 await nova.start_session()
             
@@ -1225,10 +1091,8 @@ if __name__ == "__main__":
             await handle_stdin()
             
         except KeyboardInterrupt:
-            print(f"🚫 Nova Sonic process interrupted", flush=True)
             logger.info("Nova Sonic process interrupted by user")
         except Exception as e:
-            print(f"❌ Nova Sonic process error: {e}", flush=True)
             logger.error(f"Nova Sonic process error: {e}")
         finally:
             if nova:
@@ -1236,7 +1100,11 @@ if __name__ == "__main__":
                     await nova.end_session()
                 except:
                     pass
-            print(f"🚫 Nova Sonic process ended", flush=True)
+            # Flush transcripts still queued for PostgreSQL/DynamoDB before exiting
+            try:
+                await voice_writer.close()
+            except Exception as e:
+                logger.error(f"Voice writer flush failed: {e}")
             logger.info("Nova Sonic process ended")
     
     # Run the main async function
@@ -2,6 +2,15 @@ const express = require("express");
 const { createServer } = require("http");
 const { Server } = require("socket.io");
 const { spawn } = require("child_process");
+const {
+  FRAME_CONTROL,
+  FRAME_AUDIO_IN,
+  FRAME_AUDIO_OUT,
+  FRAME_METRICS,
+  encodeFrame,
+  encodeControl,
+  FrameDecoder,
+} = require("./framing");
 const fs = require("fs");
 const path = require("path");
 const { verifyToken, getStsCredentials } = require("./auth");
@@ -17,6 +26,239 @@ app.get("/health", (req, res) => {
   res.json({ status: "healthy" });
 });
 
+// ─── Nova Sonic voice workers ─────────────────────────────────────────────────
+// A few long-lived Python workers each host many Nova Sonic sessions, multiplexed by session key,
+// instead of one Python process per socket. The pipes carry binary frames (see framing.js); audio
+// frames hold the browser's / Nova Sonic's base64 text as-is, with no JSON wrapping.
+const VOICE_WORKER_COUNT = parseInt(process.env.VOICE_WORKER_COUNT || "1", 10);
+// Per-frame audio logging is sampled (one line per AUDIO_LOG_EVERY frames) and only at VOICE_LOG_LEVEL=DEBUG
+const AUDIO_DEBUG = (process.env.VOICE_LOG_LEVEL || "").toUpperCase() === "DEBUG";
+const AUDIO_LOG_EVERY = 100;
+const voiceWorkers = [];
+const voiceSessions = new Map(); // session key -> { socket, worker, ready }
+
+function spawnVoiceWorker(index, pythonCmd = process.env.PYTHON_CMD || "python3") {
+  console.log(`🐍 Spawning voice worker ${index}: ${pythonCmd} voice_worker.py`);
+  const proc = spawn(pythonCmd, ["voice_worker.py"], {
+    stdio: ["pipe", "pipe", "pipe"],
+    env: {
+      ...process.env,
+      SM_DB_CREDENTIALS: process.env.SM_DB_CREDENTIALS || "",
+      RDS_PROXY_ENDPOINT: process.env.RDS_PROXY_ENDPOINT || "",
+      APPSYNC_GRAPHQL_URL: process.env.APPSYNC_GRAPHQL_URL || "",
+    },
+  });
+  const worker = { index, proc, sessions: 0 };
+  voiceWorkers[index] = worker;
+
+  const decoder = new FrameDecoder((type, sessionKey, payload) => {
+    if (type === FRAME_AUDIO_OUT) {
+      const voice = voiceSessions.get(sessionKey);
+      if (voice) {
+        voice.socket.emit("audio-chunk", { data: payload.toString("latin1") });
+      }
+      return;
+    }
+    if (type === FRAME_METRICS) {
+      // One JSON line per interval, kept out of the emoji logs so it can be queried as structured data
+      try {
+        console.log(JSON.stringify({ voice_worker: index, ...JSON.parse(payload.toString("utf8")) }));
+      } catch (e) {
+        console.error(`❌ Voice worker ${index}: bad metrics frame`, e.message);
+      }
+      return;
+    }
+    if (type !== FRAME_CONTROL) {
+      console.warn(`⚠️ Voice worker ${index}: unknown frame type ${type}`);
+      return;
+    }
+    let parsed;
+    try {
+      parsed = JSON.parse(payload.toString("utf8"));
+    } catch (e) {
+      console.error(`❌ Voice worker ${index}: bad control frame`, e.message);
+      return;
+    }
+    parsed.session = sessionKey;
+    if (parsed.type === "worker_ready") {
+      console.log(`✅ Voice worker ${index} ready, PID:`, parsed.pid);
+      return;
+    }
+    const voice = voiceSessions.get(parsed.session);
+    if (!voice) {
+      return;
+    }
+    if (parsed.type === "session_closed") {
+      releaseVoiceSession(parsed.session);
+      return;
+    }
+    if (parsed.type === "error") {
+      console.error("❌ Nova session error:", parsed.error);
+      voice.socket.emit("nova-error", { error: parsed.error });
+      return;
+    }
+    handleNovaMessage(voice.socket, voice, parsed);
+  });
+  proc.stdout.on("data", (chunk) => decoder.push(chunk));
+
+  proc.stderr.on("data", (data) => {
+    // The worker's log channel (level set by VOICE_LOG_LEVEL); protocol frames only ever use stdout
+    console.log(`🐍 Voice worker ${index}: ${data.toString().trim()}`);
+  });
+
+  proc.on("error", (error) => {
+    console.error(`❌ Voice worker ${index} error:`, error.message);
+    if (error.code === "ENOENT" && pythonCmd !== "python") {
+      console.log("🐍 Trying 'python' instead of 'python3'");
+      spawnVoiceWorker(index, "python");
+    }
+  });
+
+  proc.on("close", (code) => {
+    console.log(`🔚 Voice worker ${index} closed with code:`, code);
+    if (voiceWorkers[index] !== worker) {
+      return;
+    }
+    // Fail the sessions it hosted and bring up a replacement
+    for (const [key, voice] of voiceSessions) {
+      if (voice.worker === worker) {
+        voice.socket.emit("nova-error", { error: "Voice system restarted" });
+        releaseVoiceSession(key);
+      }
+    }
+    setTimeout(() => spawnVoiceWorker(index), 1000);
+  });
+
+  return worker;
+}
+
+function pickVoiceWorker() {
+  // Least-loaded worker that is still accepting input
+  return voiceWorkers
+    .filter((worker) => worker && worker.proc.stdin.writable)
+    .sort((a, b) => a.sessions - b.sessions)[0];
+}
+
+function sendToVoiceWorker(voice, message) {
+  if (!voice || !voice.worker.proc.stdin.writable) {
+    return false;
+  }
+  voice.worker.proc.stdin.write(encodeControl(voice.key, message));
+  return true;
+}
+
+function sendAudioToVoiceWorker(voice, audioBase64) {
+  if (!voice || !voice.worker.proc.stdin.writable) {
+    return false;
+  }
+  voice.worker.proc.stdin.write(encodeFrame(FRAME_AUDIO_IN, voice.key, Buffer.from(audioBase64, "latin1")));
+  return true;
+}
+
+function releaseVoiceSession(key) {
+  const voice = voiceSessions.get(key);
+  if (voice) {
+    voice.ready = false;
+    voice.worker.sessions -= 1;
+    voiceSessions.delete(key);
+  }
+}
+
+function endVoiceSession(voice) {
+  if (voice) {
+    voice.ready = false;
+    if (!sendToVoiceWorker(voice, { type: "end_session" })) {
+      // The worker is gone and will never report session_closed
+      releaseVoiceSession(voice.key);
+    }
+  }
+}
+
+// ─── Messages from a Nova Sonic session ──────────────────────────────────────
+function handleNovaMessage(socket, voice, parsed) {
+  console.log("📤 NOVA JSON:", parsed.type);
+
+  // ─ Audio chunks ───────────────────────────────────────────────
+  if (parsed.type === "audio") {
+    // Skip debug file saving for better performance
+    socket.emit("audio-chunk", { data: parsed.data });
+  }
+  // ─ Debug messages ───────────────────────────────────────────
+  else if (parsed.type === "debug") {
+    console.log("🐞 NOVA DEBUG:", parsed.text);
+  }
+  // ─ Voice empathy evaluation results ──────────────────────────
+  else if (parsed.type === "voice_empathy_result") {
+    console.log("🎤 VOICE EMPATHY RESULT:", parsed.content?.substring(0, 100));
+    socket.emit("voice-empathy-result", { content: parsed.content });
+  }
+  // ─ Text messages ─────────────────────────────────────────────
+  else if (parsed.type === "text") {
+    console.log("💬 NOVA TEXT:", parsed.text);
+    socket.emit("text-message", { text: parsed.text });
+    if (parsed.text.includes("Nova Sonic ready")) {
+      voice.ready = true;
+      console.log("✅ NOVA SONIC READY - Voice empathy evaluation enabled");
+      socket.emit("nova-started", {
+        status: "Nova Sonic session started",
+      });
+    }
+  }
+  // ─ Empathy feedback ──────────────────────────────────────────
+  else if (parsed.type === "empathy") {
+    console.log("🧠 VOICE EMPATHY FEEDBACK:", parsed.content?.substring(0, 100));
+    socket.emit("empathy-feedback", { content: parsed.content });
+  }
+  // ─ Raw empathy data for frontend processing ──────────────────────────────────────────
+  else if (parsed.type === "empathy_data") {
+    console.log("🧠 RAW VOICE EMPATHY DATA RECEIVED:", parsed.content?.substring(0, 100));
+    try {
+      const empathyData = JSON.parse(parsed.content);
+      console.log("🧠 PARSED EMPATHY DATA:", {
+        empathy_score: empathyData.empathy_score,
+        perspective_taking: empathyData.perspective_taking,
+        emotional_resonance: empathyData.emotional_resonance
+      });
+      
+      // Transform to match StudentChat format with voice indicator
+      const transformedData = {
+        overall_score: empathyData.empathy_score || 3,
+        avg_perspective_taking: empathyData.perspective_taking || 3,
+        avg_emotional_resonance: empathyData.emotional_resonance || 3,
+        avg_acknowledgment: empathyData.acknowledgment || 3,
+        avg_language_communication: empathyData.language_communication || 3,
+        avg_cognitive_empathy: empathyData.cognitive_empathy || 3,
+        avg_affective_empathy: empathyData.affective_empathy || 3,
+        realism_assessment: empathyData.realism_flag === "realistic" ? "Your voice responses are generally realistic" : "Your voice response is unrealistic",
+        realism_explanation: empathyData.judge_reasoning?.realism_justification || "",
+        coach_assessment: empathyData.judge_reasoning?.overall_assessment || "",
+        strengths: empathyData.feedback?.strengths || [],
+        areas_for_improvement: empathyData.feedback?.areas_for_improvement || [],
+        recommendations: empathyData.feedback?.improvement_suggestions || [],
+        recommended_approach: empathyData.feedback?.alternative_phrasing || "",
+        timestamp: Date.now(),
+        source: "voice", // Mark as voice-generated empathy data
+      };
+      console.log("🧠 SENDING VOICE EMPATHY DATA TO FRONTEND - Score:", transformedData.overall_score);
+      socket.emit("empathy-data", transformedData);
+    } catch (e) {
+      console.error("❌ Failed to parse voice empathy data:", e);
+      console.error("❌ Raw empathy content:", parsed.content);
+    }
+  }
+  // ─ Diagnosis completion ──────────────────────────────────────
+  else if (parsed.type === "diagnosis_complete") {
+    console.log("🎯 DIAGNOSIS COMPLETE:", parsed.text);
+    socket.emit("diagnosis-complete", { message: parsed.text });
+  }
+  else if (parsed.type === "diagnosis_verdict") {
+    console.log("🩺 DIAGNOSIS VERDICT:", parsed.verdict);
+    if (parsed.verdict) {
+      socket.emit("diagnosis-complete", { message: "Session completed successfully" });
+    }
+  }
+}
+
 // ─── Socket.IO Connection ─────────────────────────────────────────────────────
 io.use(async (socket, next) => {
   try {
@@ -47,8 +289,7 @@ io.on("connection", (socket) => {
     process.env.RDS_PROXY_ENDPOINT ? "🔐 RDS PROXY LOADED" : "❌ NO RDS PROXY"
   );
 
-  let novaProcess = null;
-  let novaReady = false;
+  let voice = null; // this socket's Nova Sonic session on a voice worker
 
   // Small delay then log active client count
   setTimeout(() => {
@@ -65,12 +306,9 @@ io.on("connection", (socket) => {
     
     audioStarted = false;
 
-    // Kill any previous process
-    if (novaProcess) {
-      novaProcess.kill();
-      novaProcess = null;
-    }
-    novaReady = false;
+    // End any previous session
+    endVoiceSession(voice);
+    voice = null;
 
     // Get Cognito Identity Pool credentials for user-specific access
     console.log("🔑 Getting Cognito Identity Pool credentials for user:", socket.userEmail);
@@ -84,261 +322,71 @@ io.on("connection", (socket) => {
       return;
     }
 
-    const PORT = process.env.PORT || 80;
-    
-    // Try python3 first, then python if that fails
-    const pythonCmd = process.env.PYTHON_CMD || "python3";
-    console.log(`🐍 PYTHON_CMD env var: ${process.env.PYTHON_CMD}`);
-    console.log(`🐍 Using command: ${pythonCmd}`);
-    console.log(`🐍 Attempting to spawn: ${pythonCmd} nova_sonic.py`);
-    
-    try {
-      novaProcess = spawn(pythonCmd, ["nova_sonic.py"], {
-        stdio: ["pipe", "pipe", "pipe"],
-        env: {
-          ...process.env,
-          SESSION_ID: config.session_id || "default",
-          VOICE_ID: config.voice_id || "",
-          USER_ID: socket.userId || "anonymous",
-          AWS_ACCESS_KEY_ID: stsCredentials.AccessKeyId,
-          AWS_SECRET_ACCESS_KEY: stsCredentials.SecretKey,
-          AWS_SESSION_TOKEN: stsCredentials.SessionToken,
-          SM_DB_CREDENTIALS: process.env.SM_DB_CREDENTIALS || "",
-          RDS_PROXY_ENDPOINT: process.env.RDS_PROXY_ENDPOINT || "",
-          PATIENT_NAME: config.patient_name || "",
-          PATIENT_PROMPT: config.patient_prompt || "",
-          PATIENT_ID: config.patient_id || "",
-          LLM_COMPLETION: config.llm_completion ? "true" : "false",
-          EXTRA_SYSTEM_PROMPT: config.system_prompt || "",
-          APPSYNC_GRAPHQL_URL: process.env.APPSYNC_GRAPHQL_URL || "",
-          COGNITO_TOKEN: socket.handshake.auth.token || "",
-        },
-      });
-      console.log("📡 Nova process spawned with PID:", novaProcess.pid);
-    } catch (error) {
-      console.error("❌ Failed to spawn Nova process:", error.message);
+    const worker = pickVoiceWorker();
+    if (!worker) {
+      console.error("❌ No voice worker available");
       socket.emit("nova-error", { error: "Failed to start voice system" });
       return;
     }
 
-    // Capture stdout and stderr
-    novaProcess.stdout.on("data", (data) => {
-      data
-        .toString()
-        .split("\n")
-        .filter(Boolean)
-        .forEach((line) => {
-          try {
-            const parsed = JSON.parse(line);
-            console.log("📤 NOVA JSON:", parsed);
-
-            // ─ Audio chunks ───────────────────────────────────────────────
-            if (parsed.type === "audio") {
-              // Skip debug file saving for better performance
-              socket.emit("audio-chunk", { data: parsed.data });
-            }
-            // ─ Debug messages ───────────────────────────────────────────
-            else if (parsed.type === "debug") {
-              console.log("🐞 NOVA DEBUG:", parsed.text);
-            }
-            // ─ Voice empathy evaluation results ──────────────────────────
-            else if (parsed.type === "voice_empathy_result") {
-              console.log("🎤 VOICE EMPATHY RESULT:", parsed.content?.substring(0, 100));
-              socket.emit("voice-empathy-result", { content: parsed.content });
-            }
-            // ─ Text messages ─────────────────────────────────────────────
-            else if (parsed.type === "text") {
-              console.log("💬 NOVA TEXT:", parsed.text);
-              socket.emit("text-message", { text: parsed.text });
-              if (parsed.text.includes("Nova Sonic ready")) {
-                novaReady = true;
-                console.log("✅ NOVA SONIC READY - Voice empathy evaluation enabled");
-                socket.emit("nova-started", {
-                  status: "Nova Sonic session started",
-                });
-              }
-            }
-            // ─ Empathy feedback ──────────────────────────────────────────
-            else if (parsed.type === "empathy") {
-              console.log("🧠 VOICE EMPATHY FEEDBACK:", parsed.content?.substring(0, 100));
-              socket.emit("empathy-feedback", { content: parsed.content });
-            }
-            // ─ Raw empathy data for frontend processing ──────────────────────────────────────────
-            else if (parsed.type === "empathy_data") {
-              console.log("🧠 RAW VOICE EMPATHY DATA RECEIVED:", parsed.content?.substring(0, 100));
-              try {
-                const empathyData = JSON.parse(parsed.content);
-                console.log("🧠 PARSED EMPATHY DATA:", {
-                  empathy_score: empathyData.empathy_score,
-                  perspective_taking: empathyData.perspective_taking,
-                  emotional_resonance: empathyData.emotional_resonance
-                });
-                
-                // Transform to match StudentChat format with voice indicator
-                const transformedData = {
-                  overall_score: empathyData.empathy_score || 3,
-                  avg_perspective_taking: empathyData.perspective_taking || 3,
-                  avg_emotional_resonance: empathyData.emotional_resonance || 3,
-                  avg_acknowledgment: empathyData.acknowledgment || 3,
-                  avg_language_communication: empathyData.language_communication || 3,
-                  avg_cognitive_empathy: empathyData.cognitive_empathy || 3,
-                  avg_affective_empathy: empathyData.affective_empathy || 3,
-                  realism_assessment: empathyData.realism_flag === "realistic" ? "Your voice responses are generally realistic" : "Your voice response is unrealistic",
-                  realism_explanation: empathyData.judge_reasoning?.realism_justification || "",
-                  coach_assessment: empathyData.judge_reasoning?.overall_assessment || "",
-                  strengths: empathyData.feedback?.strengths || [],
-                  areas_for_improvement: empathyData.feedback?.areas_for_improvement || [],
-                  recommendations: empathyData.feedback?.improvement_suggestions || [],
-                  recommended_approach: empathyData.feedback?.alternative_phrasing || "",
-                  timestamp: Date.now(),
-                  source: "voice", // Mark as voice-generated empathy data
-                };
-                console.log("🧠 SENDING VOICE EMPATHY DATA TO FRONTEND - Score:", transformedData.overall_score);
-                socket.emit("empathy-data", transformedData);
-              } catch (e) {
-                console.error("❌ Failed to parse voice empathy data:", e);
-                console.error("❌ Raw empathy content:", parsed.content);
-              }
-            }
-            // ─ Diagnosis completion ──────────────────────────────────────
-            else if (parsed.type === "diagnosis_complete") {
-              console.log("🎯 DIAGNOSIS COMPLETE:", parsed.text);
-              socket.emit("diagnosis-complete", { message: parsed.text });
-            }
-            else if (parsed.type === "diagnosis_verdict") {
-              console.log("🩺 DIAGNOSIS VERDICT:", parsed.verdict);
-              if (parsed.verdict) {
-                socket.emit("diagnosis-complete", { message: "Session completed successfully" });
-              }
-            }
-          } catch {
-            // Plain‑text fallback
-            console.log("[python]", line);
-            if (line.includes("Nova Sonic ready")) {
-              novaReady = true;
-              socket.emit("nova-started", {
-                status: "Nova Sonic session started",
-              });
-            }
-            // Handle empathy feedback in plain text fallback
-            if (line.includes("**Empathy Coach:**") || line.includes("**🎤 Voice Empathy Coach:**")) {
-              socket.emit("empathy-feedback", { content: line });
-            }
-            // Forward voice transcriptions to text chat for empathy evaluation
-            if (line.includes("User:") || line.includes("Assistant:")) {
-              console.log("📝 FORWARDING VOICE TEXT:", line.substring(0, 50));
-              socket.emit("text-message", { text: line });
-            }
-            // Handle empathy evaluation status updates
-            if (line.includes("MANUAL EMPATHY:") || line.includes("🧠") || line.includes("VOICE EMPATHY:")) {
-              console.log("🧠 EMPATHY STATUS:", line);
-              // Forward empathy status to frontend for debugging
-              socket.emit("empathy-status", { message: line, timestamp: Date.now() });
-            }
-            // Handle diagnosis completion in plain text fallback
-            if (line.includes("SESSION COMPLETED")) {
-              socket.emit("diagnosis-complete", { message: "Session completed successfully" });
-            }
-          }
-        });
-    });
-
-    novaProcess.stderr.on("data", (data) => {
-      const stderrText = data.toString().trim();
-      console.warn("⚠️ Nova stderr:", stderrText);
-      
-      // Forward important stderr messages to frontend for debugging
-      if (stderrText.includes("EMPATHY") || stderrText.includes("🧠") || stderrText.includes("ERROR")) {
-        socket.emit("nova-debug", { 
-          type: "stderr", 
-          message: stderrText,
-          timestamp: Date.now()
-        });
-      }
-    });
-
-    novaProcess.on("error", (error) => {
-      console.error("❌ Nova process error:", error.message);
-      console.error("❌ Nova process error details:", error);
-      
-      // Send error details to frontend
-      socket.emit("nova-error", { 
-        error: error.message,
-        code: error.code,
-        details: error.toString()
-      });
-      
-      if (error.code === "ENOENT") {
-        console.log("🐍 Trying 'python' instead of 'python3'");
-        // Retry with 'python' command
-        try {
-          novaProcess = spawn("python", ["nova_sonic.py"], {
-            stdio: ["pipe", "pipe", "pipe"],
-            env: {
-              ...process.env,
-              SESSION_ID: config.session_id || "default",
-              VOICE_ID: config.voice_id || "",
-              USER_ID: socket.userId || "anonymous",
-              AWS_ACCESS_KEY_ID: stsCredentials.AccessKeyId,
-              AWS_SECRET_ACCESS_KEY: stsCredentials.SecretKey,
-              AWS_SESSION_TOKEN: stsCredentials.SessionToken,
-              SM_DB_CREDENTIALS: process.env.SM_DB_CREDENTIALS || "",
-              RDS_PROXY_ENDPOINT: process.env.RDS_PROXY_ENDPOINT || "",
-              PATIENT_NAME: config.patient_name || "",
-              PATIENT_PROMPT: config.patient_prompt || "",
-              PATIENT_ID: config.patient_id || "",
-              LLM_COMPLETION: config.llm_completion ? "true" : "false",
-              EXTRA_SYSTEM_PROMPT: config.system_prompt || "",
-              APPSYNC_GRAPHQL_URL: process.env.APPSYNC_GRAPHQL_URL || "",
-              COGNITO_TOKEN: socket.handshake.auth.token || "",
-            },
-          });
-          console.log("📡 Nova process spawned with 'python', PID:", novaProcess.pid);
-        } catch (retryError) {
-          console.error("❌ Failed to spawn with 'python' too:", retryError.message);
-          socket.emit("nova-error", { error: "Python not found" });
-        }
-      } else {
-        socket.emit("nova-error", { error: error.message });
-      }
-    });
-
-    novaProcess.on("close", (code) => {
-      console.log("🔚 Nova process closed with code:", code);
-      novaProcess = null;
-      novaReady = false;
+    const key = `${socket.id}:${Date.now()}`;
+    voice = { key, socket, worker, ready: false };
+    voiceSessions.set(key, voice);
+    worker.sessions += 1;
+
+    sendToVoiceWorker(voice, {
+      type: "start_session",
+      config: {
+        session_id: config.session_id || "default",
+        voice_id: config.voice_id || "",
+        user_id: socket.userId || "anonymous",
+        patient_name: config.patient_name || "",
+        patient_prompt: config.patient_prompt || "",
+        patient_id: config.patient_id || "",
+        llm_completion: !!config.llm_completion,
+        system_prompt: config.system_prompt || "",
+      },
+      credentials: {
+        access_key_id: stsCredentials.AccessKeyId,
+        secret_access_key: stsCredentials.SecretKey,
+        session_token: stsCredentials.SessionToken,
+      },
     });
+    console.log(`📡 Nova session ${key} started on voice worker ${worker.index} (${worker.sessions} sessions)`);
   });
 
   // ─── Audio‑input from client ──────────────────────────────────────────────
   let audioStarted = false;
+  let audioFrames = 0;
+  let audioRejected = 0;
   socket.on("audio-input", (msg) => {
-    console.log(
-      "🎤 Received audio-input, size:",
-      msg.data ? msg.data.length : "no data"
-    );
-    if (novaProcess && novaProcess.stdin.writable && novaReady) {
+    if (voice && voice.ready) {
       if (!audioStarted) {
-        novaProcess.stdin.write(JSON.stringify({ type: "start_audio" }) + "\n");
+        sendToVoiceWorker(voice, { type: "start_audio" });
         audioStarted = true;
-        console.log("🎬 Sent start_audio to Nova process");
+        console.log("🎬 Sent start_audio to Nova session");
+      }
+      if (typeof msg.data === "string") {
+        sendAudioToVoiceWorker(voice, msg.data);
+      }
+      audioFrames += 1;
+      if (AUDIO_DEBUG && audioFrames % AUDIO_LOG_EVERY === 0) {
+        console.log(`📤 Sent ${audioFrames} audio frames to Nova session (last size: ${msg.data ? msg.data.length : 0})`);
       }
-      novaProcess.stdin.write(
-        JSON.stringify({ type: "audio", data: msg.data }) + "\n"
-      );
-      console.log("📤 Sent audio to Nova process");
     } else {
-      console.log("❌ Cannot send audio - not ready or stdin closed");
+      // Once per burst of frames arriving before the session is ready, not once per frame
+      if (audioRejected % AUDIO_LOG_EVERY === 0) {
+        console.log("❌ Cannot send audio - not ready or stdin closed");
+      }
+      audioRejected += 1;
     }
   });
 
   // ─── Text‑input from client ───────────────────────────────────────────────
   socket.on("text-input", (msg) => {
-    if (novaProcess && novaProcess.stdin.writable && novaReady) {
-      novaProcess.stdin.write(
-        JSON.stringify({ type: "text", data: msg.text }) + "\n"
-      );
-      console.log("📝 Sent text to Nova process");
+    if (voice && voice.ready) {
+      sendToVoiceWorker(voice, { type: "text", data: msg.text });
+      console.log("📝 Sent text to Nova session");
     }
   });
 
@@ -395,10 +443,10 @@ io.on("connection", (socket) => {
 
   // ─── End‑audio event ─────────────────────────────────────────────────────
   socket.on("end-audio", () => {
-    if (novaProcess && novaProcess.stdin.writable && novaReady) {
-      novaProcess.stdin.write(JSON.stringify({ type: "end_audio" }) + "\n");
+    if (voice && voice.ready) {
+      sendToVoiceWorker(voice, { type: "end_audio" });
       audioStarted = false;
-      console.log("🛑 Sent end_audio to Nova process");
+      console.log("🛑 Sent end_audio to Nova session");
     }
   });
 
@@ -406,11 +454,11 @@ io.on("connection", (socket) => {
   socket.on("voice-transcription", (data) => {
     console.log("🎤 VOICE TRANSCRIPTION: Received for empathy evaluation:", data.text?.substring(0, 50));
     console.log("🎤 VOICE TRANSCRIPTION: Session ID:", data.session_id);
-    console.log("🎤 VOICE TRANSCRIPTION: Nova ready:", novaReady);
-    console.log("🎤 VOICE TRANSCRIPTION: Nova process exists:", !!novaProcess);
-    console.log("🎤 VOICE TRANSCRIPTION: Stdin writable:", novaProcess?.stdin?.writable);
+    console.log("🎤 VOICE TRANSCRIPTION: Nova ready:", !!voice?.ready);
+    console.log("🎤 VOICE TRANSCRIPTION: Nova session exists:", !!voice);
+    console.log("🎤 VOICE TRANSCRIPTION: Stdin writable:", voice?.worker.proc.stdin.writable);
     
-    if (novaProcess && novaProcess.stdin.writable && novaReady) {
+    if (voice && voice.ready && voice.worker.proc.stdin.writable) {
       try {
         // Send transcription to Nova Sonic for empathy evaluation
         const message = {
@@ -420,7 +468,7 @@ io.on("connection", (socket) => {
         };
         
         console.log("🎤 VOICE TRANSCRIPTION: Sending message to Nova:", JSON.stringify(message).substring(0, 100));
-        novaProcess.stdin.write(JSON.stringify(message) + "\n");
+        sendToVoiceWorker(voice, message);
         console.log("✅ VOICE TRANSCRIPTION: Successfully sent to Nova for empathy evaluation");
         
         // Also emit confirmation to frontend
@@ -435,16 +483,16 @@ io.on("connection", (socket) => {
       }
     } else {
       console.log("❌ VOICE TRANSCRIPTION: Cannot send - Nova not ready or stdin not writable");
-      console.log("   - Nova process:", !!novaProcess);
-      console.log("   - Stdin writable:", novaProcess?.stdin?.writable);
-      console.log("   - Nova ready:", novaReady);
+      console.log("   - Nova session:", !!voice);
+      console.log("   - Stdin writable:", voice?.worker.proc.stdin.writable);
+      console.log("   - Nova ready:", !!voice?.ready);
       
       socket.emit("transcription-error", { 
         error: "Voice system not ready",
         details: {
-          novaProcess: !!novaProcess,
-          stdinWritable: novaProcess?.stdin?.writable,
-          novaReady: novaReady
+          novaProcess: !!voice,
+          stdinWritable: voice?.worker.proc.stdin.writable,
+          novaReady: !!voice?.ready
         }
       });
     }
@@ -455,16 +503,16 @@ io.on("connection", (socket) => {
   // ─── Optional Stop event ────────────────────────────────────────────────
   socket.on("stop-nova-sonic", () => {
     console.log("🛑 Stop requested by client");
-    if (novaProcess) {
-      novaProcess.kill();
-      novaProcess = null;
-      novaReady = false;
-    }
+    endVoiceSession(voice);
+    voice = null;
   });
 
-  // ─── Do NOT kill on disconnect ──────────────────────────────────────────
+  // ─── End the socket's Nova session on disconnect ─────────────────────────
+  // Nobody can receive its audio any more; the worker frees the slot when it reports session_closed
   socket.on("disconnect", () => {
-    console.log("🔌 CLIENT DISCONNECTED:", socket.id, "- Nova still running");
+    console.log("🔌 CLIENT DISCONNECTED:", socket.id, voice ? "- ending Nova session" : "");
+    endVoiceSession(voice);
+    voice = null;
   });
 });
 
@@ -472,4 +520,7 @@ io.on("connection", (socket) => {
 const PORT = process.env.PORT || 80;
 server.listen(PORT, "0.0.0.0", () => {
   console.log(`Socket server running on port ${PORT}`);
+  for (let i = 0; i < VOICE_WORKER_COUNT; i++) {
+    spawnVoiceWorker(i);
+  }
 });
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import langchain_chat_history
+from langchain_chat_history import record_turn, TURN_COUNTER_SUFFIX
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakeDynamoDB:
+    """The low-level client calls record_turn makes, over a dict of items keyed by SessionId"""
+
+    class exceptions:
+        ConditionalCheckFailedException = ConditionalCheckFailedException
+
+    def __init__(self, items=None):
+        self.items = items or {}
+
+    def get_item(self, TableName, Key, ProjectionExpression=None):
+        item = self.items.get(Key["SessionId"]["S"])
+        return {"Item": item} if item is not None else {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None):
+        if ConditionExpression == "attribute_not_exists(SessionId)" and Item["SessionId"]["S"] in self.items:
+            raise ConditionalCheckFailedException()
+        self.items[Item["SessionId"]["S"]] = Item
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues,
+                    ReturnValues=None, ConditionExpression=None):
+        session_key = Key["SessionId"]["S"]
+        if ConditionExpression == "attribute_exists(SessionId)" and session_key not in self.items:
+            raise ConditionalCheckFailedException()
+        item = self.items.setdefault(session_key, {"SessionId": {"S": session_key}})
+        for attribute, value in (("HumanCount", ":human"), ("AiCount", ":ai")):
+            total = int(item.get(attribute, {}).get("N", 0)) + int(ExpressionAttributeValues[value]["N"])
+            item[attribute] = {"N": str(total)}
+        return {"Attributes": {"HumanCount": item["HumanCount"], "AiCount": item["AiCount"]}}
+
+
+def history(*types):
+    return {"SessionId": {"S": "s1"}, "History": {"L": [{"M": {"type": {"S": t}}} for t in types]}}
+
+
+def test_existing_history_without_counters_is_seeded(monkeypatch):
+    # A text session from before the counters, continued by voice: the voice turn is already appended
+    client = FakeDynamoDB({"s1": history("ai", "human", "ai", "human")})
+    monkeypatch.setattr(langchain_chat_history, "dynamodb_client", client)
+
+    assert record_turn("table", "s1", human_messages=1) == {"human": 2, "ai": 2}
+    assert client.items[f"s1{TURN_COUNTER_SUFFIX}"]["HumanCount"] == {"N": "2"}
+
+    client.items["s1"]["History"]["L"].append({"M": {"type": {"S": "ai"}}})
+    assert record_turn("table", "s1", ai_messages=1) == {"human": 2, "ai": 3}
+
+
+def test_counters_seeded_concurrently_are_incremented(monkeypatch):
+    client = FakeDynamoDB({"s1": history("ai", "human")})
+    monkeypatch.setattr(langchain_chat_history, "dynamodb_client", client)
+
+    seed = client.put_item
+
+    def racing_put_item(**kwargs):
+        # Another worker seeds the counters between the failed increment and this put
+        seed(TableName="table", Item={"SessionId": {"S": f"s1{TURN_COUNTER_SUFFIX}"},
+                                      "HumanCount": {"N": "1"}, "AiCount": {"N": "1"}})
+        seed(**kwargs)
+
+    monkeypatch.setattr(client, "put_item", racing_put_item)
+    assert record_turn("table", "s1", human_messages=1) == {"human": 2, "ai": 1}
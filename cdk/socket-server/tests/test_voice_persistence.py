@@ -0,0 +1,127 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import voice_persistence
+from voice_persistence import VoicePersistenceWriter
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.statements.append(sql)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def record_batches(writer, monkeypatch):
+    batches = []
+    monkeypatch.setattr(writer, "_write_batch", batches.append)
+    return batches
+
+
+def test_fragments_of_a_turn_become_one_message(monkeypatch):
+    async def scenario():
+        writer = VoicePersistenceWriter()
+        batches = record_batches(writer, monkeypatch)
+
+        first = writer.record_utterance("s1", "stream", 1, "ai", "Hello, doctor.", "SPECULATIVE")
+        # Nova Sonic repeats the speculative text as the final transcript
+        assert writer.record_utterance("s1", "stream", 1, "ai", "Hello, doctor. ", "FINAL") == first
+        assert writer.record_utterance("s1", "stream", 1, "ai", "My knee hurts.") == first
+        second = writer.record_utterance("s1", "stream", 2, "user", "Since when?")
+        writer.forget_session("s1")
+        await writer.close()
+
+        writes = [w for batch in batches for w in batch]
+        assert second != first
+        assert writer.duplicates_skipped == 1
+        assert [(w.kind, w.content) for w in writes if w.message_id == first] == [
+            ("utterance", "Hello, doctor."),
+            ("utterance", "Hello, doctor. My knee hurts."),
+            ("turn", "Hello, doctor. My knee hurts."),
+        ]
+        assert [(w.kind, w.content) for w in writes if w.message_id == second] == [
+            ("utterance", "Since when?"),
+            ("turn", "Since when?"),
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_phrase_repeated_within_a_turn_is_kept(monkeypatch):
+    async def scenario():
+        writer = VoicePersistenceWriter()
+        batches = record_batches(writer, monkeypatch)
+
+        patient = writer.record_utterance("s1", "stream", 1, "ai", "It hurts.", "SPECULATIVE")
+        writer.record_utterance("s1", "stream", 1, "ai", "It hurts.", "FINAL")
+        writer.record_utterance("s1", "stream", 1, "ai", "It really hurts.", "SPECULATIVE")
+        writer.record_utterance("s1", "stream", 1, "ai", "It hurts.", "SPECULATIVE")
+        writer.record_utterance("s1", "stream", 1, "ai", "It really hurts.", "FINAL")
+        writer.record_utterance("s1", "stream", 1, "ai", "It hurts!", "FINAL")
+        student = writer.record_utterance("s1", "stream", 2, "user", "Okay.")
+        writer.record_utterance("s1", "stream", 2, "user", "Okay.")
+        writer.forget_session("s1")
+        await writer.close()
+
+        turns = {w.message_id: w.content for batch in batches for w in batch if w.kind == "turn"}
+        assert turns[patient] == "It hurts. It really hurts. It hurts!"
+        assert turns[student] == "Okay. Okay."
+        assert writer.duplicates_skipped == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_session_does_not_drop_others_or_reach_history(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(voice_persistence, "get_pg_connection", lambda: conn)
+    monkeypatch.setattr(voice_persistence, "return_pg_connection", lambda c: None)
+
+    def execute_values(cursor, sql, rows):
+        if any(row[1] == "broken" for row in rows):
+            raise RuntimeError("constraint violation")
+        cursor.conn.statements.append("UPSERT")
+        cursor.rowcount = len(rows)
+
+    history = []
+    monkeypatch.setattr(voice_persistence, "execute_values", execute_values)
+    writer = VoicePersistenceWriter()
+    monkeypatch.setattr(writer, "_append_history", lambda session_id, turns: history.append((session_id, len(turns))))
+
+    writer._write_batch([
+        voice_persistence.PendingWrite(kind="turn", session_id="broken", message_id="m1", content="a"),
+        voice_persistence.PendingWrite(kind="utterance", session_id="ok", message_id="m2", content="b"),
+        voice_persistence.PendingWrite(kind="turn", session_id="ok", message_id="m2", content="b c"),
+    ])
+
+    assert conn.committed
+    assert "ROLLBACK TO SAVEPOINT voice_session" in conn.statements
+    assert conn.statements.count("UPSERT") == 1
+    assert writer.rows_written == 1
+    assert writer.failures == 1
+    assert history == [("ok", 1)]
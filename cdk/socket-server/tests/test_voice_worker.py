@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import voice_worker
+from voice_audio_ingress import AudioIngress
+from voice_framing import FRAME_CONTROL, HEADER
+
+
+class FakeWriter:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        self.frames.append(data)
+
+    async def drain(self):
+        pass
+
+
+class FakeNovaSonic:
+    """The parts of NovaSonic the worker drives, with a response stream that runs until it is told to end"""
+
+    instances = []
+
+    def __init__(self, session_id=None, voice_id=None, config=None, credentials=None,
+                 emit=None, emit_audio=None, transport_drain=None):
+        self.is_active = False
+        self.response = None
+        self.sent = []
+        self.ended = False
+        self.stream_done = asyncio.Event()
+        self.send_gate = asyncio.Event()
+        self.send_gate.set()
+        self.audio_egress = FakeEgress()
+        self.audio_ingress = AudioIngress(self.send_audio_base64)
+        self.utterances = FakeUtterances()
+        FakeNovaSonic.instances.append(self)
+
+    async def start_session(self):
+        self.is_active = True
+        self.response = asyncio.create_task(self.stream_done.wait())
+
+    async def end_session(self):
+        self.ended = True
+        self.stream_done.set()
+
+    async def send_audio_base64(self, blob):
+        await self.send_gate.wait()
+        self.sent.append(blob)
+
+    async def start_audio_input(self):
+        self.sent.append("<start>")
+
+    async def end_audio_input(self):
+        self.sent.append("<end>")
+
+
+class FakeEgress:
+    frames_dropped = 0
+
+    async def close(self):
+        pass
+
+
+class FakeUtterances:
+    def cancel(self):
+        pass
+
+
+def make_worker(monkeypatch):
+    FakeNovaSonic.instances = []
+    monkeypatch.setattr(voice_worker, "NovaSonic", FakeNovaSonic)
+    worker = voice_worker.VoiceWorker()
+    worker.writer = FakeWriter()
+    return worker
+
+
+def control_messages(worker):
+    messages = []
+    for frame in worker.writer.frames:
+        _, frame_type, key_length = HEADER.unpack(frame[:HEADER.size])
+        body = frame[HEADER.size:]
+        if frame_type == FRAME_CONTROL:
+            messages.append((body[:key_length].decode("utf-8"), json.loads(body[key_length:])))
+    return messages
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_disconnect_without_ending_frees_the_session(monkeypatch):
+    """
+    A client connects, starts a session and streams audio, then disconnects without stop-nova-sonic:
+    server.js sends end_session for it, and the worker drops the session.
+    """
+    async def scenario():
+        worker = make_worker(monkeypatch)
+        await worker.handle_command({"type": "start_session", "session": "sock:1", "config": {}})
+        await settle()
+        await worker.handle_command({"type": "start_audio", "session": "sock:1"})
+        worker.handle_audio("sock:1", b"AAAA")
+        await settle()
+
+        # socket "disconnect" -> endVoiceSession -> end_session
+        await worker.handle_command({"type": "end_session", "session": "sock:1"})
+        await settle()
+
+        nova = FakeNovaSonic.instances[0]
+        assert worker.sessions == {}
+        assert nova.ended
+        assert nova.sent == ["<start>", "AAAA"]
+        assert ("sock:1", {"type": "session_closed"}) in control_messages(worker)
+
+    asyncio.run(scenario())
+
+
+def test_session_dropped_when_response_stream_finishes(monkeypatch):
+    async def scenario():
+        worker = make_worker(monkeypatch)
+        await worker.handle_command({"type": "start_session", "session": "sock:2", "config": {}})
+        await settle()
+        assert "sock:2" in worker.sessions
+
+        # The Bedrock stream closes on its own (timeout or error), with no end_session from server.js
+        FakeNovaSonic.instances[0].stream_done.set()
+        await settle()
+
+        assert worker.sessions == {}
+        assert ("sock:2", {"type": "session_closed"}) in control_messages(worker)
+
+    asyncio.run(scenario())
+
+
+def test_backpressured_session_does_not_block_others(monkeypatch):
+    async def scenario():
+        worker = make_worker(monkeypatch)
+        await worker.handle_command({"type": "start_session", "session": "slow", "config": {}})
+        await worker.handle_command({"type": "start_session", "session": "fast", "config": {}})
+        await settle()
+        slow, fast = FakeNovaSonic.instances
+        slow.send_gate.clear()
+
+        for i in range(slow.audio_ingress.max_frames + 10):
+            worker.handle_audio("slow", b"SLOW")
+        worker.handle_audio("fast", b"FAST")
+        await worker.handle_command({"type": "end_audio", "session": "fast"})
+        await settle()
+
+        assert fast.sent == ["FAST", "<end>"]
+        assert slow.sent == []
+        assert slow.audio_ingress.frames_dropped == 10
+
+        slow.send_gate.set()
+        await settle()
+        assert len(slow.sent) == slow.audio_ingress.max_frames
+
+        for session_key in list(worker.sessions):
+            await worker.end_session(session_key)
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+"""
+Audio egress stage for Nova Sonic sessions
+Forwards synthesized speech to the transport through a bounded per-session ring buffer
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from voice_metrics import voice_metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AudioEgress:
+    """
+    Bounded buffer between the Bedrock response stream and the transport to server.js.
+
+    Frames are the base64 strings from audioOutput events and are forwarded as-is, never decoded.
+    A sender task drains the buffer and waits on the transport's backpressure; while it is blocked
+    new frames queue up to `max_frames`. Beyond that, a frame is merged into the newest queued one
+    (concatenating base64 is lossless when the earlier part has no padding) up to `max_frame_chars`,
+    and only then is the oldest frame dropped. Memory per session is therefore capped at roughly
+    max_frames * max_frame_chars.
+    """
+
+    def __init__(self, send: Callable[[str], None], drain: Optional[Callable[[], Awaitable[None]]] = None,
+                 max_frames: int = 64, max_frame_chars: int = 64 * 1024):
+        self._send = send
+        self._drain = drain
+        self.max_frames = max_frames
+        self.max_frame_chars = max_frame_chars
+        self._frames = deque()
+        self._buffered_chars = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Monitoring counters
+        self.frames_in = 0
+        self.frames_out = 0
+        self.frames_merged = 0
+        self.frames_dropped = 0
+        self.peak_frames = 0
+        self.peak_chars = 0
+
+    def push(self, audio_b64: str):
+        """Queue one audioOutput payload. Never blocks; must be called from the event loop thread."""
+        self.frames_in += 1
+        frames = self._frames
+
+        if len(frames) < self.max_frames:
+            frames.append(audio_b64)
+        else:
+            last = frames[-1]
+            if not last.endswith("=") and len(last) + len(audio_b64) <= self.max_frame_chars:
+                frames[-1] = last + audio_b64
+                self.frames_merged += 1
+            else:
+                dropped = frames.popleft()
+                self._buffered_chars -= len(dropped)
+                self.frames_dropped += 1
+                frames.append(audio_b64)
+
+        self._buffered_chars += len(audio_b64)
+        self.peak_frames = max(self.peak_frames, len(frames))
+        self.peak_chars = max(self.peak_chars, self._buffered_chars)
+
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._ready.set()
+
+    async def _run(self):
+        frames = self._frames
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while frames:
+                audio_b64 = frames.popleft()
+                self._buffered_chars -= len(audio_b64)
+                try:
+                    self._send(audio_b64)
+                    self.frames_out += 1
+                    voice_metrics.audio_out(len(audio_b64))
+                except Exception as e:
+                    logger.error(f"❌ AUDIO_EGRESS_SEND_FAILED: {e}")
+                if self._drain:
+                    await self._drain()
+
+    def clear(self):
+        """Discard queued audio (e.g. when the user barges in)"""
+        self.frames_dropped += len(self._frames)
+        self._frames.clear()
+        self._buffered_chars = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Buffer occupancy and throughput for monitoring"""
+        return {
+            "buffered_frames": len(self._frames),
+            "buffered_chars": self._buffered_chars,
+            "peak_frames": self.peak_frames,
+            "peak_chars": self.peak_chars,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "frames_merged": self.frames_merged,
+            "frames_dropped": self.frames_dropped,
+        }
+
+    async def close(self):
+        """Stop the sender task; anything still queued is discarded"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,98 @@
+"""
+Audio ingress stage for Nova Sonic sessions
+Forwards microphone audio and audio control commands to the Bedrock stream through a bounded
+per-session queue, so one slow session never holds up the worker's read loop
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AudioIngress:
+    """
+    Ordered, bounded queue between the worker's pipe reader and one session's Bedrock input stream.
+
+    Audio frames (base64 text, forwarded as-is) and audio commands (start_audio / end_audio) share
+    one queue so they reach Bedrock in the order server.js sent them. A sender task drains the queue
+    and waits on the stream; while it is blocked, audio frames queue up to `max_frames` and further
+    frames are dropped (they would reach Nova Sonic seconds late anyway). Commands are never dropped.
+    """
+
+    def __init__(self, send_audio: Callable[[str], Awaitable[None]], max_frames: int = 256):
+        self._send_audio = send_audio
+        self.max_frames = max_frames
+        self._items = deque()
+        self._queued_frames = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Monitoring counters
+        self.frames_in = 0
+        self.frames_out = 0
+        self.frames_dropped = 0
+        self.peak_frames = 0
+
+    def push(self, audio_b64: str):
+        """Queue one audioInput payload. Never blocks; must be called from the event loop thread."""
+        self.frames_in += 1
+        if self._queued_frames >= self.max_frames:
+            self.frames_dropped += 1
+            return
+        self._items.append((audio_b64, None))
+        self._queued_frames += 1
+        self.peak_frames = max(self.peak_frames, self._queued_frames)
+        self._wake()
+
+    def push_command(self, command: Callable[[], Awaitable[None]]):
+        """Queue an audio command, run after the audio already queued"""
+        self._items.append((None, command))
+        self._wake()
+
+    def _wake(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._ready.set()
+
+    async def _run(self):
+        items = self._items
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while items:
+                audio_b64, command = items.popleft()
+                try:
+                    if command is not None:
+                        await command()
+                    else:
+                        self._queued_frames -= 1
+                        await self._send_audio(audio_b64)
+                        self.frames_out += 1
+                except Exception as e:
+                    logger.error(f"❌ AUDIO_INGRESS_SEND_FAILED: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue occupancy and throughput for monitoring"""
+        return {
+            "queued_frames": self._queued_frames,
+            "peak_frames": self.peak_frames,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "frames_dropped": self.frames_dropped,
+        }
+
+    async def close(self):
+        """Stop the sender task; anything still queued is discarded"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._items.clear()
+        self._queued_frames = 0
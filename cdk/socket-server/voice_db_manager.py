@@ -44,8 +44,9 @@ class VoiceConnectionManager:
         self._health_check_interval = 300  # 5 minutes
         
         # Optimized settings for voice workloads with RDS Proxy
-        self.min_connections = 2          # Higher minimum for voice
-        self.max_connections = 10         # Increased from 5 to handle voice bursts
+        # The pool is shared by every session in the process, so size it independently of session count
+        self.min_connections = int(os.environ.get('VOICE_DB_POOL_MIN', 2))   # Higher minimum for voice
+        self.max_connections = int(os.environ.get('VOICE_DB_POOL_MAX', 10))  # Increased from 5 to handle voice bursts
         self.connection_timeout = 30      # Prevent hanging
         self.idle_timeout = 300          # 5 min cleanup
         
@@ -77,7 +78,7 @@ class VoiceConnectionManager:
                 'user': secret['username'],
                 'password': secret['password'],
                 'connect_timeout': self.connection_timeout,
-                'application_name': f"nova_sonic_voice_{os.environ.get('SESSION_ID', 'unknown')}"
+                'application_name': f"nova_sonic_voice_{os.environ.get('SESSION_ID') or os.getpid()}"
             }
             
             return self._config
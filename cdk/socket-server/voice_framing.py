@@ -0,0 +1,53 @@
+"""
+Length-prefixed binary framing for the server.js <-> voice worker pipe (mirrors framing.js)
+
+Frame layout:
+    uint32 big-endian  length of everything after this field
+    uint8              frame type
+    uint8              session key length
+    bytes              session key (utf-8)
+    bytes              payload
+"""
+
+import json
+import asyncio
+import struct
+
+# Frame types
+FRAME_CONTROL = 0    # JSON command or event
+FRAME_AUDIO_IN = 1   # microphone audio, server.js -> worker
+FRAME_AUDIO_OUT = 2  # synthesized speech, worker -> server.js
+FRAME_METRICS = 3    # periodic JSON metrics line, worker -> server.js
+
+HEADER = struct.Struct(">IBB")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+def encode_frame(frame_type: int, session_key: str, payload: bytes) -> bytes:
+    """Build one frame"""
+    key = (session_key or "").encode("utf-8")
+    return HEADER.pack(2 + len(key) + len(payload), frame_type, len(key)) + key + payload
+
+
+def encode_control(session_key: str, message: dict) -> bytes:
+    """Build a control frame carrying a JSON message"""
+    return encode_frame(FRAME_CONTROL, session_key, json.dumps(message, separators=(",", ":")).encode("utf-8"))
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """
+    Read the next frame from the stream.
+
+    Returns:
+        tuple: (frame_type, session_key, payload), or None at end of stream.
+    """
+    try:
+        length, frame_type, key_length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    except asyncio.IncompleteReadError:
+        return None
+    if length < 2 or length > MAX_FRAME_SIZE:
+        raise ValueError(f"Invalid frame length {length}")
+
+    body = await reader.readexactly(length - 2)
+    session_key = body[:key_length].decode("utf-8")
+    return frame_type, session_key, body[key_length:]
@@ -0,0 +1,135 @@
+"""
+Non-blocking Bedrock judge invocations for Nova Sonic voice sessions
+Empathy and diagnosis model calls run on a dedicated thread pool with reused clients, deadlines,
+bounded per-session concurrency and cancellation when the session ends
+"""
+
+import os
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+JUDGE_TIMEOUT_SECONDS = float(os.environ.get("VOICE_JUDGE_TIMEOUT_SECONDS", 15))
+JUDGE_CONCURRENCY_PER_SESSION = int(os.environ.get("VOICE_JUDGE_CONCURRENCY_PER_SESSION", 2))
+
+
+class VoiceJudgeClient:
+    """
+    Runs blocking invoke_model calls off the event loop so audio keeps streaming while a judge is busy.
+
+    One boto3 client per region is reused for every call (keep-alive connections, botocore timeouts
+    matching the deadline). Each session may have at most `per_session_limit` calls in flight; the
+    deadline covers the fallback-region retry too. cancel_session() cancels everything the session
+    still has waiting or running.
+    """
+
+    def __init__(self, max_workers: int = 16, per_session_limit: int = JUDGE_CONCURRENCY_PER_SESSION,
+                 timeout: float = JUDGE_TIMEOUT_SECONDS):
+        self.per_session_limit = per_session_limit
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voice-judge")
+        self._client_config = Config(
+            connect_timeout=5,
+            read_timeout=timeout,
+            retries={"max_attempts": 2, "mode": "standard"},
+            max_pool_connections=max_workers,
+        )
+        self._clients = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[str, set] = {}
+
+        # Monitoring counters
+        self.calls = 0
+        self.timeouts = 0
+        self.fallbacks = 0
+        self.cancelled = 0
+
+    def _get_client(self, region: str):
+        if region not in self._clients:
+            self._clients[region] = boto3.client("bedrock-runtime", region_name=region, config=self._client_config)
+        return self._clients[region]
+
+    def _invoke(self, region: str, model_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        response = self._get_client(region).invoke_model(
+            modelId=model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps(body)
+        )
+        return json.loads(response["body"].read())
+
+    async def invoke(self, session_key: str, model_id: str, body: Dict[str, Any], region: str = "us-east-1",
+                     fallback_region: Optional[str] = "us-east-1", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Invoke a Bedrock model for a session without blocking the event loop.
+
+        Raises:
+            asyncio.TimeoutError: If the call (including any fallback) misses its deadline.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        task = asyncio.current_task()
+        tasks = self._tasks.setdefault(session_key, set())
+        tasks.add(task)
+        semaphore = self._semaphores.setdefault(session_key, asyncio.Semaphore(self.per_session_limit))
+
+        try:
+            async with semaphore:
+                self.calls += 1
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, self._invoke, region, model_id, body),
+                        deadline - loop.time()
+                    )
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    raise
+                except Exception as model_error:
+                    if not fallback_region or fallback_region == region:
+                        raise
+                    logger.warning(f"VOICE_JUDGE: {model_id} failed in {region}, trying {fallback_region}: {model_error}")
+                    self.fallbacks += 1
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, self._invoke, fallback_region, model_id, body),
+                        deadline - loop.time()
+                    )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.error(f"⏱️ VOICE_JUDGE: {model_id} missed its deadline for session {session_key}")
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            tasks.discard(task)
+
+    @staticmethod
+    def output_text(result: Dict[str, Any]) -> str:
+        """Text of a Nova model response"""
+        return result["output"]["message"]["content"][0]["text"]
+
+    def cancel_session(self, session_key: str):
+        """Cancel every judge call the session has waiting or in flight and forget its limiter"""
+        for task in list(self._tasks.pop(session_key, ())):
+            task.cancel()
+        self._semaphores.pop(session_key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "fallbacks": self.fallbacks,
+            "cancelled": self.cancelled,
+            "sessions": len(self._semaphores),
+        }
+
+
+# Global judge client for voice processing
+voice_judge = VoiceJudgeClient()
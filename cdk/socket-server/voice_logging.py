@@ -0,0 +1,65 @@
+"""
+Low-overhead logging for the Nova Sonic voice process
+Log records are queued by the event loop thread and formatted and written to stderr by a listener thread,
+so stdout stays a pure protocol channel and logging never adds a write syscall to the hot path
+"""
+
+import os
+import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+VOICE_LOG_LEVEL = os.environ.get("VOICE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+_listener = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock handler renders `msg % args` in the calling thread; here the record is queued
+    untouched, so callers must pass immutable arguments (str, numbers) when they log with %-style args.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_voice_logging(level: str = VOICE_LOG_LEVEL, stream=None):
+    """
+    Route every log record through one queue to a stderr writer thread at `level`.
+    Replaces handlers installed by earlier basicConfig() calls; safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=False)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener.start()
+    return _listener
+
+
+def stop_voice_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_voice_logging)
@@ -0,0 +1,173 @@
+"""
+Hot-path instrumentation for the Nova Sonic voice process
+Event-loop lag monitor, per-handler timings and audio counters, reported as one structured line per interval
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+# Dedicated channel for the periodic metrics line when no frame sink is given
+metrics_logger = logging.getLogger("voice_metrics")
+
+METRICS_INTERVAL_SECONDS = float(os.environ.get("VOICE_METRICS_INTERVAL_SECONDS", 10))
+LOOP_SAMPLE_SECONDS = float(os.environ.get("VOICE_LOOP_SAMPLE_MS", 20)) / 1000
+LOOP_STALL_WARN_SECONDS = float(os.environ.get("VOICE_LOOP_STALL_WARN_MS", 100)) / 1000
+
+
+class HandlerTiming:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class VoiceMetrics:
+    """
+    Process-wide voice metrics, cheap enough to update on every event.
+
+    A sampler task sleeps `sample_seconds` at a time; whatever it oversleeps is time the event loop
+    was blocked. Stalls above `stall_warn_seconds` are logged immediately, together with the slowest
+    handler seen since the previous sample. Counters and timings cover one reporting interval and are
+    reset after each report; `report` receives a dict (a metrics frame in the worker, a log line otherwise).
+    """
+
+    def __init__(self, interval: float = METRICS_INTERVAL_SECONDS, sample_seconds: float = LOOP_SAMPLE_SECONDS,
+                 stall_warn_seconds: float = LOOP_STALL_WARN_SECONDS):
+        self.interval = interval
+        self.sample_seconds = sample_seconds
+        self.stall_warn_seconds = stall_warn_seconds
+        self._tasks = []
+        self._report: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._gauges: Optional[Callable[[], Dict[str, Any]]] = None
+        self._slowest_recent = (None, 0.0)
+        self._reset()
+
+    def _reset(self):
+        self.interval_started = time.monotonic()
+        self.audio_in_frames = 0
+        self.audio_in_bytes = 0
+        self.audio_out_frames = 0
+        self.audio_out_bytes = 0
+        self.handlers: Dict[str, HandlerTiming] = {}
+        self.loop_samples = 0
+        self.loop_max_lag = 0.0
+        self.loop_stall_total = 0.0
+        self.loop_stalls = 0
+
+    def audio_in(self, size: int):
+        self.audio_in_frames += 1
+        self.audio_in_bytes += size
+
+    def audio_out(self, size: int):
+        self.audio_out_frames += 1
+        self.audio_out_bytes += size
+
+    def observe_handler(self, name: str, seconds: float):
+        """Record how long one handler (e.g. a _handle_event branch) ran on the loop"""
+        timing = self.handlers.get(name)
+        if timing is None:
+            timing = self.handlers[name] = HandlerTiming()
+        timing.count += 1
+        timing.total += seconds
+        if seconds > timing.max:
+            timing.max = seconds
+        if seconds > self._slowest_recent[1]:
+            self._slowest_recent = (name, seconds)
+
+    def start(self, report: Optional[Callable[[Dict[str, Any]], None]] = None,
+              gauges: Optional[Callable[[], Dict[str, Any]]] = None):
+        """Start the loop monitor and the periodic reporter on the running loop"""
+        if self._tasks:
+            return
+        self._report = report or self._log_report
+        self._gauges = gauges
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._monitor_loop()), loop.create_task(self._report_periodically())]
+
+    async def _monitor_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.sample_seconds)
+            lag = loop.time() - before - self.sample_seconds
+            self.loop_samples += 1
+            if lag > self.loop_max_lag:
+                self.loop_max_lag = lag
+            if lag > self.stall_warn_seconds:
+                self.loop_stalls += 1
+                self.loop_stall_total += lag
+                name, seconds = self._slowest_recent
+                logger.warning(f"🐢 VOICE_LOOP_STALL: event loop blocked {lag * 1000:.0f} ms "
+                               f"(slowest handler since last sample: {name or 'none'} {seconds * 1000:.1f} ms)")
+            self._slowest_recent = (None, 0.0)
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self._report(self.snapshot(reset=True))
+            except Exception as e:
+                logger.error(f"❌ VOICE_METRICS_REPORT_FAILED: {e}")
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Any]:
+        """Metrics for the current interval as a JSON-serializable dict"""
+        elapsed = max(time.monotonic() - self.interval_started, 1e-9)
+        snapshot = {
+            "type": "voice_metrics",
+            "pid": os.getpid(),
+            "interval_s": round(elapsed, 3),
+            "loop": {
+                "samples": self.loop_samples,
+                "max_lag_ms": round(self.loop_max_lag * 1000, 2),
+                "stalls": self.loop_stalls,
+                "stall_ms": round(self.loop_stall_total * 1000, 1),
+            },
+            "audio": {
+                "in_frames": self.audio_in_frames,
+                "in_bytes": self.audio_in_bytes,
+                "out_frames": self.audio_out_frames,
+                "out_bytes": self.audio_out_bytes,
+            },
+            "handlers": {name: timing.to_dict() for name, timing in self.handlers.items()},
+        }
+        if self._gauges:
+            try:
+                snapshot.update(self._gauges())
+            except Exception as e:
+                logger.warning(f"⚠️ VOICE_METRICS_GAUGES_FAILED: {e}")
+        if reset:
+            self._reset()
+        return snapshot
+
+    @staticmethod
+    def _log_report(snapshot: Dict[str, Any]):
+        metrics_logger.info(json.dumps(snapshot, separators=(",", ":")))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+# Global metrics for voice processing
+voice_metrics = VoiceMetrics()
@@ -0,0 +1,325 @@
+"""
+Asynchronous persistence layer for Nova Sonic voice sessions
+Moves PostgreSQL and DynamoDB writes off the asyncio event loop into a single batching writer
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import boto3
+from psycopg2.extras import execute_values
+from langchain_core.messages import AIMessage, HumanMessage, messages_to_dict
+
+import langchain_chat_history
+from voice_db_manager import get_pg_connection, return_pg_connection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+# Namespace for deterministic voice message ids, so a replayed utterance maps onto the same row
+VOICE_MESSAGE_NAMESPACE = uuid.UUID("5b0e7f3c-6c1e-4d8e-9a47-3f2d8c1b9e60")
+
+
+def voice_message_id(session_id: str, stream_id: str, turn_seq: int) -> str:
+    """Stable messages.message_id for one utterance of one voice stream"""
+    return str(uuid.uuid5(VOICE_MESSAGE_NAMESPACE, f"{session_id}:{stream_id}:{turn_seq}"))
+
+
+@dataclass
+class PendingWrite:
+    """
+    One queued write: the text of an utterance so far ('utterance'), its final text once the turn is
+    over ('turn', which also goes to the chat history), or an empathy evaluation for it ('empathy')
+    """
+    kind: str
+    session_id: str
+    message_id: str
+    content: str = ""
+    student_sent: bool = False
+    empathy_evaluation: Optional[Dict[str, Any]] = None
+    time_sent: datetime = field(default_factory=datetime.now)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class OpenTurn:
+    """
+    The fragments of the utterance a voice stream is currently speaking, and the positions of the
+    SPECULATIVE ones whose FINAL text has not arrived yet
+    """
+    message_id: str
+    student_sent: bool
+    fragments: List[str] = field(default_factory=list)
+    speculative: List[int] = field(default_factory=list)
+
+    @property
+    def content(self) -> str:
+        return " ".join(self.fragments)
+
+
+class VoicePersistenceWriter:
+    """
+    Single background writer for voice transcripts.
+    Callers on the event loop only enqueue; a writer task drains the queue in batches and runs the
+    blocking psycopg2/boto3 calls on a dedicated thread, so DB latency never stalls audio processing.
+
+    Each turn is keyed by (session_id, stream_id, turn sequence) and becomes one message: Nova Sonic's
+    fragments of the turn are merged into one messages row (upserted as they arrive, so empathy
+    results can be attached with an UPDATE), and fragments it repeats (e.g. the final copy of a
+    speculative transcript) are skipped. The turn is appended to the chat history once, when the next
+    turn starts or the session ends, and only after its PostgreSQL commit. Each session's writes run
+    under their own savepoint, so one session's failure never drops another's.
+    """
+
+    def __init__(self, max_batch_size: int = 50, table_name: str = "DynamoDB-Conversation-Table"):
+        self.max_batch_size = max_batch_size
+        self.table_name = table_name
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice-db-writer")
+        self._table = None
+        self._turns: Dict[str, Dict[str, OpenTurn]] = {}
+
+        # Monitoring counters
+        self.batches_written = 0
+        self.rows_written = 0
+        self.history_appends = 0
+        self.evaluations_attached = 0
+        self.duplicates_skipped = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def record_utterance(self, session_id: str, stream_id: str, turn_seq: int, role: str, content: str,
+                         stage: Optional[str] = None) -> str:
+        """
+        Queue one transcript fragment ('user' or 'ai') of a turn for the messages table and chat history.
+        Fragments of the same turn are merged into one message. Nova Sonic sends each assistant block
+        twice, as SPECULATIVE then FINAL text: a FINAL fragment replaces the oldest SPECULATIVE one still
+        waiting for it (and is dropped if identical), so a phrase the speaker repeats is kept each time.
+        Must be called from the event loop thread.
+
+        Returns:
+            str: The message_id the turn is stored under.
+        """
+        if role not in ("user", "ai"):
+            raise ValueError(f"Invalid role '{role}'. Must be 'user' or 'ai'.")
+
+        message_id = voice_message_id(session_id, stream_id, turn_seq)
+        text = content.strip()
+        streams = self._turns.setdefault(session_id, {})
+        turn = streams.get(stream_id)
+        if turn is None or turn.message_id != message_id:
+            if turn is not None:
+                self._close_turn(session_id, turn)
+            turn = streams[stream_id] = OpenTurn(message_id=message_id, student_sent=role == "user")
+
+        if stage == "SPECULATIVE":
+            turn.speculative.append(len(turn.fragments))
+            turn.fragments.append(text)
+        elif stage == "FINAL" and turn.speculative:
+            position = turn.speculative.pop(0)
+            if turn.fragments[position] == text:
+                self.duplicates_skipped += 1
+                return message_id
+            turn.fragments[position] = text
+        else:
+            turn.fragments.append(text)
+
+        self._ensure_started()
+        self._queue.put_nowait(PendingWrite(
+            kind="utterance",
+            session_id=session_id,
+            message_id=message_id,
+            content=turn.content,
+            student_sent=turn.student_sent,
+        ))
+        return message_id
+
+    def _close_turn(self, session_id: str, turn: OpenTurn):
+        """Queue a finished turn's final text, for PostgreSQL and then the chat history"""
+        self._ensure_started()
+        self._queue.put_nowait(PendingWrite(
+            kind="turn",
+            session_id=session_id,
+            message_id=turn.message_id,
+            content=turn.content,
+            student_sent=turn.student_sent,
+        ))
+
+    def attach_empathy(self, session_id: str, message_id: str, empathy_evaluation: Dict[str, Any]):
+        """Queue an UPDATE setting empathy_evaluation on an utterance already recorded"""
+        self._ensure_started()
+        self._queue.put_nowait(PendingWrite(
+            kind="empathy",
+            session_id=session_id,
+            message_id=message_id,
+            empathy_evaluation=empathy_evaluation,
+        ))
+
+    def forget_session(self, session_id: str):
+        """Close the session's open turns and drop its tracking once a voice session has ended"""
+        for turn in self._turns.pop(session_id, {}).values():
+            self._close_turn(session_id, turn)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current queue depth and write lag for monitoring"""
+        return {
+            "queue_depth": self.queue_depth(),
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "batches_written": self.batches_written,
+            "rows_written": self.rows_written,
+            "history_appends": self.history_appends,
+            "evaluations_attached": self.evaluations_attached,
+            "duplicates_skipped": self.duplicates_skipped,
+            "failures": self.failures,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            stop = False
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                await loop.run_in_executor(self._executor, self._write_batch, batch)
+                self.batches_written += 1
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ VOICE_WRITER_BATCH_FAILED: {len(batch)} writes dropped: {e}")
+
+            self.last_lag = time.monotonic() - batch[0].enqueued_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+            if stop:
+                break
+
+    def _write_batch(self, batch: List[PendingWrite]):
+        """
+        Runs on the writer thread: each session's upserts and empathy UPDATEs under a savepoint, one
+        commit, then the chat history appends of the turns whose session was written.
+        """
+        by_session: Dict[str, List[PendingWrite]] = {}
+        for w in batch:
+            by_session.setdefault(w.session_id, []).append(w)
+
+        written = []
+        conn = get_pg_connection()
+        try:
+            with conn.cursor() as cursor:
+                for session_id, writes in by_session.items():
+                    cursor.execute("SAVEPOINT voice_session")
+                    try:
+                        self._write_session(cursor, writes)
+                        cursor.execute("RELEASE SAVEPOINT voice_session")
+                        written.append(session_id)
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT voice_session")
+                        self.failures += 1
+                        logger.error(f"❌ VOICE_WRITER_SESSION_FAILED: {len(writes)} writes for session {session_id} dropped: {e}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_pg_connection(conn)
+
+        # The history only ever holds turns that are committed to PostgreSQL
+        for session_id in written:
+            turns = [w for w in by_session[session_id] if w.kind == "turn"]
+            if not turns:
+                continue
+            try:
+                self._append_history(session_id, turns)
+                self.history_appends += len(turns)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ VOICE_WRITER_HISTORY_FAILED: {len(turns)} turns for session {session_id}: {e}")
+
+    def _write_session(self, cursor, writes: List[PendingWrite]):
+        """One multi-row upsert of the session's latest message texts, then its empathy UPDATEs"""
+        # One row per message: a statement may not upsert the same row twice, and the last text is the longest
+        contents: Dict[str, PendingWrite] = {}
+        for w in writes:
+            if w.kind in ("utterance", "turn"):
+                contents[w.message_id] = w
+        evaluations = [w for w in writes if w.kind == "empathy"]
+
+        if contents:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO messages (message_id, session_id, student_sent, message_content, time_sent)
+                VALUES %s
+                ON CONFLICT (message_id) DO UPDATE SET message_content = EXCLUDED.message_content
+                """,
+                [(w.message_id, w.session_id, w.student_sent, w.content, w.time_sent) for w in contents.values()],
+            )
+            self.rows_written += cursor.rowcount
+        if evaluations:
+            execute_values(
+                cursor,
+                """
+                UPDATE messages AS m
+                SET empathy_evaluation = v.empathy_evaluation::jsonb
+                FROM (VALUES %s) AS v (message_id, empathy_evaluation)
+                WHERE m.message_id = v.message_id::uuid
+                """,
+                [(w.message_id, json.dumps(w.empathy_evaluation)) for w in evaluations],
+            )
+            self.evaluations_attached += cursor.rowcount
+
+    def _append_history(self, session_id: str, writes: List[PendingWrite]):
+        """Append to the DynamoDB history in place instead of LangChain's read-modify-put"""
+        if self._table is None:
+            self._table = boto3.resource("dynamodb").Table(self.table_name)
+
+        messages = [
+            HumanMessage(content=w.content) if w.student_sent else AIMessage(content=w.content)
+            for w in writes
+        ]
+        self._table.update_item(
+            Key={"SessionId": session_id},
+            UpdateExpression="SET History = list_append(if_not_exists(History, :empty), :messages)",
+            ExpressionAttributeValues={":empty": [], ":messages": messages_to_dict(messages)},
+        )
+        human_messages = sum(1 for w in writes if w.student_sent)
+        langchain_chat_history.record_turn(self.table_name, session_id, human_messages, len(writes) - human_messages)
+
+    async def close(self):
+        """Flush everything queued so far and stop the writer task"""
+        if self._task and not self._task.done():
+            self._queue.put_nowait(None)
+            await self._task
+        logger.info(f"🔗 VOICE_WRITER_CLOSED: {self.get_stats()}")
+
+
+# Global writer for voice processing
+voice_writer = VoicePersistenceWriter()
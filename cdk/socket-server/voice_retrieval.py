@@ -0,0 +1,222 @@
+"""
+Shared retrieval resources for Nova Sonic voice sessions
+One cached secret, Bedrock client, embeddings model and SQLAlchemy engine per process,
+with vector searches run off the event loop and results cached per voice session
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import boto3
+from sqlalchemy import create_engine, text
+from langchain_core.documents import Document
+from langchain_community.embeddings import BedrockEmbeddings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Must match the ingestion model, whose vectors fill the vector(1024) columns
+EMBEDDING_MODEL_ID = os.environ.get("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+EMBEDDING_DIMENSIONS = 1024
+MEDICAL_CONTEXT_QUERY = "patient medical history symptoms condition"
+# HNSW candidate list size for vector searches (pgvector default 40); higher trades latency for recall
+VECTOR_EF_SEARCH = os.environ.get("VECTOR_EF_SEARCH")
+# Most index tuples an iterative HNSW scan reads for a filtered search (pgvector default 20000)
+VECTOR_MAX_SCAN_TUPLES = os.environ.get("VECTOR_MAX_SCAN_TUPLES")
+# Search each patient's partition of patient_embeddings instead of the shared LangChain tables
+PARTITIONED_STORAGE = os.environ.get("VECTOR_STORAGE", "langchain").lower() == "partitioned"
+PARTITIONED_TABLE = "patient_embeddings"
+
+
+class VoiceRetrievalService:
+    """
+    Per-process retrieval service for voice sessions.
+
+    Secrets Manager is read once, the Bedrock client and embeddings are built once, and every search
+    runs on the same pooled engine. Searches run
+    on a dedicated thread pool; documents retrieved for a session are kept per (patient, query) until
+    the session ends, so repeated lookups cost no embedding call and no query at all.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voice-retrieval")
+        self._lock = threading.Lock()
+        self._connection_string = None
+        self._engine = None
+        self._embeddings = None
+        self._iterative_scan = None
+        self._session_documents: Dict[str, Dict[Tuple[str, str, int], List[Document]]] = {}
+
+        # Monitoring counters
+        self.searches = 0
+        self.cache_hits = 0
+
+    def _get_connection_string(self) -> Optional[str]:
+        if self._connection_string is None:
+            db_secret_name = os.getenv("SM_DB_CREDENTIALS")
+            rds_endpoint = os.getenv("RDS_PROXY_ENDPOINT")
+            if not db_secret_name or not rds_endpoint:
+                return None
+
+            secret_response = boto3.client("secretsmanager").get_secret_value(SecretId=db_secret_name)
+            secret = json.loads(secret_response["SecretString"])
+            self._connection_string = (
+                f"postgresql://{secret['username']}:{secret['password']}@{rds_endpoint}:{secret['port']}/{secret['dbname']}"
+            )
+        return self._connection_string
+
+    def _get_embeddings(self) -> BedrockEmbeddings:
+        if self._embeddings is None:
+            bedrock_client = boto3.client("bedrock-runtime", region_name="us-east-1")
+            self._embeddings = BedrockEmbeddings(model_id=EMBEDDING_MODEL_ID, client=bedrock_client)
+        return self._embeddings
+
+    def check_embedding_dimensions(self) -> bool:
+        """
+        Embed a probe once at worker startup and compare its length with the stored vectors', so a
+        mismatched EMBEDDING_MODEL_ID is reported up front instead of failing every search.
+        """
+        dimensions = len(self._get_embeddings().embed_query(MEDICAL_CONTEXT_QUERY))
+        if dimensions != EMBEDDING_DIMENSIONS:
+            logger.error(
+                f"❌ VOICE_RETRIEVAL: {EMBEDDING_MODEL_ID} produces {dimensions}-dimensional vectors, "
+                f"but the vectorstore holds {EMBEDDING_DIMENSIONS}; searches will fail"
+            )
+            return False
+        logger.info(f"✅ VOICE_RETRIEVAL: {EMBEDDING_MODEL_ID} matches the vectorstore ({dimensions} dimensions)")
+        return True
+
+    def _get_engine(self):
+        """Process-wide pooled engine, or None without database credentials (call with the lock held)"""
+        if self._engine is None:
+            connection_string = self._get_connection_string()
+            if connection_string is None:
+                logger.warning("📋 VOICE_RETRIEVAL: Database credentials not available")
+                return None
+            self._engine = create_engine(connection_string, pool_pre_ping=True, pool_size=max(2, self.max_workers))
+        return self._engine
+
+    def _apply_search_settings(self, conn):
+        """
+        HNSW options for the search's own transaction (SET LOCAL), never the pooled session. With
+        pgvector >= 0.8 the scan is iterative, so a collection holding a small share of the shared
+        index still gets its k rows instead of whatever survives the first ef_search candidates.
+        """
+        if VECTOR_EF_SEARCH:
+            conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(VECTOR_EF_SEARCH)}"))
+        if self._iterative_scan is None:
+            version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+            self._iterative_scan = version is not None and tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+        if self._iterative_scan:
+            conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            if VECTOR_MAX_SCAN_TUPLES:
+                conn.execute(text(f"SET LOCAL hnsw.max_scan_tuples = {int(VECTOR_MAX_SCAN_TUPLES)}"))
+
+    def search(self, session_id: Optional[str], patient_id: str, query: str, k: int = 3) -> List[Document]:
+        """
+        Blocking similarity search for non-empty documents, cached per session.
+
+        Returns:
+            List[Document]: Up to k documents with content, or an empty list.
+        """
+        cache_key = (patient_id, query.strip().lower(), k)
+        if session_id is not None:
+            with self._lock:
+                cached = self._session_documents.get(session_id, {}).get(cache_key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        self.searches += 1
+        if PARTITIONED_STORAGE:
+            docs = self._search_partition(patient_id, query, k)
+        else:
+            docs = self._search_collection(patient_id, query, k)
+        docs = [doc for doc in docs if doc.page_content and doc.page_content.strip()]
+
+        if session_id is not None:
+            with self._lock:
+                self._session_documents.setdefault(session_id, {})[cache_key] = docs
+        return docs
+
+    def _search_collection(self, patient_id: str, query: str, k: int) -> List[Document]:
+        """
+        Cosine search over the patient's collection in langchain_pg_embedding, ordered by the same
+        embedding::vector(1024) expression the HNSW index is built on so the index serves it
+        """
+        with self._lock:
+            engine = self._get_engine()
+        if engine is None:
+            return []
+
+        embedding = self._get_embeddings().embed_query(query)
+        with engine.connect() as conn:
+            collection_id = conn.execute(
+                text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"), {"name": patient_id}
+            ).scalar()
+            if collection_id is None:
+                return []
+            self._apply_search_settings(conn)
+            # Relaxed-order iterative scans may return rows slightly out of order; re-sort the k found
+            rows = conn.execute(
+                text(f"""
+                    WITH nearest AS MATERIALIZED (
+                        SELECT document, cmetadata,
+                               embedding::vector({EMBEDDING_DIMENSIONS}) <=> CAST(:embedding AS vector({EMBEDDING_DIMENSIONS})) AS distance
+                        FROM langchain_pg_embedding
+                        WHERE collection_id = :collection_id
+                        ORDER BY distance
+                        LIMIT :k
+                    )
+                    SELECT document, cmetadata FROM nearest ORDER BY distance
+                """),
+                {"embedding": str(embedding), "collection_id": collection_id, "k": k}
+            ).fetchall()
+        return [Document(page_content=document or "", metadata=metadata or {}) for document, metadata in rows]
+
+    def _search_partition(self, patient_id: str, query: str, k: int) -> List[Document]:
+        """Cosine search over the patient's own partition, whose cost depends only on that patient's chunks"""
+        with self._lock:
+            engine = self._get_engine()
+        if engine is None:
+            return []
+
+        partition = f"{PARTITIONED_TABLE}_{uuid.UUID(str(patient_id)).hex}"
+        embedding = self._get_embeddings().embed_query(query)
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is None:
+                return []
+            self._apply_search_settings(conn)
+            rows = conn.execute(
+                text(f'SELECT document, cmetadata FROM "{partition}" ORDER BY embedding <=> CAST(:embedding AS vector) LIMIT :k'),
+                {"embedding": str(embedding), "k": k}
+            ).fetchall()
+        return [Document(page_content=document or "", metadata=metadata or {}) for document, metadata in rows]
+
+    async def asearch(self, session_id: Optional[str], patient_id: str, query: str, k: int = 3) -> List[Document]:
+        """search() on the retrieval thread pool, so the event loop never waits on Bedrock or PostgreSQL"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.search, session_id, patient_id, query, k)
+
+    def forget_session(self, session_id: str):
+        """Drop the documents cached for a voice session"""
+        with self._lock:
+            self._session_documents.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "searches": self.searches,
+            "cache_hits": self.cache_hits,
+            "sessions_cached": len(self._session_documents),
+        }
+
+
+# Global retrieval service for voice processing
+voice_retrieval = VoiceRetrievalService()
@@ -0,0 +1,102 @@
+"""
+Utterance aggregation for Nova Sonic voice sessions
+Debounces USER transcript fragments so evaluations run once per spoken turn, not once per fragment
+"""
+
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UTTERANCE_SILENCE_SECONDS = int(os.environ.get("VOICE_UTTERANCE_SILENCE_MS", 1500)) / 1000
+
+
+class UtteranceAggregator:
+    """
+    Collects transcript fragments of one user turn and hands the whole utterance to `on_utterance`.
+
+    A turn is complete on an explicit turn-end signal (end of microphone input, or the model starting
+    its reply) or after `silence_seconds` without a new fragment. A silence flush is provisional: if
+    more of the same turn arrives while its evaluation is still running, that evaluation is cancelled
+    and the utterance is evaluated again as a whole. Pending work is cancelled when the session ends.
+    """
+
+    def __init__(self, on_utterance: Callable[[str, Optional[str]], Awaitable[None]],
+                 silence_seconds: float = UTTERANCE_SILENCE_SECONDS):
+        self._on_utterance = on_utterance
+        self.silence_seconds = silence_seconds
+        self._fragments: List[str] = []
+        self._message_id: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._provisional: Optional[asyncio.Task] = None
+        self._provisional_fragments: List[str] = []
+        self._tasks = set()
+
+        # Monitoring counters
+        self.fragments_seen = 0
+        self.utterances_evaluated = 0
+        self.evaluations_cancelled = 0
+
+    def add_fragment(self, text: str, message_id: Optional[str] = None):
+        """Add one USER transcript fragment (and the id it was stored under)"""
+        self.fragments_seen += 1
+
+        # The turn was still going: the evaluation started on silence saw only part of it
+        if self._provisional and not self._provisional.done():
+            self._provisional.cancel()
+            self.evaluations_cancelled += 1
+            self._fragments = self._provisional_fragments + self._fragments
+        self._provisional = None
+        self._provisional_fragments = []
+
+        self._fragments.append(text.strip())
+        if message_id:
+            self._message_id = message_id
+
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.silence_seconds, self._flush, True)
+
+    def end_turn(self):
+        """Turn-end signal: evaluate what has been said so far, final for this turn"""
+        self._flush(False)
+        self._provisional = None
+        self._provisional_fragments = []
+
+    def _flush(self, provisional: bool):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._fragments:
+            return
+
+        fragments, self._fragments = self._fragments, []
+        task = asyncio.get_running_loop().create_task(self._on_utterance(" ".join(fragments), self._message_id))
+        self.utterances_evaluated += 1
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        if provisional:
+            self._provisional = task
+            self._provisional_fragments = fragments
+
+    def get_stats(self):
+        return {
+            "fragments_seen": self.fragments_seen,
+            "utterances_evaluated": self.utterances_evaluated,
+            "evaluations_cancelled": self.evaluations_cancelled,
+            "in_flight": len(self._tasks),
+        }
+
+    def cancel(self):
+        """Drop buffered fragments and cancel every evaluation still running (session end)"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._fragments = []
+        for task in list(self._tasks):
+            task.cancel()
+        self.evaluations_cancelled += len(self._tasks)
@@ -0,0 +1,236 @@
+"""
+Long-lived multi-session Nova Sonic worker
+Hosts many NovaSonic sessions in one asyncio process, multiplexed over stdin/stdout by session key,
+so Python startup, imports, AWS clients and the voice DB pool are paid once per worker instead of once per socket.
+The pipe carries length-prefixed binary frames (see voice_framing.py).
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+
+# stdout carries the protocol only; diagnostic prints from the sessions go to stderr
+protocol_out = sys.stdout
+sys.stdout = sys.stderr
+
+from nova_sonic import NovaSonic
+from voice_persistence import voice_writer
+from voice_db_manager import voice_db_manager
+from voice_judge import voice_judge
+from voice_retrieval import voice_retrieval
+from voice_metrics import voice_metrics
+from voice_logging import configure_voice_logging
+from voice_framing import FRAME_CONTROL, FRAME_AUDIO_IN, FRAME_AUDIO_OUT, FRAME_METRICS, encode_frame, encode_control, read_frame
+
+# Queued, level-gated logging to stderr (VOICE_LOG_LEVEL); replaces handlers set up by the imports above
+configure_voice_logging()
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.environ.get("VOICE_WORKER_MAX_SESSIONS", 50))
+
+
+class VoiceWorker:
+    """
+    Routes commands from server.js to NovaSonic sessions by their session key.
+
+    Every frame in both directions carries a session key (server.js uses one key per
+    start-nova-sonic). Control frames hold JSON; audio frames hold the base64 audio text exactly as
+    the browser and Nova Sonic exchange it, so audio is never decoded, re-encoded or JSON-parsed here.
+    Each session brings the user's own STS credentials for the Bedrock stream; everything else
+    (Secrets Manager, DynamoDB, judge models, PostgreSQL) is shared.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.writer = None
+
+    def emit(self, session_key, payload):
+        """Send one control message for a session to server.js"""
+        self.writer.write(encode_control(session_key, payload))
+
+    async def drain(self):
+        """Wait while the pipe to server.js is backed up (sessions' audio buffers absorb the delay)"""
+        await self.writer.drain()
+
+    def emit_audio(self, session_key, audio_b64):
+        """Send one chunk of synthesized speech (base64 text) to server.js"""
+        self.writer.write(encode_frame(FRAME_AUDIO_OUT, session_key, audio_b64.encode("ascii")))
+
+    def emit_metrics(self, snapshot):
+        """Send the periodic metrics line on its own frame type, apart from session traffic"""
+        self.writer.write(encode_frame(FRAME_METRICS, None, json.dumps(snapshot, separators=(",", ":")).encode("utf-8")))
+
+    def metrics_gauges(self):
+        """Point-in-time values added to each metrics line"""
+        writer_stats = voice_writer.get_stats()
+        return {
+            "sessions": len(self.sessions),
+            "writer": {"queue_depth": writer_stats["queue_depth"], "max_lag_ms": writer_stats["max_lag_ms"]},
+            "judge": voice_judge.get_stats(),
+            "egress_dropped": sum(nova.audio_egress.frames_dropped for nova in self.sessions.values()),
+            "ingress_dropped": sum(nova.audio_ingress.frames_dropped for nova in self.sessions.values()),
+        }
+
+    async def start_session(self, session_key, command):
+        if session_key in self.sessions:
+            await self.end_session(session_key)
+
+        if len(self.sessions) >= MAX_SESSIONS:
+            self.emit(session_key, {"type": "error", "error": "Voice worker at capacity"})
+            return
+
+        config = command.get("config", {})
+        nova = NovaSonic(
+            session_id=config.get("session_id") or "default",
+            voice_id=config.get("voice_id") or None,
+            config=config,
+            credentials=command.get("credentials"),
+            emit=lambda payload: self.emit(session_key, payload),
+            emit_audio=lambda audio_b64: self.emit_audio(session_key, audio_b64),
+            transport_drain=self.drain,
+        )
+        self.sessions[session_key] = nova
+        try:
+            await nova.start_session()
+            # A session whose response stream has ended (timeout, error, client gone) is dropped
+            nova.response.add_done_callback(lambda _: self.response_finished(session_key, nova))
+            logger.info(f"🚀 VOICE_WORKER: Session {session_key} started ({len(self.sessions)} active)")
+        except Exception as e:
+            self.sessions.pop(session_key, None)
+            logger.error(f"❌ VOICE_WORKER: Failed to start session {session_key}: {e}")
+            self.emit(session_key, {"type": "error", "error": str(e)})
+
+    def response_finished(self, session_key, nova):
+        if self.sessions.get(session_key) is nova:
+            logger.info(f"🔚 VOICE_WORKER: Response stream of session {session_key} finished")
+            asyncio.create_task(self.end_session(session_key))
+
+    async def end_session(self, session_key):
+        nova = self.sessions.pop(session_key, None)
+        if not nova:
+            self.emit(session_key, {"type": "session_closed"})
+            return
+        # Stop forwarding microphone audio before the input stream is closed
+        await nova.audio_ingress.close()
+        try:
+            await nova.end_session()
+        except Exception as e:
+            logger.warning(f"⚠️ VOICE_WORKER: Error ending session {session_key}: {e}")
+        nova.is_active = False
+        if nova.response and not nova.response.done():
+            nova.response.cancel()
+        nova.utterances.cancel()
+        await nova.audio_egress.close()
+        self.emit(session_key, {"type": "session_closed"})
+        logger.info(f"🔚 VOICE_WORKER: Session {session_key} ended ({len(self.sessions)} active)")
+
+    async def handle_command(self, command):
+        session_key = command.get("session")
+        command_type = command.get("type")
+
+        if command_type == "start_session":
+            # Session setup does network round trips; don't hold up the other sessions' commands
+            asyncio.create_task(self.start_session(session_key, command))
+            return
+        if command_type == "end_session":
+            await self.end_session(session_key)
+            return
+
+        nova = self.sessions.get(session_key)
+        if not nova:
+            logger.warning(f"⚠️ VOICE_WORKER: {command_type} for unknown session {session_key}")
+            return
+
+        # Audio commands go through the session's audio queue, in order with its audio frames
+        if command_type == "start_audio":
+            nova.audio_ingress.push_command(nova.start_audio_input)
+        elif command_type == "end_audio":
+            nova.audio_ingress.push_command(nova.end_audio_input)
+        elif command_type == "evaluate_empathy":
+            asyncio.create_task(nova.handle_manual_empathy_evaluation(command["text"], command.get("session_id")))
+        elif command_type == "text":
+            logger.debug("💬 TEXT INPUT: %s...", command.get("data", "")[:50])
+
+    def handle_audio(self, session_key, payload):
+        """Queue one audio frame for its session; never waits, so a backed-up session cannot stall the others"""
+        nova = self.sessions.get(session_key)
+        if nova and nova.is_active:
+            nova.audio_ingress.push(payload.decode("ascii"))
+
+    async def open_pipes(self):
+        """Wrap stdin/stdout in asyncio streams so neither reads nor writes block the loop"""
+        loop = asyncio.get_running_loop()
+
+        reader = asyncio.StreamReader(limit=2 ** 20)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, protocol_out.buffer)
+        self.writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        return reader
+
+    async def check_embeddings(self):
+        """Startup check of the embedding model against the vectorstore, off the event loop"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, voice_retrieval.check_embedding_dimensions)
+        except Exception as e:
+            logger.warning(f"⚠️ VOICE_WORKER: Could not check embedding dimensions: {e}")
+
+    async def run(self):
+        reader = await self.open_pipes()
+        self.emit(None, {"type": "worker_ready", "pid": os.getpid()})
+        voice_metrics.start(self.emit_metrics, self.metrics_gauges)
+        asyncio.create_task(self.check_embeddings())
+
+        while True:
+            frame = await read_frame(reader)
+            if frame is None:
+                break
+            frame_type, session_key, payload = frame
+
+            if frame_type == FRAME_AUDIO_IN:
+                try:
+                    self.handle_audio(session_key, payload)
+                except Exception as e:
+                    logger.error(f"❌ AUDIO ERROR ({session_key}): {e}")
+                continue
+
+            if frame_type != FRAME_CONTROL:
+                logger.warning(f"⚠️ VOICE_WORKER: Unknown frame type {frame_type}")
+                continue
+
+            try:
+                command = json.loads(payload)
+                command["session"] = session_key
+            except json.JSONDecodeError as je:
+                logger.error(f"❌ JSON DECODE ERROR: {je}")
+                continue
+
+            try:
+                await self.handle_command(command)
+            except Exception as e:
+                logger.error(f"❌ COMMAND ERROR ({command.get('type')}, {command.get('session')}): {e}")
+                self.emit(command.get("session"), {"type": "error", "error": str(e)})
+
+    async def shutdown(self):
+        await voice_metrics.stop()
+        for session_key in list(self.sessions):
+            await self.end_session(session_key)
+        # Flush transcripts still queued for PostgreSQL/DynamoDB before exiting
+        await voice_writer.close()
+        voice_db_manager.close_pool()
+
+
+async def main():
+    worker = VoiceWorker()
+    try:
+        logger.info(f"🚀 Nova Sonic voice worker started (pid {os.getpid()}, max {MAX_SESSIONS} sessions)")
+        await worker.run()
+    finally:
+        await worker.shutdown()
+        logger.info("🚫 Nova Sonic voice worker ended")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,8 @@
 import boto3, re, json, logging
 import psycopg2
 import os
+import random
+import hashlib
 from .db_connection_manager import get_db_cursor, get_pool_status
 
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +16,7 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import DynamoDBChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.pydantic_v1 import BaseModel, Field
 from threading import Thread
 
@@ -22,6 +25,197 @@ class LLM_evaluation(BaseModel):
     verdict: str = Field(description="'True' if the student has properly diagnosed the patient, 'False' otherwise.")
 
 
+# Suffix of the sibling DynamoDB item holding a session's message counters.
+TURN_COUNTER_SUFFIX = "#turns"
+
+# Reused across warm invocations
+dynamodb_client = boto3.client("dynamodb")
+
+
+def record_turn(table_name: str, session_id: str, human_messages: int = 0, ai_messages: int = 0) -> dict:
+    """
+    Atomically add to the per-session message counters kept alongside the history and return the new totals.
+    The counters live on their own item so LangChain's put_item of the history never overwrites them.
+    Called after the turn's messages are in the history: a session without a counter item (new, or
+    older than the counters) has it seeded from the history instead, so its totals start out right.
+    """
+    counter_key = {"SessionId": {"S": f"{session_id}{TURN_COUNTER_SUFFIX}"}}
+    increment = {
+        "TableName": table_name,
+        "Key": counter_key,
+        "UpdateExpression": "ADD HumanCount :human, AiCount :ai",
+        "ExpressionAttributeValues": {
+            ":human": {"N": str(human_messages)},
+            ":ai": {"N": str(ai_messages)}
+        },
+        "ReturnValues": "UPDATED_NEW"
+    }
+    try:
+        response = dynamodb_client.update_item(**increment, ConditionExpression="attribute_exists(SessionId)")
+        return parse_turn_counts(response.get("Attributes", {}))
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        pass
+
+    turn_counts = count_history_messages(table_name, session_id)
+    try:
+        dynamodb_client.put_item(
+            TableName=table_name,
+            Item={
+                **counter_key,
+                "HumanCount": {"N": str(turn_counts["human"])},
+                "AiCount": {"N": str(turn_counts["ai"])}
+            },
+            ConditionExpression="attribute_not_exists(SessionId)"
+        )
+        return turn_counts
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        # A concurrent turn seeded the counters first
+        response = dynamodb_client.update_item(**increment)
+        return parse_turn_counts(response.get("Attributes", {}))
+
+
+def get_turn_counts(table_name: str, session_id: str) -> dict:
+    """
+    Read the per-session message counters without touching the conversation history item.
+    Falls back to counting the history for sessions that have no counter item yet.
+    """
+    response = dynamodb_client.get_item(
+        TableName=table_name,
+        Key={"SessionId": {"S": f"{session_id}{TURN_COUNTER_SUFFIX}"}},
+        ProjectionExpression="HumanCount, AiCount"
+    )
+    if "Item" not in response:
+        return count_history_messages(table_name, session_id)
+    return parse_turn_counts(response["Item"])
+
+
+def count_history_messages(table_name: str, session_id: str) -> dict:
+    """Count a session's human and AI messages in its DynamoDB history item (LangChain's message dicts)."""
+    response = dynamodb_client.get_item(
+        TableName=table_name,
+        Key={"SessionId": {"S": session_id}},
+        ProjectionExpression="History"
+    )
+    messages = response.get("Item", {}).get("History", {}).get("L", [])
+    types = [m.get("M", {}).get("type", {}).get("S") for m in messages]
+    return {"human": types.count("human"), "ai": types.count("ai")}
+
+
+def parse_turn_counts(attributes: dict) -> dict:
+    """Convert DynamoDB counter attributes into a {'human': int, 'ai': int} dict."""
+    return {
+        "human": int(attributes.get("HumanCount", {}).get("N", 0)),
+        "ai": int(attributes.get("AiCount", {}).get("N", 0))
+    }
+
+
+# Number of opening-turn variants kept per (patient, prompt version, model) before generation stops
+OPENING_CACHE_VARIANTS = int(os.environ.get("OPENING_CACHE_VARIANTS", "5"))
+
+# Responses returned when generation fails; these are never cached
+FALLBACK_RESPONSES = (
+    "I'm sorry, I cannot provide a response to that query.",
+    "I am sorry, I cannot provide a response to that query."
+)
+
+
+def get_prompt_version(*prompt_parts: str) -> str:
+    """Hash the fully composed prompt so cached openings are dropped as soon as any prompt input changes."""
+    return hashlib.sha256("\x1f".join(prompt_parts).encode("utf-8")).hexdigest()[:32]
+
+
+def get_cached_opening(patient_id: str, prompt_version: str, model_id: str) -> str:
+    """
+    Pick a random cached opening turn once the variant pool for this patient, prompt version and model is full.
+    Returns None while the pool is still being filled.
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                'SELECT response_text FROM opening_turn_cache WHERE patient_id = %s AND prompt_version = %s AND model_id = %s AND slot < %s',
+                (patient_id, prompt_version, model_id, OPENING_CACHE_VARIANTS)
+            )
+            variants = [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error reading opening turn cache: {e}")
+        return None
+
+    if len(variants) < OPENING_CACHE_VARIANTS:
+        logger.info(f"Opening turn cache has {len(variants)}/{OPENING_CACHE_VARIANTS} variants, generating a new one")
+        return None
+    return random.choice(variants)
+
+
+def store_opening_variant(patient_id: str, prompt_version: str, model_id: str, response_text: str) -> None:
+    """
+    Add a generated opening turn to the variant pool unless the pool is already full.
+    The variant claims the lowest free slot below the cap; the unique (patient, prompt version, model, slot)
+    index makes the claim a conditional write, so concurrent requests can never overfill the pool.
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO opening_turn_cache (patient_id, prompt_version, model_id, response_text, slot)
+                SELECT %s, %s, %s, %s, s
+                FROM generate_series(0, %s - 1) AS s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM opening_turn_cache
+                    WHERE patient_id = %s AND prompt_version = %s AND model_id = %s AND slot = s
+                )
+                ORDER BY s
+                LIMIT 1
+                ON CONFLICT (patient_id, prompt_version, model_id, slot) DO NOTHING
+                """,
+                (patient_id, prompt_version, model_id, response_text, OPENING_CACHE_VARIANTS,
+                 patient_id, prompt_version, model_id)
+            )
+    except Exception as e:
+        logger.error(f"Error storing opening turn variant: {e}")
+
+
+def replay_cached_opening(history: DynamoDBChatMessageHistory, query: str, response: str, session_id: str, stream: bool) -> str:
+    """
+    Serve a cached opening turn as if it had just been generated: write the exchange through to the
+    DynamoDB history and, when streaming, publish it to AppSync the same way a live answer would be.
+    The messages table rows are written by get_response, as for a generated answer.
+    """
+    history.add_messages([HumanMessage(content=query), AIMessage(content=response)])
+
+    if stream:
+        publish_to_appsync(session_id, {"type": "start", "content": ""})
+        publish_to_appsync(session_id, {"type": "chunk", "content": response})
+        publish_to_appsync(session_id, {"type": "end", "content": response})
+
+    return response
+
+
+class TurnCountingChatMessageHistory(DynamoDBChatMessageHistory):
+    """
+    DynamoDB chat history that bumps the session's turn counters whenever messages are appended,
+    so the resulting totals are known at turn finalization without re-reading the history.
+    """
+
+    def __init__(self, table_name: str, session_id: str, **kwargs):
+        super().__init__(table_name=table_name, session_id=session_id, **kwargs)
+        self.counter_table_name = table_name
+        self.counter_session_id = session_id
+        self.turn_counts = None
+
+    def add_messages(self, messages) -> None:
+        messages = list(messages)
+        super().add_messages(messages)
+        try:
+            self.turn_counts = record_turn(
+                self.counter_table_name,
+                self.counter_session_id,
+                human_messages=sum(1 for m in messages if m.type == "human"),
+                ai_messages=sum(1 for m in messages if m.type == "ai")
+            )
+        except Exception as e:
+            logger.error(f"Error updating turn counters: {e}")
+
+
 def create_dynamodb_history_table(table_name: str) -> bool:
     """
     Create a DynamoDB table to store the session history if it doesn't already exist.
@@ -561,10 +755,12 @@ def get_response(
     patient_age: str,
     patient_prompt: str,
     llm_completion: bool,
-    stream: bool = False
+    stream: bool = False,
+    patient_id: str = None
 ) -> dict:
     """
     Generates a response to a query using the LLM and a history-aware retriever for context.
+    Opening greetings of new sessions are served from the per-patient opening turn cache once it is full.
     """
     logger.info(f"🔍 GET_RESPONSE CALLED - Stream: {stream}, Query: '{query[:50]}...'")
     
@@ -635,20 +831,50 @@ def get_response(
     question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
     rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
 
-    conversational_rag_chain = RunnableWithMessageHistory(
-        rag_chain,
-        lambda session_id: DynamoDBChatMessageHistory(
+    session_histories = {}
+
+    def get_session_history(session_id: str) -> TurnCountingChatMessageHistory:
+        history = TurnCountingChatMessageHistory(
             table_name=table_name, 
             session_id=session_id
-        ),
+        )
+        session_histories[session_id] = history
+        return history
+
+    conversational_rag_chain = RunnableWithMessageHistory(
+        rag_chain,
+        get_session_history,
         input_messages_key="input",
         history_messages_key="chat_history",
         output_messages_key="answer",
     )
     
+    cached_opening = None
+    opening_cache_key = None
+    if is_greeting and patient_id:
+        opening_cache_key = (patient_id, get_prompt_version(system_prompt, query), getattr(llm, "model_id", ""))
+        try:
+            is_new_session = get_turn_counts(table_name, session_id) == {"human": 0, "ai": 0}
+        except Exception as e:
+            logger.error(f"Error reading turn counters: {e}")
+            is_new_session = False
+        if is_new_session:
+            cached_opening = get_cached_opening(*opening_cache_key)
+        else:
+            opening_cache_key = None
+
     response = ""
     try:
-        if stream:
+        if cached_opening:
+            logger.info("Serving opening turn from cache")
+            response = replay_cached_opening(
+                get_session_history(session_id),
+                query,
+                cached_opening,
+                session_id,
+                stream
+            )
+        elif stream:
             response = generate_streaming_response(
                 conversational_rag_chain,
                 query,
@@ -670,12 +896,18 @@ def get_response(
         logger.error(f"Response generation error: {e}")
         response = "I'm sorry, I cannot provide a response to that query."
     
+    if opening_cache_key and not cached_opening and response and response not in FALLBACK_RESPONSES:
+        store_opening_variant(*opening_cache_key, response)
+
+    history = session_histories.get(session_id)
+    turn_counts = history.turn_counts if history else None
+
     if stream:
         save_message_to_db(session_id, False, response, None)
         from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         session_name = f"{patient_name}_{timestamp}"
-        return {"llm_output": response, "session_name": session_name, "llm_verdict": False}
+        return {"llm_output": response, "session_name": session_name, "llm_verdict": False, "turn_counts": turn_counts}
     
     result = get_llm_output(response, llm_completion, empathy_feedback)
     if empathy_evaluation:
@@ -685,6 +917,7 @@ def get_response(
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     result["session_name"] = f"{patient_name}_{timestamp}"
+    result["turn_counts"] = turn_counts
     
     save_message_to_db(session_id, False, result["llm_output"], None)
     
@@ -816,9 +1049,33 @@ def get_cognito_token():
         logger.error("❌ No Cognito token available in context")
         return None
 
+# Shared HTTP session so AppSync publishes reuse a keep-alive connection across chunks and invocations
+appsync_session = None
+
+def get_appsync_session():
+    """Return the process-wide requests session used for AppSync publishes."""
+    global appsync_session
+    if appsync_session is None:
+        import requests
+        appsync_session = requests.Session()
+    return appsync_session
+
+def prewarm_appsync_connection():
+    """Open the TLS keep-alive connection to the AppSync endpoint ahead of the first streamed turn."""
+    appsync_url = os.environ.get('APPSYNC_GRAPHQL_URL')
+    if not appsync_url:
+        logger.info("AppSync GraphQL URL not available in environment, skipping AppSync warm-up")
+        return
+    # An unauthenticated request is rejected by AppSync, but it leaves a pooled connection behind
+    get_appsync_session().get(appsync_url, timeout=5)
+
+def prewarm_prompts():
+    """Resolve the latest system and empathy prompts so the shared connection pool is open before the first turn."""
+    get_system_prompt(patient_name=None)
+    get_empathy_prompt()
+
 def publish_to_appsync(session_id: str, data: dict):
     """Publish streaming data to AppSync subscription using Cognito User Pool authentication."""
-    import requests
     import json
     import os
     
@@ -861,7 +1118,7 @@ def publish_to_appsync(session_id: str, data: dict):
         logger.info("🔑 Using Cognito User Pool token for authentication")
         
         logger.info(f"📶 Making AppSync request to: {appsync_url}")
-        response = requests.post(appsync_url, data=json.dumps(payload), headers=headers)
+        response = get_appsync_session().post(appsync_url, data=json.dumps(payload), headers=headers)
         
         if response.status_code != 200:
             logger.error(f"Request payload: {json.dumps(payload, indent=2)}")
@@ -943,50 +1200,25 @@ def split_into_sentences(paragraph: str) -> list[str]:
     sentences = re.split(sentence_endings, paragraph)
     return sentences
 
-def update_session_name(table_name: str, session_id: str, bedrock_llm_id: str, patient_name: str = None) -> str:
+def update_session_name(table_name: str, session_id: str, bedrock_llm_id: str, patient_name: str = None, turn_counts: dict = None) -> str:
     """
     Generate session name after first real medical exchange using patient_name_[timestamp] format.
     Looks for: 1 AI intro + 1 student response + 1 AI response (1 human, 2 AI total).
+    Uses the turn counters returned by the turn's history write when given, otherwise reads the counter item.
     """
-    
-    dynamodb_client = boto3.client("dynamodb")
-    
-    try:
-        response = dynamodb_client.get_item(
-            TableName=table_name,
-            Key={
-                'SessionId': {
-                    'S': session_id
-                }
-            }
-        )
-    except Exception as e:
-        print(f"Error fetching conversation history from DynamoDB: {e}")
-        return None
-
-    history = response.get('Item', {}).get('History', {}).get('L', [])
+    if turn_counts is None:
+        try:
+            turn_counts = get_turn_counts(table_name, session_id)
+        except Exception as e:
+            print(f"Error fetching turn counters from DynamoDB: {e}")
+            return None
 
-    human_messages = []
-    ai_messages = []
-    
-    for item in history:
-        message_type = item.get('M', {}).get('data', {}).get('M', {}).get('type', {}).get('S')
-        
-        if message_type == 'human':
-            human_messages.append(item)
-            if len(human_messages) > 1:
-                print("More than one student message found; past naming window.")
-                return None
-        
-        elif message_type == 'ai':
-            ai_messages.append(item)
-            if len(ai_messages) > 2:
-                print("More than two AI messages found; past naming window.")
-                return None
+    human_count = turn_counts.get("human", 0)
+    ai_count = turn_counts.get("ai", 0)
 
     # Check if this is the right moment: 1 human message, 2 AI messages
-    if len(human_messages) != 1 or len(ai_messages) != 2:
-        print(f"Not the naming moment - Human: {len(human_messages)}, AI: {len(ai_messages)}")
+    if human_count != 1 or ai_count != 2:
+        print(f"Not the naming moment - Human: {human_count}, AI: {ai_count}")
         return None
     
     # Generate timestamp-based session name
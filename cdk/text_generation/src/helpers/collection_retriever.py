@@ -0,0 +1,61 @@
+import logging
+from typing import List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from helpers.helper import apply_search_settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# amazon.titan-embed-text-v2:0; the HNSW index is built on embedding::vector(1024) (see data_ingestion helpers.ann_index)
+EMBEDDING_DIMENSIONS = 1024
+
+class CollectionRetriever(BaseRetriever):
+    """
+    Cosine similarity search over one patient's collection in langchain_pg_embedding.
+
+    The search orders by the same `embedding::vector(1024)` expression the HNSW index is built on, so the
+    index serves it without pinning the column's type. Rows from a relaxed-order iterative scan are
+    re-sorted by distance before they are returned.
+    """
+
+    engine: Engine
+    embeddings: Embeddings
+    collection_name: str
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.embeddings.embed_query(query)
+
+        with self.engine.connect() as conn:
+            collection_id = conn.execute(
+                text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+                {"name": self.collection_name}
+            ).scalar()
+            if collection_id is None:
+                logger.info("No vectorstore collection for the patient yet.")
+                return []
+            apply_search_settings(conn)
+            rows = conn.execute(
+                text(f'''
+                    WITH nearest AS MATERIALIZED (
+                        SELECT document, cmetadata,
+                               embedding::vector({EMBEDDING_DIMENSIONS}) <=> CAST(:embedding AS vector({EMBEDDING_DIMENSIONS})) AS distance
+                        FROM langchain_pg_embedding
+                        WHERE collection_id = :collection_id
+                        ORDER BY distance
+                        LIMIT :k
+                    )
+                    SELECT document, cmetadata FROM nearest ORDER BY distance
+                '''),
+                {"embedding": str(embedding), "collection_id": collection_id, "k": self.k}
+            ).fetchall()
+
+        return [Document(page_content=document or "", metadata=metadata or {}) for document, metadata in rows]
@@ -1,14 +1,79 @@
+import os
 import logging
 from typing import Optional
 
 import psycopg2
 from langchain_aws import BedrockEmbeddings
 from langchain_postgres import PGVector
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def build_connection_string(dbname: str, user: str, password: str, host: str, port: int) -> str:
+    """Build the SQLAlchemy connection string for the vectorstore database."""
+    return f"postgresql+psycopg://{user}:{password}@{host}:{port}/{dbname}"
+
+# HNSW candidate list size for vector searches (pgvector default 40); higher trades latency for recall
+VECTOR_EF_SEARCH = os.environ.get("VECTOR_EF_SEARCH")
+# Most index tuples an iterative HNSW scan reads for a filtered search (pgvector default 20000)
+VECTOR_MAX_SCAN_TUPLES = os.environ.get("VECTOR_MAX_SCAN_TUPLES")
+
+# Whether the vector extension supports iterative index scans (pgvector >= 0.8), checked once per container
+iterative_scan_supported = None
+
+# SQLAlchemy engines reused across invocations, keyed by connection string
+engines = {}
+
+def get_engine(connection_string: str) -> Engine:
+    """
+    Return a cached SQLAlchemy engine for the connection string so warm invocations reuse its connection pool.
+
+    Args:
+    connection_string (str): The SQLAlchemy connection string.
+
+    Returns:
+    Engine: The shared engine.
+    """
+    if connection_string not in engines:
+        engines[connection_string] = create_engine(connection_string, pool_pre_ping=True)
+    return engines[connection_string]
+
+def apply_search_settings(conn: Connection) -> None:
+    """
+    Set the HNSW search options for the current transaction only (SET LOCAL), so they never outlive
+    the search on the pooled connection.
+
+    With pgvector >= 0.8, iterative scans are enabled: a search filtered to one collection keeps reading
+    the shared index until it has its k rows, instead of filtering the first ef_search candidates and
+    returning fewer for a collection that holds a small share of the table.
+
+    Args:
+    conn (Connection): The connection, inside the transaction that runs the search.
+    """
+    global iterative_scan_supported
+    if VECTOR_EF_SEARCH:
+        conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(VECTOR_EF_SEARCH)}"))
+    if iterative_scan_supported is None:
+        version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        iterative_scan_supported = version is not None and tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+    if iterative_scan_supported:
+        conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+        if VECTOR_MAX_SCAN_TUPLES:
+            conn.execute(text(f"SET LOCAL hnsw.max_scan_tuples = {int(VECTOR_MAX_SCAN_TUPLES)}"))
+
+def prewarm_engine(connection_string: str) -> None:
+    """
+    Open a pooled vectorstore connection ahead of the first retrieval.
+
+    Args:
+    connection_string (str): The SQLAlchemy connection string.
+    """
+    with get_engine(connection_string).connect() as conn:
+        conn.execute(text("SELECT 1"))
+
 def get_vectorstore(
     collection_name: str, 
     embeddings: BedrockEmbeddings, 
@@ -34,15 +99,13 @@ def get_vectorstore(
     Optional[PGVector]: The initialized PGVector instance, or None if an error occurred.
     """
     try:
-        connection_string = (
-            f"postgresql+psycopg://{user}:{password}@{host}:{port}/{dbname}"
-        )
+        connection_string = build_connection_string(dbname, user, password, host, port)
 
         logger.info("Initializing the VectorStore")
         vectorstore = PGVector(
             embeddings=embeddings,
             collection_name=collection_name,
-            connection=connection_string,
+            connection=get_engine(connection_string),
             use_jsonb=True
         )
 
@@ -0,0 +1,57 @@
+import os
+import uuid
+import logging
+from typing import List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from helpers.helper import apply_search_settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "patient_embeddings"
+PARTITIONED_STORAGE = os.environ.get("VECTOR_STORAGE", "langchain").lower() == "partitioned"
+
+def partition_name(patient_id: str) -> str:
+    """The partition holding a patient's chunks (see data_ingestion helpers.partitioned_store)."""
+    return f"{PARTITIONED_TABLE}_{uuid.UUID(str(patient_id)).hex}"
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    Cosine similarity search over one patient's partition of patient_embeddings.
+
+    The partition is queried directly (no collection join, no partition pruning), so the cost of a
+    search depends only on that patient's chunks and is served by the partition's own HNSW index.
+    """
+
+    engine: Engine
+    embeddings: Embeddings
+    patient_id: str
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.embeddings.embed_query(query)
+        partition = partition_name(self.patient_id)
+
+        with self.engine.connect() as conn:
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is None:
+                logger.info("No vectorstore partition for the patient yet.")
+                return []
+            apply_search_settings(conn)
+            rows = conn.execute(
+                text(f'''
+                    SELECT document, cmetadata FROM "{partition}"
+                    ORDER BY embedding <=> CAST(:embedding AS vector)
+                    LIMIT :k
+                '''),
+                {"embedding": str(embedding), "k": self.k}
+            ).fetchall()
+
+        return [Document(page_content=document or "", metadata=metadata or {}) for document, metadata in rows]
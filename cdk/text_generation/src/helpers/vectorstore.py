@@ -4,7 +4,9 @@ from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.chains import create_history_aware_retriever
 
-from helpers.helper import get_vectorstore
+from helpers.helper import get_engine, build_connection_string
+from helpers.collection_retriever import CollectionRetriever
+from helpers.partitioned_retriever import PartitionedRetriever, PARTITIONED_STORAGE
 
 def get_vectorstore_retriever(
     llm,
@@ -22,17 +24,27 @@ def get_vectorstore_retriever(
     Returns:
     VectorStoreRetriever: A history-aware retriever instance.
     """
-    vectorstore, _ = get_vectorstore(
-        collection_name=vectorstore_config_dict['collection_name'],
-        embeddings=embeddings,
+    engine = get_engine(build_connection_string(
         dbname=vectorstore_config_dict['dbname'],
         user=vectorstore_config_dict['user'],
         password=vectorstore_config_dict['password'],
         host=vectorstore_config_dict['host'],
         port=int(vectorstore_config_dict['port'])
-    )
-
-    retriever = vectorstore.as_retriever()
+    ))
+    if PARTITIONED_STORAGE:
+        # Search the patient's partition directly, without building a PGVector collection
+        retriever = PartitionedRetriever(
+            engine=engine,
+            embeddings=embeddings,
+            patient_id=vectorstore_config_dict['collection_name']
+        )
+    else:
+        # Search the patient's collection with the query the shared HNSW index is built for
+        retriever = CollectionRetriever(
+            engine=engine,
+            embeddings=embeddings,
+            collection_name=vectorstore_config_dict['collection_name']
+        )
 
     # Contextualize question and create history-aware retriever
     contextualize_q_system_prompt = (
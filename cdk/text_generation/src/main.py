@@ -1,12 +1,14 @@
 import os
 import json
+import time
 import boto3
 import logging
 import psycopg2
 from langchain_aws import BedrockEmbeddings
 
 from helpers.vectorstore import get_vectorstore_retriever
-from helpers.chat import get_bedrock_llm, get_initial_student_query, get_student_query, create_dynamodb_history_table, get_response, update_session_name
+from helpers.helper import build_connection_string, prewarm_engine
+from helpers.chat import get_bedrock_llm, get_initial_student_query, get_student_query, create_dynamodb_history_table, get_response, update_session_name, prewarm_prompts, prewarm_appsync_connection
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO)
@@ -37,6 +39,9 @@ TABLE_NAME = None
 # Cached embeddings instance
 embeddings = None
 
+# Cached Bedrock LLM instances, keyed by streaming flag
+llms = {}
+
 def get_secret(secret_name, expect_json=True):
     global db_secret
     if db_secret is None:
@@ -78,6 +83,53 @@ def initialize_constants():
     
     create_dynamodb_history_table(TABLE_NAME)
 
+def get_llm(streaming):
+    """
+    Return a cached Bedrock LLM instance so warm invocations skip client construction.
+    """
+    if streaming not in llms:
+        llms[streaming] = get_bedrock_llm(bedrock_llm_id=BEDROCK_LLM_ID, streaming=streaming)
+    return llms[streaming]
+
+def is_warm_up_event(event):
+    """
+    Scheduled EventBridge invocations and explicit {"warmup": true} events only warm the container.
+    """
+    return bool(event.get("warmup")) or event.get("source") == "aws.events"
+
+def warm_up():
+    """
+    Pre-create everything the first request of a burst would otherwise pay for
+    and return how long each step took in milliseconds (None if the step failed).
+    """
+    timings = {}
+
+    def timed(step, func):
+        start = time.perf_counter()
+        try:
+            func()
+            timings[step] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            logger.warning(f"Warm-up step '{step}' failed: {e}")
+            timings[step] = None
+
+    def warm_vectorstore_engine():
+        secret = get_secret(DB_SECRET_NAME)
+        prewarm_engine(build_connection_string(
+            secret["dbname"], secret["username"], secret["password"], RDS_PROXY_ENDPOINT, secret["port"]
+        ))
+
+    timed("constants", initialize_constants)
+    timed("db_connection", connect_to_db)
+    timed("prompts", prewarm_prompts)
+    timed("vectorstore_engine", warm_vectorstore_engine)
+    timed("llm", lambda: [get_llm(streaming) for streaming in (False, True)])
+    timed("bedrock_embeddings", lambda: embeddings.embed_query("warm-up"))
+    timed("appsync", prewarm_appsync_connection)
+
+    logger.info(f"Warm-up completed: {timings}")
+    return timings
+
 def connect_to_db():
     global connection
     if connection is None or connection.closed:
@@ -180,6 +232,16 @@ def get_patient_details(patient_id):
 
 
 def handler(event, context):
+    if is_warm_up_event(event):
+        timings = warm_up()
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "warm": all(value is not None for value in timings.values()),
+                "timings_ms": timings
+            })
+        }
+
     # Version: 2024-01-15-empathy-fix-v2 - Force new deployment
     logger.info("🚀 STREAMING FUNCTION STARTED - Text Generation Lambda function is called!")
     logger.info("🔧 EMPATHY EVALUATION SYSTEM LOADED")
@@ -279,7 +341,7 @@ def handler(event, context):
     
     try:
         logger.info("Creating Bedrock LLM instance.")
-        llm = get_bedrock_llm(bedrock_llm_id=BEDROCK_LLM_ID, streaming=stream)
+        llm = get_llm(stream)
     except Exception as e:
         logger.error(f"Error getting LLM from Bedrock: {e}")
         return {
@@ -353,7 +415,8 @@ def handler(event, context):
             patient_age=patient_age,
             patient_prompt=patient_prompt,
             llm_completion=llm_completion,
-            stream=stream
+            stream=stream,
+            patient_id=patient_id
         )
     except Exception as e:
         logger.error(f"Error getting response: {e}")
@@ -372,7 +435,8 @@ def handler(event, context):
     try:
         logger.info("Updating session name if this is the first exchange between the LLM and student")
         potential_session_name = update_session_name(
-            TABLE_NAME, session_id, BEDROCK_LLM_ID, patient_name)
+            TABLE_NAME, session_id, BEDROCK_LLM_ID, patient_name,
+            turn_counts=response.pop("turn_counts", None))
         if potential_session_name:
             logger.info("This is the first exchange between the LLM and student. Updating session name.")
             session_name = potential_session_name
@@ -417,4 +481,9 @@ def handler(event, context):
                 "llm_verdict": response.get("llm_verdict", "LLM failed to create verdict"),
                 "empathy_evaluation": response.get("empathy_evaluation", None)
             })
-        }
\ No newline at end of file
+        }
+
+
+# Provisioned concurrency runs module init ahead of traffic, so warm up there too
+if os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") == "provisioned-concurrency":
+    warm_up()